@@ -0,0 +1,83 @@
+"""
+学習済みモデルの読み込み時間とメモリ使用量を計測するベンチマーク
+
+系列ごとのモデルを多数保存し、次の3つの方法で全モデルを読み込んだときの時間と
+プロセスの常駐メモリ（RSS）の増加量を、それぞれ別プロセスで計測する。
+  - 従来の torch.save 形式（.pt）のファイルを1つずつ読み込む
+  - メモリマップ形式（.fcm）のファイルを1つずつ読み込む
+  - 全モデルを1つにまとめた .fcm ファイルから読み込む
+使い方: python app/backend/bench_artifact.py [モデル数] [隠れユニット数]
+"""
+import contextlib
+import glob
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+import server
+from app.models.artifact import pack_artifacts
+from app.models.lstm_model import DemandForecaster
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# 別プロセスで全モデルを読み込み、読み込み時間とRSSの増加量を出力する
+LOAD_SCRIPT = '''
+import contextlib, io, json, sys, time
+import server
+from app.models.artifact import ArtifactReader
+from app.models.lstm_model import DemandForecaster
+
+def rss_kb():
+    with open('/proc/self/status') as f:
+        return next(int(line.split()[1]) for line in f if line.startswith('VmRSS:'))
+
+mode, paths = sys.argv[1], sys.argv[2:]
+DemandForecaster()  # PyTorch の読み込みとモデル構築の初回コストを除く
+before = rss_kb()
+start = time.perf_counter()
+with contextlib.redirect_stdout(io.StringIO()):
+    if mode == 'packed':
+        reader = ArtifactReader(paths[0])
+        forecasters = [DemandForecaster(reader, model_name=name) for name in reader.names()]
+    else:
+        forecasters = [DemandForecaster(path) for path in paths]
+print(json.dumps({'seconds': time.perf_counter() - start, 'rssMb': (rss_kb() - before) / 1024}))
+'''
+
+
+def _measure(mode, paths):
+    output = subprocess.run([sys.executable, '-c', LOAD_SCRIPT, mode] + paths,
+                            cwd=BACKEND_DIR, capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+if __name__ == '__main__':
+    model_count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    hidden_units = int(sys.argv[2]) if len(sys.argv) > 2 else 64
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # 重みはランダムのままで保存する（読み込みの計測には学習は不要）
+        forecaster = DemandForecaster(config={'hidden_units': hidden_units})
+        forecaster.scaler.fit([[0.0], [100.0]])
+        with contextlib.redirect_stdout(io.StringIO()):
+            for k in range(model_count):
+                forecaster.model = forecaster._build_model()
+                forecaster.save_model(os.path.join(tmp_dir, 'pt', f"S{k:05d}.pt"))
+                forecaster.save_model(os.path.join(tmp_dir, 'fcm', f"S{k:05d}.fcm"))
+        fcm_files = sorted(glob.glob(os.path.join(tmp_dir, 'fcm', '*.fcm')))
+        packed_file = os.path.join(tmp_dir, 'series.fcm')
+        pack_artifacts(packed_file, {os.path.basename(path): (path, None) for path in fcm_files})
+
+        print(f"{model_count}モデル（隠れユニット数={hidden_units}）の読み込み:")
+        cases = [
+            ('torch.save (.pt)', 'files', sorted(glob.glob(os.path.join(tmp_dir, 'pt', '*.pt')))),
+            ('memmap (.fcm)', 'files', fcm_files),
+            ('memmap (1 file)', 'packed', [packed_file])
+        ]
+        for label, mode, paths in cases:
+            result = _measure(mode, paths)
+            size_mb = sum(os.path.getsize(path) for path in paths) / 1024 / 1024
+            print(f"  {label:<18}: {result['seconds']:7.3f}秒, RSS +{result['rssMb']:7.1f}MB, ファイル {size_mb:6.1f}MB")
@@ -0,0 +1,87 @@
+"""
+古典的な手法（季節ナイーブ・Holt-Winters・Croston）による予測の時間と精度を計測するベンチマーク
+
+- 多数の系列（規則的な需要と間欠的な需要を半分ずつ）をまとめて当てはめて予測する時間
+- サンプルデータ（1年分。ノイズを変えて4通り）の最後の30日を、以前の簡易予測
+  （直近30日の平均 × 週末・季節・トレンドの係数 + ノイズ）と古典的な手法で予測したときの誤差（MAPE）
+使い方: python app/backend/bench_baselines.py [系列数] [予測日数]
+"""
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+
+import numpy as np
+
+import server
+from app.backend.database import sales_by_series
+from app.models.baselines import BASELINE_HISTORY_DAYS, baseline_forecast
+from app.models.calendar_features import horizon_dates
+
+HOLDOUT_DAYS = 30
+
+
+def _synthetic_series(series_count, rng):
+    """週周期・トレンド・ノイズのある系列と、ポアソン分布の間欠的な系列を半分ずつ作る"""
+    days = np.arange(BASELINE_HISTORY_DAYS)
+    regular = series_count // 2
+    level = rng.uniform(50, 500, (regular, 1))
+    smooth = level * (1 + 0.3 * np.sin(2 * np.pi * days / 7 + rng.uniform(0, 7, (regular, 1)))
+                      + 0.002 * days) + rng.normal(0, 1, (regular, len(days))) * level * 0.1
+    intermittent = (rng.poisson(0.3, (series_count - regular, len(days)))
+                    * rng.integers(1, 10, (series_count - regular, 1)))
+    return list(np.concatenate([np.maximum(smooth, 0), intermittent]))
+
+
+def _heuristic(rows, period, rng):
+    """以前の簡易予測"""
+    recent = np.array([row[1] for row in rows[-30:]])
+    dates = horizon_dates(rows[-1][0], period)
+    weekend = (dates.astype(np.int64) + 3) % 7 >= 5  # 1970-01-01 は木曜日
+    day_of_year = (dates - dates.astype('datetime64[Y]')).astype(np.int64) + 1
+    factors = (np.where(weekend, 1.3, 1.0)                             # 週末効果
+               * (1.0 + 0.2 * np.sin(np.pi * day_of_year / 180))      # 季節効果
+               * (1.0 + (np.arange(period) / 365) * 0.1))             # 上昇トレンド
+    forecast = recent.mean() * factors
+    return np.maximum(forecast + rng.normal(0, recent.std() * 0.1, size=period), 0)
+
+
+def _mape(actual, predicted):
+    return float(np.mean(np.abs((actual - predicted) / actual)) * 100)
+
+
+if __name__ == '__main__':
+    series_count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    period = int(sys.argv[2]) if len(sys.argv) > 2 else 30
+
+    value_lists = _synthetic_series(series_count, np.random.default_rng(0))
+    start = time.perf_counter()
+    forecasts, methods, _ = baseline_forecast(value_lists, period)
+    seconds = time.perf_counter() - start
+    print(f"{series_count}系列 × {BASELINE_HISTORY_DAYS}日分から{period}日の予測: {seconds:6.2f}秒 "
+          f"({series_count / seconds:,.0f}系列/秒)")
+    print(f"  選ばれた手法: {dict(Counter(methods))}")
+
+    errors = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for data_seed in range(4):
+            server.DB_PATH = os.path.join(tmp_dir, f"bench-{data_seed}.db")
+            with contextlib.redirect_stdout(io.StringIO()):
+                server.init_database()
+                np.random.seed(data_seed)
+                server.generate_sample_data()
+            rows = next(iter(sales_by_series(server.get_database()).values()))
+            server.get_database().close()
+            rows, holdout = rows[:-HOLDOUT_DAYS], rows[-HOLDOUT_DAYS:]
+            actual = np.array([row[1] for row in holdout])
+            predicted, methods, _ = baseline_forecast([[row[1] for row in rows]], HOLDOUT_DAYS)
+            errors.append((_mape(actual, _heuristic(rows, HOLDOUT_DAYS, np.random.default_rng(data_seed))),
+                           _mape(actual, predicted[0])))
+            print(f"  データ {data_seed}: 簡易予測 MAPE {errors[-1][0]:5.2f}%, "
+                  f"古典的な手法（{methods[0]}） MAPE {errors[-1][1]:5.2f}%")
+    heuristic_error, baseline_error = np.mean(errors, axis=0)
+    print(f"サンプルデータ 4通りの平均（直後の{HOLDOUT_DAYS}日間で評価）: 以前の簡易予測 MAPE {heuristic_error:5.2f}%, "
+          f"古典的な手法 MAPE {baseline_error:5.2f}%")
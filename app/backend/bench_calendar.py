@@ -0,0 +1,40 @@
+"""
+予測期間の日付の計算を計測するベンチマーク
+
+1日ずつ datetime で日付を求めて文字列にするループ（以前の実装）と、
+系列 × 予測期間の datetime64 配列として一度に計算する horizon_dates（予測APIで使用）を比較する。
+使い方: python app/backend/bench_calendar.py [系列数] [予測日数]
+"""
+import sys
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from app.models.calendar_features import horizon_dates
+
+
+def _loop_dates(last_date, period):
+    """以前の実装（1日ずつ日付を計算する）"""
+    return [(last_date + timedelta(days=i+1)).strftime('%Y-%m-%d') for i in range(period)]
+
+
+if __name__ == '__main__':
+    series_count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    period = int(sys.argv[2]) if len(sys.argv) > 2 else 365
+
+    rng = np.random.default_rng(0)
+    last_dates = (np.datetime64('2024-01-01') + rng.integers(0, 365, series_count)).astype(str).tolist()
+
+    start = time.perf_counter()
+    expected = [_loop_dates(datetime.strptime(date, '%Y-%m-%d'), period) for date in last_dates]
+    loop_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    dates = horizon_dates(last_dates, period).astype(str)
+    vectorized_seconds = time.perf_counter() - start
+
+    print(f"{series_count}系列 × {period}日の予測期間の日付:")
+    print(f"  1日ずつのループ: {loop_seconds:8.3f}秒")
+    print(f"  配列でまとめて : {vectorized_seconds:8.3f}秒  ({loop_seconds / vectorized_seconds:.1f}倍)")
+    print(f"  日付の一致: {dates.tolist() == expected}")
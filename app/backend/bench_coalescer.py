@@ -0,0 +1,102 @@
+"""
+同時に届いた /api/predict をまとめて処理する効果を計測するベンチマーク
+
+複数のクライアントから同時に /api/predict を1件ずつ呼び出し、まとめる待ち時間ごとに
+1秒あたりの予測件数、1リクエストの応答時間（p50/p99）、1回のバッチ推論にまとめた
+リクエスト数の平均を表示する。待ち時間 0ms はまとめずに1件ずつ処理する場合。
+モデル（重みはランダム）で予測し、キャッシュは無効にして計測する。
+使い方: python app/backend/bench_coalescer.py [クライアント数] [1クライアントのリクエスト数]
+"""
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+
+import numpy as np
+
+import server
+from app.backend.coalescer import PredictCoalescer
+from app.backend.forecast_cache import ForecastCache
+
+SERIES_COUNT = 200
+
+
+def _import_series(series_count, days=400):
+    dates = np.arange(np.datetime64('2024-01-01'), np.datetime64('2024-01-01') + days).astype(str)
+    lines = ['series,date,sales']
+    for k in range(series_count):
+        sales = (100 + k) * (1 + 0.3 * np.sin(np.arange(days) / 7)) + np.random.randn(days)
+        lines.extend(f"S{k:05d},{date},{value:.2f}" for date, value in zip(dates, sales))
+    server.import_sales(server.get_database(), io.StringIO('\n'.join(lines)), mode='append')
+
+
+def _client(base_url, series_ids, latencies):
+    for series_id in series_ids:
+        payload = {'seriesId': series_id, 'period': 30, 'historyDays': 60}
+        request = urllib.request.Request(f"{base_url}/api/predict", data=json.dumps(payload).encode(),
+                                         headers={'Content-Type': 'application/json'})
+        start = time.perf_counter()
+        with urllib.request.urlopen(request) as response:
+            json.loads(response.read())
+        latencies.append((time.perf_counter() - start) * 1000)
+
+
+def _run(base_url, client_count, request_count):
+    rng = np.random.default_rng(0)
+    latencies = []
+    threads = [
+        threading.Thread(target=_client, args=(
+            base_url, [f"S{k:05d}" for k in rng.integers(0, SERIES_COUNT, request_count)], latencies
+        ))
+        for _ in range(client_count)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    seconds = time.perf_counter() - start
+    return len(latencies) / seconds, float(np.median(latencies)), float(np.percentile(latencies, 99))
+
+
+if __name__ == '__main__':
+    client_count = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    request_count = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        server.DB_PATH = os.path.join(tmp_dir, 'bench.db')
+        server.MODEL_FILE = os.path.join(tmp_dir, 'saved', 'demand_forecaster.fcm')
+        server.FORECAST_CACHE = ForecastCache(max_entries=0)
+        with contextlib.redirect_stdout(io.StringIO()):
+            server.init_database()
+            _import_series(SERIES_COUNT)
+
+            from app.models.lstm_model import DemandForecaster
+            forecaster = DemandForecaster()
+            forecaster.scaler.fit([[0.0], [1000.0]])
+            forecaster.save_model(server.MODEL_FILE)
+            server.load_forecaster()
+
+        httpd = server.create_server(0)
+        base_url = f"http://localhost:{httpd.server_address[1]}"
+        threading.Thread(target=httpd.serve_forever, daemon=True).start()
+
+        try:
+            print(f"{client_count}クライアント x {request_count}リクエスト（LSTM, 予測日数 30日）:")
+            for max_wait_ms in (0, 1, 2, 5, 10):
+                server.PREDICT_COALESCER = PredictCoalescer(server.predict_requests, max_wait=max_wait_ms / 1000)
+                with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+                    throughput, p50, p99 = _run(base_url, client_count, request_count)
+                stats = server.PREDICT_COALESCER.stats()
+                batch_size = f"平均バッチ {stats['meanBatchSize']:5.1f}件" if stats['enabled'] else 'まとめない'
+                print(f"  待ち時間 {max_wait_ms:2d}ms: {throughput:7.1f}件/秒, 応答 p50 {p50:6.1f}ms, "
+                      f"p99 {p99:6.1f}ms, {batch_size}")
+        finally:
+            httpd.shutdown()
+            httpd.server_close()
+            server.get_database().close()
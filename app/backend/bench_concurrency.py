@@ -0,0 +1,97 @@
+"""
+学習中の /api/predict のレイテンシを計測するベンチマーク
+
+シングルスレッド構成（従来の HTTPServer）とワーカープール構成を比較する。
+使い方: python app/backend/bench_concurrency.py [学習エポック数] [クライアント数]
+"""
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+
+import numpy as np
+
+import server
+
+
+def _post(url, payload, timeout=600):
+    request = urllib.request.Request(
+        url,
+        data=json.dumps(payload).encode(),
+        headers={'Content-Type': 'application/json'}
+    )
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        return response.read()
+
+
+def _train_until_done(base_url, epochs):
+    """学習ジョブを開始し、終了するまでポーリングする"""
+    job_id = json.loads(_post(f"{base_url}/api/train", {'epochs': epochs, 'batchSize': 32}))['jobId']
+    while True:
+        with urllib.request.urlopen(f"{base_url}/api/train/jobs/{job_id}") as response:
+            job = json.loads(response.read())['job']
+        if job['status'] != 'running':
+            return job
+        time.sleep(0.1)
+
+
+def run_benchmark(concurrent, train_epochs=60, clients=2):
+    """学習リクエストを投げた状態で予測リクエストのレイテンシを集計する"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        server.DB_PATH = os.path.join(tmp_dir, 'bench.db')
+        server.init_database()
+        server.generate_sample_data()
+
+        httpd = server.create_server(0, concurrent=concurrent)
+        base_url = f"http://localhost:{httpd.server_address[1]}"
+        server_thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+        server_thread.start()
+
+        train_thread = threading.Thread(
+            target=_train_until_done,
+            args=(base_url, train_epochs),
+            daemon=True
+        )
+        train_thread.start()
+        time.sleep(0.2)  # 学習が始まるのを待つ
+
+        latencies = []
+        lock = threading.Lock()
+
+        def client():
+            while train_thread.is_alive():
+                start = time.perf_counter()
+                _post(f"{base_url}/api/predict", {'period': 30})
+                elapsed = (time.perf_counter() - start) * 1000
+                with lock:
+                    latencies.append(elapsed)
+
+        client_threads = [threading.Thread(target=client) for _ in range(clients)]
+        for thread in client_threads:
+            thread.start()
+        for thread in client_threads:
+            thread.join()
+        train_thread.join()
+
+        httpd.shutdown()
+        httpd.server_close()
+
+    return {
+        'requests': len(latencies),
+        'p50': float(np.percentile(latencies, 50)),
+        'p99': float(np.percentile(latencies, 99))
+    }
+
+
+if __name__ == '__main__':
+    epochs = int(sys.argv[1]) if len(sys.argv) > 1 else 60
+    clients = int(sys.argv[2]) if len(sys.argv) > 2 else 2
+
+    print(f"学習エポック数={epochs} (約{epochs * 0.05:.1f}秒), クライアント数={clients}")
+    for label, concurrent in [('シングルスレッド', False), ('ワーカープール', True)]:
+        result = run_benchmark(concurrent, epochs, clients)
+        print(f"{label}: 予測リクエスト数={result['requests']}, "
+              f"p50={result['p50']:.1f}ms, p99={result['p99']:.1f}ms")
@@ -0,0 +1,96 @@
+"""
+/api/data と /api/settings の1秒あたりの処理件数を計測するベンチマーク
+
+1. データアクセス層: リクエストごとに sqlite3.connect する従来方式と接続プールを比較
+2. HTTP: 現在のサーバーに対する requests/sec
+
+使い方: python app/backend/bench_database.py [スレッド数] [1スレッドあたりの回数]
+"""
+import contextlib
+import io
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+
+import server
+
+QUERIES = {
+    '/api/data': "SELECT date, sales, features FROM sales_data ORDER BY date",
+    '/api/settings': "SELECT model_type, hidden_layers, hidden_units FROM settings ORDER BY id DESC LIMIT 1"
+}
+
+
+def _run_threads(worker, threads, iterations):
+    """worker を複数スレッドで実行し、1秒あたりの処理件数を返す"""
+    workers = [threading.Thread(target=lambda: [worker() for _ in range(iterations)]) for _ in range(threads)]
+    start = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return threads * iterations / (time.perf_counter() - start)
+
+
+def bench_access_layer(sql, threads, iterations):
+    def connect_per_call():
+        # 従来の実装と同じ: 呼び出しごとに接続を開いて閉じる
+        conn = sqlite3.connect(server.DB_PATH)
+        cursor = conn.cursor()
+        cursor.execute(sql)
+        cursor.fetchall()
+        conn.close()
+
+    database = server.get_database()
+
+    def pooled():
+        database.query(sql)
+
+    return {
+        'connect': _run_threads(connect_per_call, threads, iterations),
+        'pool': _run_threads(pooled, threads, iterations)
+    }
+
+
+def bench_http(path, threads, iterations):
+    httpd = server.create_server(0)
+    url = f"http://localhost:{httpd.server_address[1]}{path}"
+    server_thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    server_thread.start()
+
+    def request():
+        with urllib.request.urlopen(url) as response:
+            response.read()
+
+    try:
+        return _run_threads(request, threads, iterations)
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
+
+
+if __name__ == '__main__':
+    threads = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    iterations = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        server.DB_PATH = os.path.join(tmp_dir, 'bench.db')
+        server.init_database()
+        server.generate_sample_data()
+
+        print(f"スレッド数={threads}, 1スレッドあたり{iterations}回")
+        for path, sql in QUERIES.items():
+            result = bench_access_layer(sql, threads, iterations)
+            print(f"{path} データアクセス: 接続ごと={result['connect']:.0f} ops/s, "
+                  f"接続プール={result['pool']:.0f} ops/s ({result['pool'] / result['connect']:.1f}倍)")
+
+        for path in QUERIES:
+            # HTTPサーバーのログ出力を抑える
+            with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+                rps = bench_http(path, threads, iterations // 4)
+            print(f"{path} HTTP: {rps:.0f} requests/s")
+
+        server.get_database().close()
@@ -0,0 +1,51 @@
+"""
+前年比の計算を計測するベンチマーク
+
+全行の日付を strptime で比較して前年同期の実績を集める従来の方法と、
+データのバージョンごとに一度だけ作る SeriesDateIndex で期間の合計を引く方法を比較する。
+使い方: python app/backend/bench_date_index.py [履歴の日数] [予測日数] [繰り返し回数]
+"""
+import sys
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+import server
+from app.backend.date_index import SeriesDateIndex
+
+
+def _scan_year_ago(data, period):
+    """従来の実装（全行を走査する）"""
+    last_date = datetime.strptime(data[-1][0], '%Y-%m-%d')
+    return [float(row[1]) for row in data if
+            datetime.strptime(row[0], '%Y-%m-%d') >= last_date - timedelta(days=365) and
+            datetime.strptime(row[0], '%Y-%m-%d') <= last_date - timedelta(days=365-period)]
+
+
+if __name__ == '__main__':
+    days = int(sys.argv[1]) if len(sys.argv) > 1 else 3650
+    period = int(sys.argv[2]) if len(sys.argv) > 2 else 90
+    repeat = int(sys.argv[3]) if len(sys.argv) > 3 else 100
+
+    dates = np.arange(np.datetime64('2015-01-01'), np.datetime64('2015-01-01') + days).astype(str)
+    data = list(zip(dates.tolist(), (100 + 10 * np.random.randn(days)).tolist()))
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        _scan_year_ago(data, period)
+    scan_ms = (time.perf_counter() - start) / repeat * 1000
+
+    start = time.perf_counter()
+    index = SeriesDateIndex(data)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        index.comparisons(10000.0, period)
+    lookup_ms = (time.perf_counter() - start) / repeat * 1000
+
+    print(f"履歴{days}日, 予測{period}日の前年比（{repeat}回の平均）:")
+    print(f"  全行の走査      : {scan_ms:8.3f}ms/回")
+    print(f"  インデックス作成: {build_ms:8.3f}ms（データのバージョンごとに1回）")
+    print(f"  インデックス参照: {lookup_ms:8.3f}ms/回  ({scan_ms / lookup_ms:.0f}倍)")
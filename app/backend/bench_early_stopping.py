@@ -0,0 +1,66 @@
+"""
+検証用の分割・早期終了・学習率の調整による学習時間と精度の変化を計測するベンチマーク
+
+サンプルデータ（1年分）の最後の30日を除いて、同じパラメータ（PARAMS）で次の2つの方法で学習し、
+学習時間・実行したエポック数・除いた30日間の予測の誤差（MAPE）を、乱数のシードを変えて比較する。
+  - 従来どおり指定したエポック数をすべて学習する（検証用の分割・早期終了・学習率の調整なし）
+  - 最後の2割のウィンドウを検証用に分け、早期終了と学習率の調整を行う（既定の設定）
+使い方: python app/backend/bench_early_stopping.py [シード数]
+"""
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import torch
+
+import server
+from app.backend.database import sales_by_series
+from app.models.lstm_model import DemandForecaster
+
+HOLDOUT_DAYS = 30
+
+# 以前の自動設定モードがサンプルデータ（200-1000行）に使っていたパラメータ
+PARAMS = {'epochs': 100, 'hidden_layers': 3, 'hidden_units': 128, 'batch_size': 32}
+
+# 従来の学習（検証用の分割・早期終了・学習率の調整をすべて無効にする）
+FIXED_EPOCHS = {'validation_split': 0, 'early_stopping_patience': None, 'lr_patience': None}
+
+
+def _run(rows, holdout, params, config, seed):
+    torch.manual_seed(seed)
+    forecaster = DemandForecaster(config=dict(config, hidden_layers=params['hidden_layers'],
+                                              hidden_units=params['hidden_units']))
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = forecaster.train(rows, epochs=params['epochs'], batch_size=params['batch_size'])
+    seconds = time.perf_counter() - start
+    actual = np.array([row[1] for row in holdout])
+    predicted = forecaster.predict(rows, len(holdout))
+    return seconds, len(result['epoch_losses']), float(np.mean(np.abs((actual - predicted) / actual)) * 100)
+
+
+if __name__ == '__main__':
+    seeds = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        server.DB_PATH = os.path.join(tmp_dir, 'bench.db')
+        with contextlib.redirect_stdout(io.StringIO()):
+            server.init_database()
+            np.random.seed(0)  # サンプルデータのノイズを毎回同じにする
+            server.generate_sample_data()
+        rows = next(iter(sales_by_series(server.get_database()).values()))
+        server.get_database().close()
+
+    params = PARAMS
+    rows, holdout = rows[:-HOLDOUT_DAYS], rows[-HOLDOUT_DAYS:]
+    print(f"サンプルデータ {len(rows)}日分（最大 {params['epochs']}エポック, 隠れ層 {params['hidden_layers']}, "
+          f"隠れユニット {params['hidden_units']}, バッチサイズ {params['batch_size']}）, 直後の{HOLDOUT_DAYS}日間で評価:")
+    for label, config in (('全エポック', FIXED_EPOCHS), ('早期終了', {})):
+        results = np.array([_run(rows, holdout, params, config, seed) for seed in range(seeds)])
+        seconds, epochs, mape = results.mean(axis=0)
+        print(f"  {label}: 平均 {seconds:6.1f}秒, {epochs:5.1f}エポック, MAPE {mape:5.2f}% "
+              f"(シードごと: {', '.join(f'{value:.2f}%' for value in results[:, 2])})")
@@ -0,0 +1,71 @@
+"""
+新しいデータを追加したときの、全期間での再学習と追加学習（ファインチューニング）を比較するベンチマーク
+
+全期間のデータで学習したモデルに1週間分のデータを追加し、次の2つの方法で学習し直したときの
+学習時間と、その後の14日間（学習に使っていない期間）の予測の誤差（MAPE）を表示する。
+  - 全期間で学習し直す（新しいモデルを同じエポック数で学習する）
+  - 保存したモデルを読み込み、直近のウィンドウ + 過去から無作為に選んだウィンドウで追加学習する
+使い方: python app/backend/bench_fine_tune.py [系列の日数] [全期間の学習のエポック数]
+"""
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+import server
+from app.models.lstm_model import FINE_TUNE_EPOCHS, DemandForecaster
+
+HOLDOUT_DAYS = 14
+NEW_DAYS = 7
+
+
+def _series(days):
+    rng = np.random.default_rng(0)
+    t = np.arange(days)
+    sales = 100 + 0.05 * t + 20 * np.sin(2 * np.pi * t / 7) + 10 * np.sin(2 * np.pi * t / 365) + rng.normal(0, 3, days)
+    dates = np.arange(np.datetime64('2022-01-01'), np.datetime64('2022-01-01') + days).astype(str)
+    return [(str(date), float(value)) for date, value in zip(dates, sales)]
+
+
+def _mape(forecaster, rows, actual):
+    predicted = forecaster.predict(rows, len(actual))
+    actual = np.array([row[1] for row in actual])
+    return float(np.mean(np.abs((actual - predicted) / actual)) * 100)
+
+
+if __name__ == '__main__':
+    days = int(sys.argv[1]) if len(sys.argv) > 1 else 1095
+    epochs = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+
+    rows = _series(days + NEW_DAYS + HOLDOUT_DAYS)
+    base_rows, updated_rows, holdout = rows[:days], rows[:days + NEW_DAYS], rows[days + NEW_DAYS:]
+
+    with tempfile.TemporaryDirectory() as tmp_dir, contextlib.redirect_stdout(io.StringIO()):
+        model_file = os.path.join(tmp_dir, 'base.fcm')
+        base = DemandForecaster()
+        base.train(base_rows, epochs=epochs)
+        base.save_model(model_file)
+
+        start = time.perf_counter()
+        full = DemandForecaster()
+        full.train(updated_rows, epochs=epochs)
+        full_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        tuned = DemandForecaster(model_file)
+        tuned.fine_tune(updated_rows)
+        tune_seconds = time.perf_counter() - start
+
+        base_mape = _mape(base, updated_rows, holdout)
+        full_mape = _mape(full, updated_rows, holdout)
+        tune_mape = _mape(tuned, updated_rows, holdout)
+
+    print(f"{days}日分で学習したモデルに{NEW_DAYS}日分を追加（その後{HOLDOUT_DAYS}日間の予測誤差で比較）:")
+    print(f"  学習し直さない               : {'-':>7}   , MAPE {base_mape:5.2f}%")
+    print(f"  全期間で再学習 ({epochs:3d}エポック): {full_seconds:7.2f}秒, MAPE {full_mape:5.2f}%")
+    print(f"  追加学習       ({FINE_TUNE_EPOCHS:3d}エポック): {tune_seconds:7.2f}秒, MAPE {tune_mape:5.2f}% "
+          f"({full_seconds / tune_seconds:.0f}倍速, {full_seconds - tune_seconds:.1f}秒短縮)")
@@ -0,0 +1,76 @@
+"""
+予測結果キャッシュの効果を計測するベンチマーク
+
+ダッシュボードの再読み込みを想定して同じ /api/predict を繰り返し呼び出し、
+キャッシュなし（毎回計算）とキャッシュありのレイテンシ、ヒット率を表示する。
+使い方: python app/backend/bench_forecast_cache.py [系列数] [繰り返し回数]
+"""
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+
+import numpy as np
+
+import server
+from app.backend.forecast_cache import ForecastCache
+
+
+def _import_series(series_count, days=730):
+    dates = np.arange(np.datetime64('2023-01-01'), np.datetime64('2023-01-01') + days).astype(str)
+    lines = ['series,date,sales']
+    for k in range(series_count):
+        sales = (100 + k) * (1 + 0.3 * np.sin(np.arange(days) / 7)) + np.random.randn(days)
+        lines.extend(f"S{k:04d},{date},{value:.2f}" for date, value in zip(dates, sales))
+    server.import_sales(server.get_database(), io.StringIO('\n'.join(lines)), mode='append')
+    return [f"S{k:04d}" for k in range(series_count)]
+
+
+def _refresh_ms(url, payload, repeat):
+    timings = []
+    for _ in range(repeat):
+        request = urllib.request.Request(url, data=json.dumps(payload).encode(),
+                                         headers={'Content-Type': 'application/json'})
+        start = time.perf_counter()
+        with urllib.request.urlopen(request) as response:
+            response.read()
+        timings.append((time.perf_counter() - start) * 1000)
+    return float(np.median(timings))
+
+
+if __name__ == '__main__':
+    series_count = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        server.DB_PATH = os.path.join(tmp_dir, 'bench.db')
+        with contextlib.redirect_stdout(io.StringIO()):
+            server.init_database()
+            series_ids = _import_series(series_count)
+
+        httpd = server.create_server(0)
+        url = f"http://localhost:{httpd.server_address[1]}/api/predict"
+        threading.Thread(target=httpd.serve_forever, daemon=True).start()
+        payload = {'seriesIds': series_ids, 'period': 90}
+
+        try:
+            with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+                server.FORECAST_CACHE = ForecastCache(max_entries=0)
+                uncached_ms = _refresh_ms(url, payload, repeat)
+                server.FORECAST_CACHE = ForecastCache()
+                cached_ms = _refresh_ms(url, payload, repeat)
+            stats = server.FORECAST_CACHE.stats()
+        finally:
+            httpd.shutdown()
+            httpd.server_close()
+            server.get_database().close()
+
+        print(f"{series_count}系列 × 90日の予測を{repeat}回（p50）:")
+        print(f"  キャッシュなし: {uncached_ms:8.2f}ms")
+        print(f"  キャッシュあり: {cached_ms:8.2f}ms  ({uncached_ms / cached_ms:.1f}倍)")
+        print(f"  ヒット率: {stats['hitRate']:.1%} (ヒット {stats['hits']}, ミス {stats['misses']})")
@@ -0,0 +1,83 @@
+"""
+90日先までの予測（DemandForecaster.predict）のレイテンシを計測するベンチマーク
+
+- 従来方式: 1日ずつ順伝播し、毎回テンソルを作って np.append で系列を伸ばす
+- 自己回帰（horizon=1）: 事前に確保したバッファ上でウィンドウをずらして順伝播する
+- 複数日出力（horizon=90）: 1回の順伝播で90日分を出力する
+あわせて、複数系列をまとめて予測する predict_batch と系列ごとの predict を比較する。
+使い方: python app/backend/bench_forecast_horizon.py [予測日数] [系列数]
+"""
+import sys
+import time
+
+import numpy as np
+import torch
+
+import server  # app パッケージを import できるようにする
+from app.models.lstm_model import DemandForecaster
+
+
+def legacy_predict(forecaster, sales_data, prediction_days):
+    """従来の DemandForecaster.predict と同じ方法で予測する"""
+    forecaster.model.eval()
+    sequence_length = forecaster.config['sequence_length']
+    latest_sequence = np.array([float(row[1]) for row in sales_data[-sequence_length:]])
+    latest_sequence_scaled = forecaster.scaler.transform(latest_sequence.reshape(-1, 1))
+
+    predictions = []
+    current_sequence = latest_sequence_scaled.flatten()
+    with torch.no_grad():
+        for _ in range(prediction_days):
+            x = torch.FloatTensor(current_sequence[-sequence_length:].reshape(1, -1, 1)).to(forecaster.device)
+            predicted = forecaster.model(x)
+            predictions.append(predicted.cpu().numpy()[0, 0])
+            current_sequence = np.append(current_sequence, predicted.cpu().numpy()[0, 0])
+
+    return forecaster.scaler.inverse_transform(np.array(predictions).reshape(-1, 1)).flatten()
+
+
+def _median_ms(fn, repeat=30):
+    fn()  # ウォームアップ
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return float(np.median(timings))
+
+
+def _forecaster(horizon, sales_data):
+    forecaster = DemandForecaster(config={'horizon': horizon})
+    forecaster.scaler.fit(np.array([row[1] for row in sales_data]).reshape(-1, 1))
+    return forecaster
+
+
+if __name__ == '__main__':
+    prediction_days = int(sys.argv[1]) if len(sys.argv) > 1 else 90
+    series_count = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+
+    torch.manual_seed(0)
+    sales_data = [(str(i), 1000 + 100 * np.sin(i / 7)) for i in range(365)]
+    series_list = [[(row[0], row[1] * (1 + k / series_count)) for row in sales_data] for k in range(series_count)]
+
+    recursive = _forecaster(1, sales_data)
+    direct = _forecaster(prediction_days, sales_data)
+
+    # 新しい自己回帰の経路が従来方式と同じ結果になることを確認
+    assert np.allclose(legacy_predict(recursive, sales_data, prediction_days),
+                       recursive.predict(sales_data, prediction_days), rtol=1e-4)
+
+    legacy_ms = _median_ms(lambda: legacy_predict(recursive, sales_data, prediction_days))
+    recursive_ms = _median_ms(lambda: recursive.predict(sales_data, prediction_days))
+    direct_ms = _median_ms(lambda: direct.predict(sales_data, prediction_days))
+
+    print(f"{prediction_days}日先までの予測（1系列, p50）")
+    print(f"  従来方式                : {legacy_ms:8.2f}ms")
+    print(f"  自己回帰（バッファ確保）: {recursive_ms:8.2f}ms  ({legacy_ms / recursive_ms:.1f}倍)")
+    print(f"  複数日出力（horizon={prediction_days}）: {direct_ms:8.2f}ms  ({legacy_ms / direct_ms:.1f}倍)")
+
+    for name, forecaster in (('自己回帰', recursive), ('複数日出力', direct)):
+        loop_ms = _median_ms(lambda: [forecaster.predict(series, prediction_days) for series in series_list], repeat=5)
+        batch_ms = _median_ms(lambda: forecaster.predict_batch(series_list, prediction_days), repeat=5)
+        print(f"{series_count}系列 {name}: 系列ごと={loop_ms:8.2f}ms  predict_batch={batch_ms:8.2f}ms  "
+              f"({loop_ms / batch_ms:.1f}倍)")
@@ -0,0 +1,85 @@
+"""
+自動設定モードの設定の探索（Hyperband）の時間と精度を計測するベンチマーク
+
+サンプルデータ（1年分。ノイズを変えて複数通り作る）の最後の30日を除いたデータで、
+以前の自動設定モードの固定の設定で学習した場合と、Hyperband で設定を探索した場合の
+学習時間と、除いた30日間の予測の誤差（MAPE）を比較する。
+使い方: python app/backend/bench_hyperparameter_search.py [データの数] [ワーカー数]
+"""
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import torch
+
+import server
+from app.backend.database import sales_by_series
+from app.backend.hyperparameter_search import hyperband_search, search_budget
+from app.models.lstm_model import DemandForecaster
+
+HOLDOUT_DAYS = 30
+
+# 以前の自動設定モードがサンプルデータ（200-1000行）に使っていた固定の設定
+FIXED_PARAMS = {'epochs': 100, 'hidden_layers': 3, 'hidden_units': 128, 'batch_size': 32}
+
+
+def _mape(forecaster, rows, holdout):
+    actual = np.array([row[1] for row in holdout])
+    predicted = forecaster.predict(rows, len(holdout))
+    return float(np.mean(np.abs((actual - predicted) / actual)) * 100)
+
+
+def _compare(tmp_dir, data_seed, workers):
+    """ノイズのシードが data_seed のサンプルデータで、固定の設定と探索を比べる"""
+    server.DB_PATH = os.path.join(tmp_dir, f"bench-{data_seed}.db")
+    with contextlib.redirect_stdout(io.StringIO()):
+        server.init_database()
+        np.random.seed(data_seed)
+        server.generate_sample_data()
+    database = server.get_database()
+    rows = next(iter(sales_by_series(database).values()))
+    rows, holdout = rows[:-HOLDOUT_DAYS], rows[-HOLDOUT_DAYS:]
+    # 評価する期間は学習に使わない
+    with database.transaction() as conn:
+        conn.execute("DELETE FROM sales_data WHERE date > ?", (rows[-1][0],))
+    database.close()
+
+    torch.manual_seed(data_seed)
+    start = time.perf_counter()
+    fixed = DemandForecaster(config={'hidden_layers': FIXED_PARAMS['hidden_layers'],
+                                     'hidden_units': FIXED_PARAMS['hidden_units']})
+    with contextlib.redirect_stdout(io.StringIO()):
+        fixed.train(rows, epochs=FIXED_PARAMS['epochs'], batch_size=FIXED_PARAMS['batch_size'])
+    fixed_seconds = time.perf_counter() - start
+
+    budget = search_budget(len(rows))
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = hyperband_search(server.DB_PATH, os.path.join(tmp_dir, f"trials-{data_seed}"), workers=workers,
+                                  max_epochs=budget['max_epochs'], min_epochs=budget['min_epochs'],
+                                  eta=budget['eta'], batch_size=budget['batch_size'], seed=data_seed)
+        searched = DemandForecaster(result['best']['checkpoint'])
+    return (fixed_seconds, _mape(fixed, rows, holdout), result['seconds'], _mape(searched, rows, holdout)), result
+
+
+if __name__ == '__main__':
+    data_count = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else None
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        results = []
+        for data_seed in range(data_count):
+            values, result = _compare(tmp_dir, data_seed, workers)
+            results.append(values)
+            print(f"  データ {data_seed}: 固定 MAPE {values[1]:5.2f}%, 探索 MAPE {values[3]:5.2f}% "
+                  f"選ばれた設定 {result['best']['config']} ({result['best']['epochs']}エポック)")
+        fixed_seconds, fixed_mape, search_seconds, search_mape = np.mean(results, axis=0)
+
+    print(f"サンプルデータ {data_count}通りの平均（直後の{HOLDOUT_DAYS}日間で評価）:")
+    print(f"  固定の設定 (隠れ層 {FIXED_PARAMS['hidden_layers']}, 隠れユニット {FIXED_PARAMS['hidden_units']}, "
+          f"最大 {FIXED_PARAMS['epochs']}エポック): {fixed_seconds:6.1f}秒, MAPE {fixed_mape:5.2f}%")
+    print(f"  Hyperband ({result['trials']}試行, 計{result['trialEpochs']}エポック, ワーカー {result['workers']}): "
+          f"{search_seconds:6.1f}秒, MAPE {search_mape:5.2f}%")
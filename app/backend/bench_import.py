@@ -0,0 +1,77 @@
+"""
+CSVストリーミング取り込み（POST /api/data/import, text/csv）のスループットを計測するベンチマーク
+
+使い方: python app/backend/bench_import.py [行数]
+"""
+import contextlib
+import http.client
+import io
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+
+import numpy as np
+
+import server
+
+
+def write_csv(path, rows):
+    """rows 行の日次売上CSVを作成する"""
+    start = date(2025, 1, 1) - timedelta(days=rows)
+    sales = np.abs(1000 + 200 * np.random.randn(rows))
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('日付,売上,特徴量\n')
+        for i in range(rows):
+            f.write(f"{(start + timedelta(days=i)).isoformat()},{sales[i]:.2f},通常営業\n")
+
+
+def post_csv(port, path):
+    """CSVファイルをメモリに読み込まずにアップロードする"""
+    conn = http.client.HTTPConnection('localhost', port, timeout=600)
+    with open(path, 'rb') as body:
+        conn.request('POST', '/api/data/import', body=body, headers={
+            'Content-Type': 'text/csv; charset=utf-8',
+            'Content-Length': str(os.path.getsize(path))
+        })
+        response = conn.getresponse()
+        result = json.loads(response.read())
+    conn.close()
+    return result
+
+
+if __name__ == '__main__':
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 500000
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        server.DB_PATH = os.path.join(tmp_dir, 'bench.db')
+        server.init_database()
+
+        csv_path = os.path.join(tmp_dir, 'sales.csv')
+        write_csv(csv_path, rows)
+        size_mb = os.path.getsize(csv_path) / 1024 / 1024
+
+        httpd = server.create_server(0)
+        threading.Thread(target=httpd.serve_forever, daemon=True).start()
+
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+            result = post_csv(httpd.server_address[1], csv_path)
+        elapsed = time.perf_counter() - start
+
+        httpd.shutdown()
+        httpd.server_close()
+        server.get_database().close()
+
+    summary = result['summary']
+    print(f"CSV: {rows}行 ({size_mb:.1f}MB)")
+    print(f"取り込み: {summary['rows']}行, 不正な行: {summary['rejected']}, 期間: {summary['dateRange']}")
+    print(f"所要時間: {elapsed:.2f}秒, スループット: {summary['rows'] / elapsed:,.0f} rows/s")
+    try:
+        import resource
+        print(f"プロセスの最大常駐メモリ: {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.1f}MB")
+    except ImportError:
+        pass  # Windowsでは計測しない
@@ -0,0 +1,83 @@
+"""
+系列ごとのモデルの登録簿と LRU キャッシュの効果を計測するベンチマーク
+
+多数の系列ごとのモデルを1つのファイルにまとめて登録し、アクセスが一部の系列に偏った
+（Zipf 分布の）予測リクエストを繰り返したときの、メモリの上限ごとのヒット率と
+1リクエストあたりのモデルの取得時間（登録簿の検索 + 必要なら読み込み。予測自体は含まない）を表示する。
+使い方: python app/backend/bench_model_registry.py [モデル数] [リクエスト数]
+"""
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+import server
+from app.backend.model_registry import ModelRegistry, register_models
+from app.models.artifact import pack_artifacts
+from app.models.lstm_model import DemandForecaster
+
+
+def _save_models(model_dir, model_count):
+    """重みはランダムのままで系列ごとのモデルを保存し、1つのファイルにまとめる"""
+    forecaster = DemandForecaster()
+    forecaster.scaler.fit([[0.0], [100.0]])
+    sources = {}
+    with contextlib.redirect_stdout(io.StringIO()):
+        for k in range(model_count):
+            forecaster.model = forecaster._build_model()
+            path = os.path.join(model_dir, f"S{k:05d}.fcm")
+            forecaster.save_model(path)
+            sources[f"S{k:05d}"] = (path, None)
+    packed_file = os.path.join(model_dir, 'series.fcm')
+    pack_artifacts(packed_file, sources)
+    return packed_file, forecaster.config
+
+
+def _run(registry, requests):
+    timings = []
+    for series_id in requests:
+        start = time.perf_counter()
+        registry.forecasters_for(server.get_database(), [series_id])
+        timings.append((time.perf_counter() - start) * 1000)
+    return float(np.median(timings)), float(np.percentile(timings, 99))
+
+
+if __name__ == '__main__':
+    model_count = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    request_count = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        server.DB_PATH = os.path.join(tmp_dir, 'bench.db')
+        with contextlib.redirect_stdout(io.StringIO()):
+            server.init_database()
+        packed_file, config = _save_models(tmp_dir, model_count)
+        series_ids = [f"S{k:05d}" for k in range(model_count)]
+        register_models(server.get_database(), [
+            {'series_id': series_id, 'model_file': packed_file, 'model_name': series_id, 'config': config}
+            for series_id in series_ids
+        ])
+
+        # アクセスは一部の系列に偏る（Zipf 分布）
+        rng = np.random.default_rng(0)
+        ranks = np.minimum(rng.zipf(1.2, request_count), model_count) - 1
+        requests = [series_ids[rank] for rank in ranks]
+
+        model_bytes = ModelRegistry()
+        with contextlib.redirect_stdout(io.StringIO()):
+            model_bytes.forecasters_for(server.get_database(), series_ids[:1])
+        model_size = model_bytes.stats()['bytes']
+
+        print(f"{model_count}モデル（1モデル {model_size / 1024:.0f}KB）, {request_count}リクエスト（Zipf 分布）:")
+        for fraction in (1.0, 0.25, 0.05):
+            registry = ModelRegistry(memory_budget=int(model_size * model_count * fraction))
+            with contextlib.redirect_stdout(io.StringIO()):
+                p50, p99 = _run(registry, requests)
+            stats = registry.stats()
+            print(f"  メモリ上限 {fraction:4.0%} ({stats['memoryBudget'] / 1024 / 1024:5.1f}MB): "
+                  f"ヒット率 {stats['hitRate']:6.1%}, 取得時間 p50 {p50:6.3f}ms, p99 {p99:6.3f}ms, "
+                  f"破棄 {stats['evictions']}")
+        server.get_database().close()
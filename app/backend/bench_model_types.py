@@ -0,0 +1,71 @@
+"""
+モデルタイプ（LSTM / GRU / TCN / Transformer）ごとの学習スループットと推論時間を計測するベンチマーク
+
+サンプルデータ（1年分）の最後の30日を除いたデータで、同じ構造の大きさ（隠れ層・隠れユニット数）で
+各モデルタイプを学習し、1秒あたりに学習したウィンドウ数、1系列の30日予測の時間、
+多数の系列をまとめた30日予測の時間、除いた30日間の予測の誤差（MAPE）をCPUで比較する。
+使い方: python app/backend/bench_model_types.py [エポック数] [まとめて予測する系列数]
+"""
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import torch
+
+import server
+from app.backend.database import sales_by_series
+from app.models.lstm_model import MODEL_TYPES, DemandForecaster
+
+HOLDOUT_DAYS = 30
+CONFIG = {'hidden_layers': 2, 'hidden_units': 64, 'sequence_length': 14}
+
+
+def _best_of(fn, repeat=5):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+if __name__ == '__main__':
+    epochs = int(sys.argv[1]) if len(sys.argv) > 1 else 30
+    batch_series = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        server.DB_PATH = os.path.join(tmp_dir, 'bench.db')
+        with contextlib.redirect_stdout(io.StringIO()):
+            server.init_database()
+            np.random.seed(0)  # サンプルデータのノイズを毎回同じにする
+            server.generate_sample_data()
+        rows = next(iter(sales_by_series(server.get_database()).values()))
+        server.get_database().close()
+
+    rows, holdout = rows[:-HOLDOUT_DAYS], rows[-HOLDOUT_DAYS:]
+    actual = np.array([row[1] for row in holdout])
+    windows = len(rows) - CONFIG['sequence_length']
+    print(f"サンプルデータ {len(rows)}日分, {epochs}エポック, 隠れ層 {CONFIG['hidden_layers']}, "
+          f"隠れユニット {CONFIG['hidden_units']}, 入力日数 {CONFIG['sequence_length']}, "
+          f"スレッド数 {torch.get_num_threads()}:")
+    print(f"  {'モデル':<12}{'学習(ウィンドウ/秒)':>18}{'1系列の予測(ms)':>16}"
+          f"{f'{batch_series}系列の予測(ms)':>20}{'MAPE':>9}")
+    for model_type in MODEL_TYPES:
+        torch.manual_seed(0)
+        forecaster = DemandForecaster(config=dict(CONFIG, model_type=model_type))
+        # 早期終了せずに指定したエポック数を学習した時間で比べる
+        forecaster.config['early_stopping_patience'] = None
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            forecaster.train(rows, epochs=epochs, batch_size=32)
+        throughput = windows * epochs / (time.perf_counter() - start)
+
+        single = _best_of(lambda: forecaster.predict(rows, HOLDOUT_DAYS))
+        batch = _best_of(lambda: forecaster.predict_batch([rows] * batch_series, HOLDOUT_DAYS), repeat=3)
+        predicted = forecaster.predict(rows, HOLDOUT_DAYS)
+        mape = float(np.mean(np.abs((actual - predicted) / actual)) * 100)
+        print(f"  {model_type:<12}{throughput:>18.0f}{single * 1000:>16.1f}{batch * 1000:>20.1f}{mape:>8.2f}%")
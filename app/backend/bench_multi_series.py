@@ -0,0 +1,84 @@
+"""
+複数系列の予測を、系列ごとの /api/predict 呼び出しと seriesIds による一括呼び出しで比較するベンチマーク
+
+全系列で1つのモデルを学習（1エポック）してから、同じ系列の予測にかかる時間を計測する。
+使い方: python app/backend/bench_multi_series.py [系列数] [予測日数]
+"""
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+
+import numpy as np
+
+import server
+from app.backend.csv_import import import_csv
+from app.backend.training import run_training
+
+
+def _import_series(series_count, days=365):
+    """series_count 系列 × days 日の売上を取り込む"""
+    dates = np.arange(np.datetime64('2024-01-01'), np.datetime64('2024-01-01') + days).astype(str)
+    lines = ['series,date,sales']
+    for k in range(series_count):
+        sales = (100 + k) * (1 + 0.3 * np.sin(np.arange(days) / 7)) + np.random.randn(days)
+        lines.extend(f"S{k:05d},{date},{value:.2f}" for date, value in zip(dates, sales))
+    import_csv(server.get_database(), io.StringIO('\n'.join(lines)), mode='append')
+    return [f"S{k:05d}" for k in range(series_count)]
+
+
+def _post(url, payload):
+    request = urllib.request.Request(url, data=json.dumps(payload).encode(), headers={'Content-Type': 'application/json'})
+    with urllib.request.urlopen(request) as response:
+        return json.loads(response.read())
+
+
+if __name__ == '__main__':
+    series_count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    period = int(sys.argv[2]) if len(sys.argv) > 2 else 30
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        server.DB_PATH = os.path.join(tmp_dir, 'bench.db')
+        server.MODEL_FILE = os.path.join(tmp_dir, 'saved', 'demand_forecaster.fcm')
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            server.init_database()
+            series_ids = _import_series(series_count)
+            result = run_training({
+                'epochs': 1,
+                'batch_size': 256,
+                'config': {},
+                'db_path': server.DB_PATH,
+                'model_file': server.MODEL_FILE
+            }, lambda epoch, epochs, avg_loss: None)
+            server.load_forecaster()
+        print(f"学習: {result['trainedSeries']}系列 {result['trainedRows']}件, {result['trainingSeconds']:.1f}秒")
+
+        httpd = server.create_server(0)
+        url = f"http://localhost:{httpd.server_address[1]}/api/predict"
+        threading.Thread(target=httpd.serve_forever, daemon=True).start()
+
+        try:
+            with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+                start = time.perf_counter()
+                for series_id in series_ids:
+                    _post(url, {'seriesId': series_id, 'period': period, 'historyDays': 30})
+                round_trips = time.perf_counter() - start
+
+                start = time.perf_counter()
+                response = _post(url, {'seriesIds': series_ids, 'period': period, 'historyDays': 30})
+                batched = time.perf_counter() - start
+            assert len(response['series']) == series_count
+        finally:
+            httpd.shutdown()
+            httpd.server_close()
+            server.get_database().close()
+
+        print(f"{series_count}系列 × {period}日の予測:")
+        print(f"  系列ごとに呼び出し: {round_trips * 1000:8.1f}ms")
+        print(f"  seriesIds で一括  : {batched * 1000:8.1f}ms  ({round_trips / batched:.1f}倍)")
@@ -0,0 +1,63 @@
+"""
+系列ごとの並列学習（train_series_parallel）のスループットを計測するベンチマーク
+
+ワーカー数を 1, 2, 4, ... コア数 と変えて、1分あたりに学習できる系列数と
+1ワーカーに対する速度向上（理想はワーカー数倍）を表示する。
+使い方: python app/backend/bench_parallel_training.py [系列数] [エポック数]
+"""
+import contextlib
+import io
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+import server
+from app.backend.csv_import import import_csv
+from app.backend.parallel_training import available_cores, train_series_parallel
+
+
+def _import_series(series_count, days=365):
+    dates = np.arange(np.datetime64('2024-01-01'), np.datetime64('2024-01-01') + days).astype(str)
+    lines = ['series,date,sales']
+    for k in range(series_count):
+        sales = (100 + k) * (1 + 0.3 * np.sin(np.arange(days) / 7)) + np.random.randn(days)
+        lines.extend(f"S{k:05d},{date},{value:.2f}" for date, value in zip(dates, sales))
+    import_csv(server.get_database(), io.StringIO('\n'.join(lines)), mode='append')
+
+
+def _worker_counts(cores):
+    counts = []
+    workers = 1
+    while workers < cores:
+        counts.append(workers)
+        workers *= 2
+    return counts + [cores]
+
+
+if __name__ == '__main__':
+    series_count = int(sys.argv[1]) if len(sys.argv) > 1 else 32
+    epochs = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    cores = available_cores()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        server.DB_PATH = os.path.join(tmp_dir, 'bench.db')
+        with contextlib.redirect_stdout(io.StringIO()):
+            server.init_database()
+            _import_series(series_count)
+        server.get_database().close()
+
+        print(f"{series_count}系列 × 365日, {epochs}エポック, 使用可能なコア数={cores}")
+        baseline = None
+        for workers in _worker_counts(cores):
+            with contextlib.redirect_stdout(io.StringIO()):
+                result = train_series_parallel(
+                    server.DB_PATH, os.path.join(tmp_dir, f'models-{workers}'),
+                    epochs=epochs, series_ids=[f"S{k:05d}" for k in range(series_count)],
+                    workers=workers
+                )
+            baseline = baseline or result['seriesPerMinute']
+            speedup = result['seriesPerMinute'] / baseline
+            print(f"  ワーカー数={workers:>3} (スレッド数/ワーカー={result['threadsPerWorker']}): "
+                  f"{result['seriesPerMinute']:8.1f}系列/分  速度向上={speedup:.2f}倍 (効率 {speedup / workers:.0%})")
@@ -0,0 +1,95 @@
+"""
+/api/predict/batch のスループットを計測するベンチマーク
+
+同じ予測リクエスト（系列ごとに予測日数が異なる）を、/api/predict を1件ずつ呼び出した場合と
+/api/predict/batch で1回にまとめた場合とで処理し、1秒あたりの予測件数を比較する。
+簡易予測と、全系列のモデル（重みはランダム）で予測する場合の両方を計測する。
+キャッシュは無効にして計測する。
+使い方: python app/backend/bench_predict_batch.py [系列数]
+"""
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+
+import numpy as np
+
+import server
+from app.backend.forecast_cache import ForecastCache
+
+
+def _import_series(series_count, days=400):
+    dates = np.arange(np.datetime64('2024-01-01'), np.datetime64('2024-01-01') + days).astype(str)
+    lines = ['series,date,sales']
+    for k in range(series_count):
+        sales = (100 + k) * (1 + 0.3 * np.sin(np.arange(days) / 7)) + np.random.randn(days)
+        lines.extend(f"S{k:05d},{date},{value:.2f}" for date, value in zip(dates, sales))
+    server.import_sales(server.get_database(), io.StringIO('\n'.join(lines)), mode='append')
+
+
+def _post(url, payload):
+    request = urllib.request.Request(url, data=json.dumps(payload).encode(),
+                                     headers={'Content-Type': 'application/json'})
+    with urllib.request.urlopen(request) as response:
+        return json.loads(response.read())
+
+
+def _sequential(base_url, requests):
+    start = time.perf_counter()
+    for item in requests:
+        _post(f"{base_url}/api/predict", item)
+    return len(requests) / (time.perf_counter() - start)
+
+
+def _batched(base_url, requests):
+    start = time.perf_counter()
+    results = _post(f"{base_url}/api/predict/batch", {'requests': requests})['results']
+    assert len(results) == len(requests)
+    return len(requests) / (time.perf_counter() - start)
+
+
+if __name__ == '__main__':
+    series_count = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        server.DB_PATH = os.path.join(tmp_dir, 'bench.db')
+        server.MODEL_FILE = os.path.join(tmp_dir, 'saved', 'demand_forecaster.fcm')
+        server.FORECAST_CACHE = ForecastCache(max_entries=0)
+        with contextlib.redirect_stdout(io.StringIO()):
+            server.init_database()
+            _import_series(series_count)
+
+        httpd = server.create_server(0)
+        base_url = f"http://localhost:{httpd.server_address[1]}"
+        threading.Thread(target=httpd.serve_forever, daemon=True).start()
+
+        rng = np.random.default_rng(0)
+        requests = [
+            {'seriesId': f"S{k:05d}", 'period': int(period), 'historyDays': 60}
+            for k, period in enumerate(rng.choice([7, 14, 30, 90], series_count))
+        ]
+
+        try:
+            print(f"{series_count}件の予測リクエスト（予測日数 7〜90日）:")
+            for label in ('簡易予測', 'LSTM'):
+                if label == 'LSTM':
+                    from app.models.lstm_model import DemandForecaster
+                    forecaster = DemandForecaster()
+                    forecaster.scaler.fit([[0.0], [1000.0]])
+                    with contextlib.redirect_stdout(io.StringIO()):
+                        forecaster.save_model(server.MODEL_FILE)
+                        server.load_forecaster()
+                with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+                    sequential = _sequential(base_url, requests)
+                    batched = _batched(base_url, requests)
+                print(f"  {label}: 1件ずつ {sequential:8.1f}件/秒, まとめて {batched:8.1f}件/秒 "
+                      f"({batched / sequential:.1f}倍)")
+        finally:
+            httpd.shutdown()
+            httpd.server_close()
+            server.get_database().close()
@@ -0,0 +1,87 @@
+"""
+履歴データの件数に対する /api/predict のレイテンシを計測するベンチマーク
+
+日付インデックスと直近N件の取得により、件数が増えてもレイテンシが
+ほぼ一定であることを確認する。比較として従来の全件 ORDER BY の取得時間も表示する。
+使い方: python app/backend/bench_predict_history.py [件数...]
+"""
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from datetime import date, timedelta
+
+import numpy as np
+
+import server
+
+
+def _fill_sales(rows):
+    """rows 件の日次データを投入する"""
+    start = date(2025, 1, 1) - timedelta(days=rows)
+    sales = 1000 + 100 * np.random.randn(rows)
+    with server.get_database().transaction() as conn:
+        conn.execute("DELETE FROM sales_data")
+        conn.executemany(
+            "INSERT INTO sales_data (date, sales, features) VALUES (?, ?, NULL)",
+            (((start + timedelta(days=i)).isoformat(), float(sales[i])) for i in range(rows))
+        )
+
+
+def _median_ms(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return float(np.median(timings))
+
+
+def run_benchmark(rows, repeat=20):
+    _fill_sales(rows)
+
+    httpd = server.create_server(0)
+    url = f"http://localhost:{httpd.server_address[1]}/api/predict"
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+
+    def predict():
+        request = urllib.request.Request(
+            url,
+            data=json.dumps({'period': 30}).encode(),
+            headers={'Content-Type': 'application/json'}
+        )
+        with urllib.request.urlopen(request) as response:
+            response.read()
+
+    def full_scan():
+        server.get_database().query("SELECT date, sales FROM sales_data ORDER BY date")
+
+    try:
+        with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+            predict_ms = _median_ms(predict, repeat)
+        full_scan_ms = _median_ms(full_scan, max(1, repeat // 4))
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
+
+    return predict_ms, full_scan_ms
+
+
+if __name__ == '__main__':
+    sizes = [int(arg) for arg in sys.argv[1:]] or [1000, 10000, 100000, 500000]
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        server.DB_PATH = os.path.join(tmp_dir, 'bench.db')
+        server.init_database()
+
+        for rows in sizes:
+            predict_ms, full_scan_ms = run_benchmark(rows)
+            print(f"{rows:>8}件: /api/predict p50={predict_ms:.1f}ms "
+                  f"(参考: 全件ORDER BY取得={full_scan_ms:.1f}ms)")
+
+        server.get_database().close()
@@ -0,0 +1,92 @@
+"""
+バックエンドの起動時間を計測するベンチマーク
+
+Electron と同じように server.py を別プロセスとして起動し、起動から
+/api/test が最初に 200 を返すまでの時間と、/api/ready（起動時の準備の完了）までの時間を表示する。
+参考として、以前は起動時に読み込んでいた pandas / scikit-learn / Keras の読み込み時間も表示する。
+使い方: python app/backend/bench_startup.py [繰り返し回数]
+"""
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# 一時的なDBを使ってサーバーを起動する（実際のDBには触れない）
+SERVER_SCRIPT = '''
+import sys
+import server
+server.DB_PATH = sys.argv[1]
+server.MODEL_FILE = sys.argv[2]
+server.run_server(int(sys.argv[3]))
+'''
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('localhost', 0))
+        return sock.getsockname()[1]
+
+
+def _wait_for(url, start, timeout=120):
+    """url が 200 を返すまで待ち、起動からの秒数を返す"""
+    while time.perf_counter() - start < timeout:
+        try:
+            with urllib.request.urlopen(url) as response:
+                if response.status == 200:
+                    return time.perf_counter() - start
+        except (urllib.error.URLError, ConnectionError):
+            pass
+        time.sleep(0.005)
+    raise TimeoutError(url)
+
+
+def _startup_seconds(model_file):
+    port = _free_port()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        start = time.perf_counter()
+        process = subprocess.Popen(
+            [sys.executable, '-c', SERVER_SCRIPT, os.path.join(tmp_dir, 'bench.db'), model_file, str(port)],
+            cwd=BACKEND_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        try:
+            test_seconds = _wait_for(f"http://localhost:{port}/api/test", start)
+            ready_seconds = _wait_for(f"http://localhost:{port}/api/ready", start)
+        finally:
+            process.terminate()
+            process.wait()
+    return test_seconds, ready_seconds
+
+
+def _import_seconds(modules):
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, '-c', f"import {', '.join(modules)}"],
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return time.perf_counter() - start if result.returncode == 0 else None
+
+
+if __name__ == '__main__':
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+
+    # 学習済みモデルがない場合（簡易予測）とある場合（PyTorchを読み込む）の両方を計測する
+    from server import MODEL_FILE
+    cases = [('モデルなし', os.path.join(tempfile.gettempdir(), 'no-model.fcm'))]
+    if os.path.exists(MODEL_FILE):
+        cases.append(('モデルあり', MODEL_FILE))
+
+    print(f"起動時間（{repeat}回の中央値）:")
+    for label, model_file in cases:
+        timings = np.array([_startup_seconds(model_file) for _ in range(repeat)])
+        test_seconds, ready_seconds = np.median(timings, axis=0)
+        print(f"  {label}: /api/test まで {test_seconds:6.3f}秒, /api/ready まで {ready_seconds:6.3f}秒")
+
+    heavy = _import_seconds(['pandas', 'sklearn.preprocessing', 'keras'])
+    if heavy is not None:
+        print(f"  参考: pandas + scikit-learn + Keras の読み込み {heavy:6.3f}秒（以前は起動のたびに必要だった）")
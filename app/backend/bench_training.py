@@ -0,0 +1,92 @@
+"""
+同梱の sample_sales_data.csv で学習時間と予測レイテンシを計測するベンチマーク
+
+学習は run_training をそのまま（ジョブのプロセスを介さずに）実行し、
+保存したモデルをサーバーに読み込んだ状態で /api/predict のレイテンシを計測する。
+使い方: python app/backend/bench_training.py [エポック数]
+"""
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+
+import numpy as np
+
+import server
+from app.backend.csv_import import import_csv
+from app.backend.training import run_training
+
+SAMPLE_CSV = os.path.join(server.APP_ROOT, 'sample_sales_data.csv')
+
+
+def _median_ms(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return float(np.median(timings))
+
+
+def run_benchmark(epochs, repeat=50):
+    with open(SAMPLE_CSV, encoding='utf-8-sig', newline='') as f, contextlib.redirect_stdout(io.StringIO()):
+        import_csv(server.get_database(), f)
+
+    params = {
+        'epochs': epochs,
+        'batch_size': 16,
+        'config': {'model_type': 'lstm', 'hidden_layers': 2, 'hidden_units': 64},
+        'db_path': server.DB_PATH,
+        'model_file': server.MODEL_FILE
+    }
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = run_training(params, lambda epoch, epochs, avg_loss: None)
+        forecaster = server.load_forecaster()
+
+    rows = server.recent_sales(server.get_database(), forecaster.config['sequence_length'])
+    forward_ms = _median_ms(lambda: forecaster.predict(rows, 30), repeat)
+
+    httpd = server.create_server(0)
+    url = f"http://localhost:{httpd.server_address[1]}/api/predict"
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+
+    def predict():
+        request = urllib.request.Request(
+            url,
+            data=json.dumps({'period': 30}).encode(),
+            headers={'Content-Type': 'application/json'}
+        )
+        with urllib.request.urlopen(request) as response:
+            response.read()
+
+    try:
+        with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+            predict_ms = _median_ms(predict, repeat)
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
+
+    return result, forward_ms, predict_ms
+
+
+if __name__ == '__main__':
+    epochs = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        server.DB_PATH = os.path.join(tmp_dir, 'bench.db')
+        server.MODEL_FILE = os.path.join(tmp_dir, 'saved', 'demand_forecaster.fcm')
+        with contextlib.redirect_stdout(io.StringIO()):
+            server.init_database()
+
+        result, forward_ms, predict_ms = run_benchmark(epochs)
+        print(f"学習: {result['trainedRows']}件 × {epochs}エポック = {result['trainingSeconds']:.2f}秒 "
+              f"(最終損失={result['finalLoss']:.4f}, 精度={result['accuracy']:.1f}%)")
+        print(f"予測（30日、モデルの順伝播のみ）: p50={forward_ms:.2f}ms")
+        print(f"/api/predict（30日、読み込み済みモデル）: p50={predict_ms:.2f}ms")
+
+        server.get_database().close()
@@ -0,0 +1,66 @@
+"""
+学習用ウィンドウの作成（prepare_data）の時間とメモリを計測するベンチマーク
+
+従来の Python ループ + list.append + np.array + torch.FloatTensor と、
+sliding_windows（ストライド付きビュー）+ torch.from_numpy を比較する。
+従来方式はウィンドウ1つごとに Python オブジェクトを作るため、
+LOOP_MAX_ROWS を超える件数では（メモリ不足を避けるため）計測を省略する。
+使い方: python app/backend/bench_windowing.py [件数...]
+"""
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import torch
+
+import server  # app パッケージを import できるようにする
+from app.models.windowing import sliding_windows
+
+SEQUENCE_LENGTH = 7
+LOOP_MAX_ROWS = 1_000_000
+
+
+def loop_windows(sales_scaled, sequence_length):
+    """従来の prepare_data と同じ方法でウィンドウを作る"""
+    X, y = [], []
+    for i in range(len(sales_scaled) - sequence_length):
+        X.append(sales_scaled[i:i+sequence_length])
+        y.append(sales_scaled[i+sequence_length])
+    return torch.FloatTensor(np.array(X)), torch.FloatTensor(np.array(y))
+
+
+def strided_windows(sales_scaled, sequence_length):
+    """sliding_windows でウィンドウを作る（lstm_model.prepare_data と同じ方法）"""
+    X, y = sliding_windows(sales_scaled, sequence_length, writeable=True)
+    return torch.from_numpy(X), torch.from_numpy(y[:, :, 0])
+
+
+def _measure(fn, sales_scaled):
+    """実行時間（秒）と、実行中に追加で確保したメモリのピーク（MB）を返す"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    X, y = fn(sales_scaled, SEQUENCE_LENGTH)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+    tracemalloc.stop()
+    return elapsed, peak, (X, y)
+
+
+if __name__ == '__main__':
+    sizes = [int(float(arg)) for arg in sys.argv[1:]] or [10_000, 100_000, 1_000_000, 10_000_000]
+
+    for rows in sizes:
+        sales_scaled = np.random.rand(rows, 1).astype(np.float32)
+
+        strided_seconds, strided_mb, (X, y) = _measure(strided_windows, sales_scaled)
+        line = f"{rows:>9}件: ストライド={strided_seconds * 1000:8.2f}ms ({strided_mb:7.1f}MB)"
+
+        if rows <= LOOP_MAX_ROWS:
+            loop_seconds, loop_mb, (X_loop, y_loop) = _measure(loop_windows, sales_scaled)
+            assert torch.equal(X, X_loop) and torch.equal(y, y_loop)
+            line += (f"  ループ={loop_seconds * 1000:9.2f}ms ({loop_mb:7.1f}MB)"
+                     f"  {loop_seconds / strided_seconds:,.0f}倍")
+        else:
+            line += "  ループ=省略"
+        print(line)
@@ -0,0 +1,131 @@
+import threading
+import time
+
+# まとめる前に待つ時間（秒）と、1回にまとめる予測件数の上限
+DEFAULT_MAX_WAIT = 0.002
+DEFAULT_MAX_BATCH = 64
+
+# バッチサイズ（まとめたリクエスト数）の分布を数える区間の上限
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64)
+
+
+class PredictCoalescer:
+    """
+    同時に届いた予測リクエストを少しだけ待ってまとめ、1回のバッチ推論で処理する
+
+    バッチを開いた最初のリクエストのスレッド（リーダー）が max_wait 秒だけ待つ間に、
+    他のスレッドのリクエストを同じバッチに追加する。予測件数が max_batch に達するか
+    待ち時間が過ぎると、リーダーがまとめて predict を呼び出し、結果を各リクエストに振り分ける。
+    max_wait を大きくするとまとまりやすく（スループットが上がる）、1件あたりの待ち時間は増える。
+    max_wait が 0 の場合はまとめずにそのまま処理する。
+
+    predict は predict(requests) -> (結果のリスト, 履歴がない系列IDのリスト) の形式
+    （server.predict_requests）。
+    """
+
+    def __init__(self, predict, max_wait=DEFAULT_MAX_WAIT, max_batch=DEFAULT_MAX_BATCH):
+        self.predict = predict
+        self.max_wait = max_wait
+        self.max_batch = max_batch
+        self._lock = threading.Lock()
+        self._closed = threading.Condition(self._lock)
+        self._batch = None  # リクエストを集めている途中のバッチ
+        self._batches = 0
+        self._requests = 0
+        self._forecasts = 0
+        self._max_observed = 0
+        self._wait_seconds = 0.0
+        self._histogram = [0] * (len(BATCH_SIZE_BUCKETS) + 1)
+
+    def submit(self, requests):
+        """予測リクエスト [(系列ID, 予測日数, 実績の日数), ...] を処理して predict と同じ形式で返す"""
+        if self.max_wait <= 0:
+            return self.predict(requests)
+
+        entry = {'requests': requests, 'done': threading.Event(), 'result': None, 'error': None}
+        with self._lock:
+            leader = self._batch is None
+            if leader:
+                self._batch = {'entries': [], 'size': 0}
+            batch = self._batch
+            batch['entries'].append(entry)
+            batch['size'] += len(requests)
+            if batch['size'] >= self.max_batch:
+                # 上限に達したバッチは締め切り、次のリクエストからは新しいバッチにする
+                self._batch = None
+                self._closed.notify_all()
+
+            if leader:
+                start = time.perf_counter()
+                deadline = time.monotonic() + self.max_wait
+                while self._batch is batch:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._batch = None
+                        break
+                    self._closed.wait(remaining)
+                self._wait_seconds += time.perf_counter() - start
+
+        if leader:
+            self._run(batch)
+        else:
+            entry['done'].wait()
+        if entry['error'] is not None:
+            raise entry['error']
+        return entry['result']
+
+    def _run(self, batch):
+        entries = batch['entries']
+        try:
+            requests = [request for entry in entries for request in entry['requests']]
+            try:
+                results, missing = self.predict(requests)
+            except Exception as e:
+                for entry in entries:
+                    entry['error'] = e
+                return
+
+            # 結果を各リクエストに振り分ける
+            missing = set(missing)
+            offset = 0
+            for entry in entries:
+                count = len(entry['requests'])
+                entry_missing = list(dict.fromkeys(
+                    request[0] for request in entry['requests'] if request[0] in missing
+                ))
+                entry['result'] = (results[offset:offset + count], entry_missing)
+                offset += count
+        finally:
+            for entry in entries:
+                entry['done'].set()
+            self._record(len(entries), batch['size'])
+
+    def _record(self, requests, forecasts):
+        with self._lock:
+            self._batches += 1
+            self._requests += requests
+            self._forecasts += forecasts
+            self._max_observed = max(self._max_observed, requests)
+            bucket = next((i for i, limit in enumerate(BATCH_SIZE_BUCKETS) if requests <= limit),
+                          len(BATCH_SIZE_BUCKETS))
+            self._histogram[bucket] += 1
+
+    def stats(self):
+        with self._lock:
+            labels = [
+                str(limit) if i == 0 or BATCH_SIZE_BUCKETS[i - 1] + 1 == limit
+                else f"{BATCH_SIZE_BUCKETS[i - 1] + 1}-{limit}"
+                for i, limit in enumerate(BATCH_SIZE_BUCKETS)
+            ] + [f"{BATCH_SIZE_BUCKETS[-1] + 1}+"]
+            return {
+                'enabled': self.max_wait > 0,
+                'maxWaitMs': self.max_wait * 1000,
+                'maxBatch': self.max_batch,
+                'batches': self._batches,
+                'requests': self._requests,
+                'forecasts': self._forecasts,
+                'meanBatchSize': self._requests / self._batches if self._batches else 0.0,
+                'maxBatchSize': self._max_observed,
+                'meanWaitMs': self._wait_seconds / self._batches * 1000 if self._batches else 0.0,
+                'batchSizes': dict(zip(labels, self._histogram))
+            }
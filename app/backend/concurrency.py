@@ -0,0 +1,186 @@
+import json
+import os
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import HTTPServer
+
+# 処理に時間がかかるルート（学習・インポート）は専用のプールで処理する
+SLOW_ROUTES = ('/api/train', '/api/train/series', '/api/data/import')
+
+# 長時間接続を保持するストリーミングルート（SSE）は専用のプールで処理する
+# （接続中はスレッドを占有し続けるので、学習・インポートのプールの枠を使わない）
+STREAM_SUFFIXES = ('/events',)
+
+# ワーカープールのデフォルト設定
+DEFAULT_POOL_CONFIG = {
+    'fast_workers': 8,       # データ・設定・予測などの軽いリクエスト用スレッド数
+    'fast_queue_size': 64,   # 軽いリクエストの待ち行列の上限
+    'slow_workers': 2,       # 学習・インポート用スレッド数
+    'slow_queue_size': 4,    # 重いリクエストの待ち行列の上限
+    'stream_workers': 16,    # 進捗のストリーミング（SSE）用スレッド数（同時に開ける接続数）
+    'stream_queue_size': 0,  # ストリーミングの待ち行列の上限
+    'peek_timeout': 5.0      # リクエスト行の読み取りを待つ秒数
+}
+
+# 環境変数名と設定キーの対応
+POOL_CONFIG_ENV = {
+    'fast_workers': 'FORECAST_FAST_WORKERS',
+    'fast_queue_size': 'FORECAST_FAST_QUEUE',
+    'slow_workers': 'FORECAST_SLOW_WORKERS',
+    'slow_queue_size': 'FORECAST_SLOW_QUEUE',
+    'stream_workers': 'FORECAST_STREAM_WORKERS',
+    'stream_queue_size': 'FORECAST_STREAM_QUEUE',
+    'peek_timeout': 'FORECAST_PEEK_TIMEOUT'
+}
+
+
+def pool_config_from_env(environ=None):
+    """環境変数からワーカープール設定を読み込む（未指定の項目はデフォルト値）"""
+    environ = os.environ if environ is None else environ
+    config = dict(DEFAULT_POOL_CONFIG)
+    for key, env_name in POOL_CONFIG_ENV.items():
+        value = environ.get(env_name)
+        if value:
+            config[key] = type(DEFAULT_POOL_CONFIG[key])(value)
+    return config
+
+
+class BoundedWorkerPool:
+    """実行中と待機中の合計数に上限を持つスレッドプール"""
+
+    def __init__(self, name, max_workers, queue_size):
+        self.name = name
+        self.max_workers = max_workers
+        self.queue_size = queue_size
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"{name}-worker")
+        self._slots = threading.BoundedSemaphore(max_workers + queue_size)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._rejected = 0
+
+    def try_submit(self, fn, *args):
+        """空きがあればタスクを投入する。満杯の場合はFalseを返す"""
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._rejected += 1
+            return False
+
+        with self._lock:
+            self._in_flight += 1
+        future = self.executor.submit(fn, *args)
+        future.add_done_callback(self._release)
+        return True
+
+    def _release(self, _future):
+        with self._lock:
+            self._in_flight -= 1
+        self._slots.release()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'workers': self.max_workers,
+                'queueSize': self.queue_size,
+                'inFlight': self._in_flight,
+                'rejected': self._rejected
+            }
+
+    def shutdown(self, wait=False):
+        self.executor.shutdown(wait=wait)
+
+
+class PooledHTTPServer(HTTPServer):
+    """
+    ルートごとに別のワーカープールでリクエストを処理するHTTPサーバー
+
+    受け付けた接続はまず軽量プールで処理を開始し、リクエスト行を覗き見て
+    学習・インポートのような重いルートであれば専用プールに移し替える。
+    これにより長時間の学習中でも /api/test や /api/predict が応答できる。
+    どちらのプールも満杯の場合は 503 を返して接続を閉じる。
+    """
+
+    daemon_threads = True
+
+    def __init__(self, server_address, handler_class, config=None):
+        self.config = dict(DEFAULT_POOL_CONFIG)
+        if config:
+            self.config.update(config)
+
+        self.pools = {
+            'fast': BoundedWorkerPool('fast', self.config['fast_workers'], self.config['fast_queue_size']),
+            'slow': BoundedWorkerPool('slow', self.config['slow_workers'], self.config['slow_queue_size']),
+            'stream': BoundedWorkerPool('stream', self.config['stream_workers'], self.config['stream_queue_size'])
+        }
+        super().__init__(server_address, handler_class)
+
+    def process_request(self, request, client_address):
+        # 受付ループを塞がないように、ルート判定もワーカー側で行う
+        if not self.pools['fast'].try_submit(self._dispatch, request, client_address):
+            self._reject(request)
+
+    def _dispatch(self, request, client_address):
+        pool = self.classify_request(request)
+        if pool != 'fast':
+            if not self.pools[pool].try_submit(self._process, request, client_address):
+                self._reject(request)
+            return
+        self._process(request, client_address)
+
+    def classify_request(self, request):
+        """リクエスト行を消費せずに読み取り、処理するプール名を返す"""
+        try:
+            request.settimeout(self.config['peek_timeout'])
+            head = request.recv(1024, socket.MSG_PEEK)
+        except OSError:
+            return 'fast'
+        finally:
+            try:
+                request.settimeout(None)
+            except OSError:
+                pass
+
+        parts = head.split(b'\r\n', 1)[0].split()
+        if len(parts) < 2:
+            return 'fast'
+
+        path = parts[1].decode('latin-1').split('?', 1)[0]
+        if path.endswith(STREAM_SUFFIXES):
+            return 'stream'
+        if path in SLOW_ROUTES:
+            return 'slow'
+        return 'fast'
+
+    def _process(self, request, client_address):
+        # ThreadingMixIn.process_request_thread と同じ後処理
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def _reject(self, request):
+        """混雑時に 503 を返す"""
+        body = json.dumps({'success': False, 'error': 'サーバーが混雑しています'}).encode()
+        response = (
+            b'HTTP/1.0 503 Service Unavailable\r\n'
+            b'Content-Type: application/json\r\n'
+            b'Access-Control-Allow-Origin: *\r\n'
+            b'Retry-After: 1\r\n'
+            b'Content-Length: ' + str(len(body)).encode() + b'\r\n'
+            b'\r\n' + body
+        )
+        try:
+            request.sendall(response)
+        except OSError:
+            pass
+        self.shutdown_request(request)
+
+    def stats(self):
+        return {name: pool.stats() for name, pool in self.pools.items()}
+
+    def server_close(self):
+        super().server_close()
+        for pool in self.pools.values():
+            pool.shutdown(wait=False)
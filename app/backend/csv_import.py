@@ -0,0 +1,241 @@
+import csv
+import io
+
+from app.backend.database import DEFAULT_SERIES, normalize_date
+
+# 1トランザクションでステージングテーブルに書き込む行数
+IMPORT_BATCH_SIZE = 5000
+
+# サマリーに含める不正行の最大件数
+MAX_REJECTED_SAMPLES = 20
+
+# 取り込みモード
+#   replace: CSVに含まれる系列をCSVの内容で置き換える（CSVにない日付は削除、他の系列はそのまま）
+#   append:  既存にない日付だけを追加する
+#   upsert:  新しい日付を追加し、値が変わった日付を更新する
+IMPORT_MODES = ('replace', 'append', 'upsert')
+
+# ヘッダー名と列の対応（日本語・英語両対応）
+COLUMN_ALIASES = {
+    'date': ('date', '日付'),
+    'sales': ('sales', '売上', 'revenue'),
+    'features': ('features', '特徴量', 'category'),
+    'series': ('series', 'series_id', '系列', 'sku', '商品コード'),
+    'store': ('store', 'store_id', '店舗', '店舗コード')
+}
+
+
+class RequestBodyReader(io.RawIOBase):
+    """Content-Length までのリクエストボディを読み出すストリーム"""
+
+    def __init__(self, rfile, length):
+        self.rfile = rfile
+        self.remaining = length
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        if self.remaining <= 0:
+            return 0
+        data = self.rfile.read(min(len(buffer), self.remaining))
+        size = len(data)
+        buffer[:size] = data
+        self.remaining -= size
+        return size
+
+
+def open_text_body(rfile, length, encoding='utf-8-sig'):
+    """リクエストボディを少しずつデコードするテキストストリームを返す"""
+    return io.TextIOWrapper(io.BufferedReader(RequestBodyReader(rfile, length)), encoding=encoding, newline='')
+
+
+def detect_columns(headers):
+    """ヘッダー行から日付・売上・特徴量・系列・店舗の列番号を決定する（系列・店舗の列はない場合 None）"""
+    columns = {'date': 0, 'sales': 1, 'features': 2, 'series': None, 'store': None}
+    detected = set()
+    for i, header in enumerate(headers or []):
+        name = header.strip().lstrip('\ufeff').lower()
+        for key, aliases in COLUMN_ALIASES.items():
+            if name in aliases:
+                columns[key] = i
+                detected.add(key)
+
+    # 特徴量の列が見つからず、既定の位置が他の列と重なる場合は特徴量なしとする
+    if 'features' not in detected and columns['features'] in [columns[key] for key in detected]:
+        columns['features'] = None
+    return columns
+
+
+def parse_row(row, columns):
+    """CSVの1行を (series_id, date, sales, features) に変換する。不正な行は ValueError / IndexError
+
+    系列IDは系列列（SKUなど）と店舗列を "SKU@店舗" の形で組み合わせる。どちらもない場合は既定の系列。
+    """
+    parts = [row[columns[key]].strip() for key in ('series', 'store') if columns[key] is not None]
+    series_id = '@'.join(part for part in parts if part) or DEFAULT_SERIES
+    date = normalize_date(row[columns['date']])
+    sales = float(row[columns['sales']].strip().replace(',', ''))  # カンマを除去
+
+    features = None
+    if columns['features'] is not None and len(row) > columns['features']:
+        features = row[columns['features']].strip()
+
+    return series_id, date, sales, features
+
+
+def _stage_batch(conn, batch):
+    conn.execute('BEGIN')
+    conn.executemany('''
+    INSERT OR REPLACE INTO temp.import_staging (series_id, date, sales, features)
+    VALUES (?, ?, ?, ?)
+    ''', batch)
+    conn.commit()
+
+
+# 変更のあった (系列, 日付) を系列ごとの連続した期間にまとめる
+# （日付の通し番号と行番号の差が等しい行が1つの連続期間になる）
+CHANGED_RANGES_SQL = '''
+SELECT series_id, MIN(date), MAX(date)
+FROM (
+    SELECT series_id, date,
+           julianday(date) - ROW_NUMBER() OVER (PARTITION BY series_id ORDER BY date) AS period
+    FROM temp.import_changes
+)
+GROUP BY series_id, period
+ORDER BY series_id, MIN(date)
+'''
+
+
+def _apply_staged_rows(conn, mode):
+    """ステージングテーブルの内容を sales_data に反映し、変更内容を返す
+
+    新規の (系列, 日付) と値が変わった (系列, 日付) だけを書き込み、変更のない行には触れない。
+    変更件数と変更のあった期間は一時テーブル import_changes から SQL で集計する。
+    """
+    conn.execute("DROP TABLE IF EXISTS temp.import_changes")
+    conn.execute('''
+    CREATE TEMP TABLE import_changes AS
+    SELECT s.series_id AS series_id, s.date AS date,
+           CASE WHEN d.date IS NULL THEN 'inserted' ELSE 'updated' END AS change
+    FROM temp.import_staging s
+    LEFT JOIN sales_data d ON d.series_id = s.series_id AND d.date = s.date
+    WHERE d.date IS NULL
+       OR (? AND (d.sales <> s.sales OR d.features IS NOT s.features))
+    ''', (mode != 'append',))
+
+    conn.execute('''
+    INSERT INTO sales_data (series_id, date, sales, features)
+    SELECT s.series_id, s.date, s.sales, s.features
+    FROM temp.import_staging s
+    JOIN temp.import_changes c ON c.series_id = s.series_id AND c.date = s.date
+    WHERE true
+    ON CONFLICT(series_id, date) DO UPDATE SET sales = excluded.sales, features = excluded.features
+    ''')
+
+    if mode == 'replace':
+        # CSVに含まれる系列のうち、CSVにない日付を削除する
+        stale = '''
+        FROM sales_data
+        WHERE series_id IN (SELECT series_id FROM temp.import_staging)
+          AND NOT EXISTS (
+              SELECT 1 FROM temp.import_staging s
+              WHERE s.series_id = sales_data.series_id AND s.date = sales_data.date
+          )
+        '''
+        conn.execute(f"INSERT INTO temp.import_changes (series_id, date, change) SELECT series_id, date, 'deleted' {stale}")
+        conn.execute(f"DELETE {stale}")
+
+    counts = dict(conn.execute("SELECT change, COUNT(*) FROM temp.import_changes GROUP BY change").fetchall())
+    changed_ranges = [
+        {'series': series_id, 'from': first_date, 'to': last_date}
+        for series_id, first_date, last_date in conn.execute(CHANGED_RANGES_SQL)
+    ]
+    conn.execute("DROP TABLE temp.import_changes")
+
+    return {
+        'inserted': counts.get('inserted', 0),
+        'updated': counts.get('updated', 0),
+        'deleted': counts.get('deleted', 0),
+        'changedRanges': changed_ranges
+    }
+
+
+def import_csv(database, text_stream, mode='replace', batch_size=IMPORT_BATCH_SIZE):
+    """
+    CSVを1行ずつ読みながら取り込み、集計結果を返す
+
+    行はまず接続ごとの一時テーブルに batch_size 件ずつ書き込み、
+    最後に1回のトランザクションで sales_data に反映する（mode は IMPORT_MODES を参照）。
+    途中でエラーになった場合、既存のデータは変更されない。
+
+    Returns:
+        rows（取り込んだ行数）, series（取り込んだ系列数）, rejected（不正な行数）,
+        rejectedRows（不正な行の例）, dateRange（取り込んだ日付の範囲）,
+        inserted / updated / deleted（変更件数）, changedRanges（系列ごとの変更のあった連続期間）
+        を含む辞書
+    """
+    if mode not in IMPORT_MODES:
+        raise ValueError(f"未対応の取り込みモードです: {mode}")
+
+    reader = csv.reader(text_stream)
+    columns = detect_columns(next(reader, None))
+    print(f"使用する列インデックス: {columns}")
+
+    rejected = 0
+    rejected_rows = []
+
+    with database.connection() as conn:
+        conn.execute('''
+        CREATE TEMP TABLE IF NOT EXISTS import_staging (
+            series_id TEXT NOT NULL,
+            date TEXT NOT NULL,
+            sales REAL NOT NULL,
+            features TEXT,
+            PRIMARY KEY (series_id, date)
+        )
+        ''')
+        conn.execute("DELETE FROM temp.import_staging")
+
+        try:
+            batch = []
+            for row in reader:
+                if not any(cell.strip() for cell in row):
+                    continue  # 空行は無視する
+
+                try:
+                    batch.append(parse_row(row, columns))
+                except (ValueError, IndexError) as e:
+                    rejected += 1
+                    if len(rejected_rows) < MAX_REJECTED_SAMPLES:
+                        rejected_rows.append({'line': reader.line_num, 'row': row, 'error': str(e)})
+                    continue
+
+                if len(batch) >= batch_size:
+                    _stage_batch(conn, batch)
+                    batch = []
+            if batch:
+                _stage_batch(conn, batch)
+
+            staged, series_count, first_date, last_date = conn.execute(
+                "SELECT COUNT(*), COUNT(DISTINCT series_id), MIN(date), MAX(date) FROM temp.import_staging"
+            ).fetchone()
+            if staged == 0:
+                raise ValueError("有効なデータがありません")
+
+            with database.transaction(conn):
+                changes = _apply_staged_rows(conn, mode)
+        finally:
+            conn.execute("DROP TABLE IF EXISTS temp.import_staging")
+
+    print(f"合計で {series_count} 系列 {staged} 行のデータを取り込みました（モード: {mode}, 追加: {changes['inserted']}, "
+          f"更新: {changes['updated']}, 削除: {changes['deleted']}, 不正な行: {rejected}）")
+    return {
+        'mode': mode,
+        'rows': staged,
+        'series': series_count,
+        'rejected': rejected,
+        'rejectedRows': rejected_rows,
+        'dateRange': {'from': first_date, 'to': last_date},
+        **changes
+    }
@@ -0,0 +1,376 @@
+import itertools
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import date, datetime
+
+# 接続プールのデフォルト設定
+DEFAULT_POOL_SIZE = 8
+DEFAULT_TIMEOUT = 30.0         # 接続待ち・ロック待ちの秒数
+STATEMENT_CACHE_SIZE = 128     # 接続ごとにキャッシュするプリペアドステートメント数
+
+# CSVなどから受け付ける日付の書式（保存時は ISO 形式 YYYY-MM-DD に統一する）
+DATE_FORMATS = ('%Y-%m-%d', '%Y/%m/%d', '%Y%m%d', '%Y-%m-%d %H:%M:%S')
+
+# 系列（SKU×店舗など）を指定しない場合の系列ID
+DEFAULT_SERIES = 'default'
+
+# 系列IDの IN (...) に一度に渡す件数（SQLite のパラメータ数の上限 999 を超えないようにする）
+QUERY_CHUNK_SIZE = 500
+
+
+class Database:
+    """
+    SQLiteの接続プール
+
+    - 接続はスレッド間で使い回し、プリペアドステートメントのキャッシュも再利用する
+    - WALモードで開くため、書き込み中でも読み取りはブロックされない
+    - 書き込みはプロセス内のロックで直列化し、BEGIN IMMEDIATE で開始する
+      （複数の書き込みが同時に走って "database is locked" になるのを防ぐ）
+    """
+
+    def __init__(self, path, pool_size=DEFAULT_POOL_SIZE, timeout=DEFAULT_TIMEOUT):
+        self.path = path
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self._pool = queue.LifoQueue()
+        self._created = 0
+        self._pool_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._closed = False
+
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+
+    def _connect(self):
+        conn = sqlite3.connect(
+            self.path,
+            timeout=self.timeout,
+            isolation_level=None,  # トランザクションは明示的に開始する
+            check_same_thread=False,
+            cached_statements=STATEMENT_CACHE_SIZE
+        )
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute(f'PRAGMA busy_timeout={int(self.timeout * 1000)}')
+        return conn
+
+    def _acquire(self):
+        try:
+            return self._pool.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._pool_lock:
+            if self._created < self.pool_size:
+                self._created += 1
+                try:
+                    return self._connect()
+                except Exception:
+                    self._created -= 1
+                    raise
+
+        try:
+            return self._pool.get(timeout=self.timeout)
+        except queue.Empty:
+            raise TimeoutError('データベース接続の取得がタイムアウトしました')
+
+    def _release(self, conn):
+        if self._closed:
+            conn.close()
+            return
+        self._pool.put(conn)
+
+    @contextmanager
+    def connection(self):
+        """読み取り用の接続を借りる"""
+        conn = self._acquire()
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            self._release(conn)
+
+    @contextmanager
+    def transaction(self, conn=None):
+        """書き込みトランザクション（成功時にコミット、例外時にロールバック）
+
+        conn を指定した場合は、借りている接続のままトランザクションを開始する
+        （一時テーブルなど接続ごとの状態を使う場合）。
+        """
+        with self._write_lock:
+            if conn is not None:
+                yield from self._run_transaction(conn)
+                return
+            with self.connection() as conn:
+                yield from self._run_transaction(conn)
+
+    @staticmethod
+    def _run_transaction(conn):
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield conn
+        except BaseException:
+            conn.rollback()
+            raise
+        conn.commit()
+
+    def query(self, sql, params=()):
+        with self.connection() as conn:
+            return conn.execute(sql, params).fetchall()
+
+    def query_one(self, sql, params=()):
+        with self.connection() as conn:
+            return conn.execute(sql, params).fetchone()
+
+    def iter_query(self, sql, params=(), batch_size=1000):
+        """結果を batch_size 件ずつ読み出しながら1行ずつ返す（全件をメモリに載せない）"""
+        with self.connection() as conn:
+            cursor = conn.execute(sql, params)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield from rows
+
+    def close(self):
+        """プール内の接続をすべて閉じる"""
+        self._closed = True
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+def create_schema(conn):
+    """テーブルを作成し、デフォルト設定を挿入する"""
+    cursor = conn.cursor()
+
+    # 売上データテーブルの作成
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS sales_data (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        date TEXT NOT NULL,
+        sales REAL NOT NULL,
+        features TEXT
+    )
+    ''')
+
+    # 設定テーブルの作成
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS settings (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        model_type TEXT NOT NULL,
+        hidden_layers INTEGER NOT NULL,
+        hidden_units INTEGER NOT NULL,
+        auto_mode INTEGER NOT NULL
+    )
+    ''')
+
+    # デフォルト設定の挿入（存在しない場合）
+    cursor.execute("SELECT COUNT(*) FROM settings")
+    if cursor.fetchone()[0] == 0:
+        cursor.execute('''
+        INSERT INTO settings (model_type, hidden_layers, hidden_units, auto_mode)
+        VALUES (?, ?, ?, ?)
+        ''', ('lstm', 2, 64, 0))
+
+    # スキーマの移行
+    migrate(conn)
+
+
+def _migrate_date_index(conn):
+    """v1: 日付を ISO 形式に揃え、日付ごとに1行となる一意インデックスを作成する"""
+    rows = conn.execute("SELECT id, date FROM sales_data").fetchall()
+    updates = []
+    invalid = []
+    for row_id, value in rows:
+        try:
+            normalized = normalize_date(value)
+        except ValueError:
+            invalid.append((row_id,))
+            continue
+        if normalized != value:
+            updates.append((normalized, row_id))
+    conn.executemany("UPDATE sales_data SET date = ? WHERE id = ?", updates)
+    conn.executemany("DELETE FROM sales_data WHERE id = ?", invalid)
+
+    # 同じ日付の行は最後に登録されたものを残す
+    conn.execute('''
+    DELETE FROM sales_data
+    WHERE id NOT IN (SELECT MAX(id) FROM sales_data GROUP BY date)
+    ''')
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_sales_data_date ON sales_data(date)")
+
+
+def _migrate_series_column(conn):
+    """v2: 系列IDの列を追加し、系列と日付の組で一意にする（既存の行は既定の系列になる）"""
+    conn.execute(f"ALTER TABLE sales_data ADD COLUMN series_id TEXT NOT NULL DEFAULT '{DEFAULT_SERIES}'")
+    conn.execute("DROP INDEX IF EXISTS idx_sales_data_date")
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_sales_data_series_date ON sales_data(series_id, date)")
+
+
+def _migrate_model_registry(conn):
+    """v3: 学習済みモデルの登録簿（どの系列・設定・データで学習したモデルか）を作成する"""
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS model_registry (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        series_id TEXT,
+        model_file TEXT NOT NULL,
+        model_name TEXT NOT NULL,
+        model_type TEXT NOT NULL,
+        settings_id INTEGER REFERENCES settings(id),
+        data_version TEXT,
+        config TEXT,
+        metrics TEXT,
+        created_at TEXT NOT NULL,
+        active INTEGER NOT NULL DEFAULT 1
+    )
+    ''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_model_registry_series ON model_registry(series_id, active)")
+
+
+def _migrate_settings_search(conn):
+    """v4: 設定に系列の長さ・学習率と、自動設定モードで探索した結果を記録する列を追加する"""
+    conn.execute("ALTER TABLE settings ADD COLUMN sequence_length INTEGER")
+    conn.execute("ALTER TABLE settings ADD COLUMN learning_rate REAL")
+    conn.execute("ALTER TABLE settings ADD COLUMN search_result TEXT")
+
+
+# スキーマ移行の一覧（PRAGMA user_version が適用済みのバージョンを表す）
+MIGRATIONS = [
+    _migrate_date_index,
+    _migrate_series_column,
+    _migrate_model_registry,
+    _migrate_settings_search
+]
+
+
+def migrate(conn):
+    """未適用のスキーマ移行を順に適用する"""
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    for index, migration in enumerate(MIGRATIONS[version:], start=version + 1):
+        print(f"スキーマを移行しています: v{index - 1} -> v{index}")
+        migration(conn)
+        conn.execute(f"PRAGMA user_version = {index}")
+
+
+def normalize_date(value):
+    """日付文字列を ISO 形式（YYYY-MM-DD）に変換する。解釈できない場合は ValueError"""
+    value = value.strip()
+    try:
+        # ほとんどの行は ISO 形式なので、高速な fromisoformat を先に試す
+        return date.fromisoformat(value).isoformat()
+    except ValueError:
+        pass
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, date_format).date().isoformat()
+        except ValueError:
+            continue
+    raise ValueError(f"日付の形式が正しくありません: {value}")
+
+
+def recent_sales(database, limit, columns='date, sales', series_id=DEFAULT_SERIES):
+    """直近 limit 件の売上を日付の昇順で返す（系列・日付インデックスを逆順に辿る）"""
+    return database.query(f'''
+    SELECT {columns} FROM (
+        SELECT {columns} FROM sales_data WHERE series_id = ? ORDER BY date DESC LIMIT ?
+    ) ORDER BY date
+    ''', (series_id, limit))
+
+
+def recent_sales_by_series(database, series_ids, limit, columns='date, sales'):
+    """系列ごとに直近 limit 件の売上を返す（{系列ID: 行のリスト}、データのない系列は空のリスト）"""
+    sql = f'''
+    SELECT {columns} FROM (
+        SELECT {columns} FROM sales_data WHERE series_id = ? ORDER BY date DESC LIMIT ?
+    ) ORDER BY date
+    '''
+    with database.connection() as conn:
+        return {series_id: conn.execute(sql, (series_id, limit)).fetchall() for series_id in series_ids}
+
+
+def sales_by_series(database, series_ids=None, columns='date, sales'):
+    """系列ごとの売上を日付の昇順で返す（{系列ID: 行のリスト}、series_ids が None の場合は全系列）
+
+    series_ids は QUERY_CHUNK_SIZE 件ずつに分けて問い合わせる。
+    """
+    sql = f"SELECT series_id, {columns} FROM sales_data {{where}} ORDER BY series_id, date"
+    if series_ids is None:
+        chunks = [(sql.format(where=''), [])]
+    else:
+        series_ids = list(dict.fromkeys(series_ids))
+        chunks = [
+            (sql.format(where=f"WHERE series_id IN ({', '.join('?' * len(chunk))})"), chunk)
+            for chunk in (series_ids[i:i + QUERY_CHUNK_SIZE] for i in range(0, len(series_ids), QUERY_CHUNK_SIZE))
+        ]
+    result = {}
+    for query, params in chunks:
+        rows = database.iter_query(query, params)
+        for series_id, group in itertools.groupby(rows, key=lambda row: row[0]):
+            result[series_id] = [row[1:] for row in group]
+    return result
+
+
+def list_series(database):
+    """系列の一覧を (系列ID, 件数, 最初の日付, 最後の日付) のリストで返す"""
+    return database.query('''
+    SELECT series_id, COUNT(*), MIN(date), MAX(date)
+    FROM sales_data GROUP BY series_id ORDER BY series_id
+    ''')
+
+
+def _date_filter(start=None, end=None, after=None, series_id=DEFAULT_SERIES):
+    """系列と日付条件の WHERE 句とパラメータを組み立てる"""
+    conditions = ["series_id = ?"]
+    params = [series_id]
+    if start is not None:
+        conditions.append("date >= ?")
+        params.append(start)
+    if end is not None:
+        conditions.append("date <= ?")
+        params.append(end)
+    if after is not None:
+        conditions.append("date > ?")
+        params.append(after)
+    return f"WHERE {' AND '.join(conditions)}", params
+
+
+def sales_in_range(database, start=None, end=None, columns='date, sales', series_id=DEFAULT_SERIES):
+    """日付範囲 [start, end] の売上を日付の昇順で返す（None は範囲指定なし）"""
+    where, params = _date_filter(start, end, series_id=series_id)
+    return database.query(f"SELECT {columns} FROM sales_data {where} ORDER BY date", params)
+
+
+def iter_sales(database, start=None, end=None, columns='date, sales', batch_size=1000, series_id=DEFAULT_SERIES):
+    """sales_in_range と同じ行を、少しずつ読み出すジェネレーターとして返す"""
+    where, params = _date_filter(start, end, series_id=series_id)
+    return database.iter_query(f"SELECT {columns} FROM sales_data {where} ORDER BY date", params, batch_size)
+
+
+def sales_page(database, limit, after=None, start=None, end=None, columns='date, sales', series_id=DEFAULT_SERIES):
+    """カーソル（直前のページの最後の日付）以降の limit 件を返す（columns の先頭は date）
+
+    Returns:
+        (行のリスト, 次のページのカーソル。最後のページの場合は None)
+    """
+    where, params = _date_filter(start, end, after, series_id)
+    rows = database.query(
+        f"SELECT {columns} FROM sales_data {where} ORDER BY date LIMIT ?",
+        params + [limit + 1]
+    )
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, rows[-1][0]
+    return rows, None
+
+
+def count_sales(database, series_id=None):
+    """売上の件数（series_id が None の場合は全系列の合計）"""
+    if series_id is None:
+        return database.query_one("SELECT COUNT(*) FROM sales_data")[0]
+    return database.query_one("SELECT COUNT(*) FROM sales_data WHERE series_id = ?", (series_id,))[0]
@@ -0,0 +1,178 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from app.backend.database import recent_sales_by_series
+from app.models.calendar_features import to_days
+
+# インデックスを保持する系列数の上限
+DEFAULT_INDEX_SIZE = 4096
+
+# インデックスの配列の合計サイズの上限（バイト）
+DEFAULT_INDEX_BYTES = 64 * 1024 * 1024
+
+# 比較に使う直近の日数（1年前の同じ日付から最後の日付まで）
+COMPARISON_DAYS = 365
+
+# 一度に読み込んでキャッシュに登録する系列数
+LOAD_CHUNK_SIZE = 500
+
+
+class SeriesDateIndex:
+    """
+    系列の売上を「最初の日付からの日数」で引けるようにした密な配列
+
+    日付ごとの値と累積和を持つので、任意の期間の合計は日付の比較なしに
+    スライスと累積和の差で求められる（前年比・前週比などは予測期間の長さに依存しない）。
+    データのない日は NaN として扱い、合計には含めない。
+    """
+
+    def __init__(self, rows, window_days=None):
+        """rows: 日付の昇順の [(date, sales), ...]（空でないこと）
+
+        window_days を指定すると、最後の日付から window_days 日分だけを保持する
+        （それより前の期間はデータなしとして扱う）。
+        """
+        days = to_days([row[0] for row in rows])
+        first = 0 if window_days is None else int(np.searchsorted(days, days[-1] - (window_days - 1)))
+        rows, days = rows[first:], days[first:]
+        offsets = (days - days[0]).astype(np.int64)
+        self.origin = days[0]
+        self.last = days[-1]
+        self.values = np.full(offsets[-1] + 1, np.nan)
+        self.values[offsets] = [row[1] for row in rows]
+
+        # 期間の合計と件数を O(1) で求めるための累積和（先頭に 0 を置く）
+        present = ~np.isnan(self.values)
+        self._sums = np.concatenate(([0.0], np.cumsum(np.where(present, self.values, 0.0))))
+        self._counts = np.concatenate(([0], np.cumsum(present)))
+
+    def __len__(self):
+        return len(self.values)
+
+    @property
+    def nbytes(self):
+        """配列が使うメモリのバイト数"""
+        return self.values.nbytes + self._sums.nbytes + self._counts.nbytes
+
+    def offset(self, date):
+        """日付のオフセット（最初の日付 = 0）"""
+        return int((np.datetime64(date, 'D') - self.origin).astype(np.int64))
+
+    def window(self, start, length):
+        """start から length 日分の値（範囲外とデータのない日は NaN）"""
+        begin = self.offset(start)
+        result = np.full(length, np.nan)
+        lo, hi = max(begin, 0), min(begin + length, len(self.values))
+        if lo < hi:
+            result[lo - begin:hi - begin] = self.values[lo:hi]
+        return result
+
+    def period_total(self, start, length):
+        """start から length 日分の (合計, データのある日数)"""
+        begin = self.offset(start)
+        lo = min(max(begin, 0), len(self.values))
+        hi = min(max(begin + length, 0), len(self.values))
+        return float(self._sums[hi] - self._sums[lo]), int(self._counts[hi] - self._counts[lo])
+
+    def complete_total(self, start, length):
+        """期間のすべての日にデータがある場合だけ合計を返す（欠けている場合は None）"""
+        total, count = self.period_total(start, length)
+        return total if count == length else None
+
+    def comparisons(self, forecast_total, period):
+        """
+        最後の日付の翌日から period 日間の予測合計を、過去の同じ期間と比較する
+
+        Returns:
+            yearOverYearChange: 1年前（365日前）の同じ日付の実績合計に対する増減率（%）
+            samePeriodLastYear: 1年前の同じ曜日にそろえた期間（364日前）の実績合計
+            weekOverWeekChange: 直近7日間の実績合計の前週比（%）
+            比較できる実績がない項目は None
+        """
+        start = self.last + 1
+        year_ago = self.complete_total(start - 365, period)
+        last_week = self.complete_total(self.last - 6, 7)
+        week_before = self.complete_total(self.last - 13, 7)
+        return {
+            'yearOverYearChange': _change(forecast_total, year_ago),
+            'samePeriodLastYear': self.complete_total(start - 364, period),
+            'weekOverWeekChange': _change(last_week, week_before)
+        }
+
+
+def _change(current, previous):
+    if current is None or not previous:
+        return None
+    return (current / previous - 1) * 100
+
+
+class DateIndexCache:
+    """
+    系列ごとの SeriesDateIndex をデータのバージョンごとに一度だけ作って保持する
+
+    インデックスは比較に使う直近 COMPARISON_DAYS 日分だけを読み込んで作るので、
+    データのバージョンが変わって作り直すときも全履歴は読み込まない。
+    保持する系列数と配列の合計サイズのどちらかが上限を超えると、最も長く使われていないものから捨てる。
+    データのバージョン（ForecastCache.data_version）が変わると、次に参照されたときに作り直す。
+    """
+
+    def __init__(self, max_entries=DEFAULT_INDEX_SIZE, max_bytes=DEFAULT_INDEX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._builds = 0
+
+    def get_many(self, database, series_ids, data_version):
+        """系列ID → SeriesDateIndex（データのない系列は None）の辞書を返す"""
+        indexes = {}
+        with self._lock:
+            for series_id in series_ids:
+                entry = self._entries.get(series_id)
+                if entry is not None and entry[0] == data_version:
+                    self._entries.move_to_end(series_id)
+                    indexes[series_id] = entry[1]
+
+        # 足りない系列は直近の期間だけを読み込んで作る
+        missing = [series_id for series_id in series_ids if series_id not in indexes]
+        for i in range(0, len(missing), LOAD_CHUNK_SIZE):
+            chunk = missing[i:i + LOAD_CHUNK_SIZE]
+            histories = recent_sales_by_series(database, chunk, COMPARISON_DAYS)
+            built = {
+                series_id: SeriesDateIndex(histories[series_id], COMPARISON_DAYS) if histories[series_id] else None
+                for series_id in chunk
+            }
+            indexes.update(built)
+            with self._lock:
+                self._builds += len(chunk)
+                for series_id, index in built.items():
+                    self._discard(series_id)
+                    self._entries[series_id] = (data_version, index)
+                    self._bytes += index.nbytes if index is not None else 0
+                while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                    self._discard(next(iter(self._entries)))
+        return indexes
+
+    def _discard(self, series_id):
+        """エントリを削除する（ロック取得済みで呼び出すこと）"""
+        entry = self._entries.pop(series_id, None)
+        if entry is not None and entry[1] is not None:
+            self._bytes -= entry[1].nbytes
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'maxEntries': self.max_entries,
+                'bytes': self._bytes,
+                'maxBytes': self.max_bytes,
+                'builds': self._builds
+            }
@@ -0,0 +1,71 @@
+import numpy as np
+
+
+def lttb(x, y, points):
+    """Largest-Triangle-Three-Buckets 法で残す点のインデックスを返す
+
+    先頭と末尾の点は必ず残し、間を points - 2 個のバケットに分けて、
+    前に選んだ点と次のバケットの平均点とで作る三角形の面積が最大の点を選ぶ。
+    """
+    n = len(y)
+    if points >= n or points < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    every = (n - 2) / (points - 2)
+
+    indices = np.empty(points, dtype=np.int64)
+    indices[0] = 0
+    indices[-1] = n - 1
+
+    selected = 0
+    for i in range(points - 2):
+        # 次のバケットの平均点
+        avg_start = int(np.floor((i + 1) * every)) + 1
+        avg_end = min(int(np.floor((i + 2) * every)) + 1, n)
+        avg_x = x[avg_start:avg_end].mean()
+        avg_y = y[avg_start:avg_end].mean()
+
+        # 現在のバケットの中で三角形の面積が最大の点
+        start = int(np.floor(i * every)) + 1
+        end = int(np.floor((i + 1) * every)) + 1
+        area = np.abs(
+            (x[selected] - avg_x) * (y[start:end] - y[selected])
+            - (x[selected] - x[start:end]) * (avg_y - y[selected])
+        )
+        selected = start + int(np.argmax(area))
+        indices[i + 1] = selected
+
+    return indices
+
+
+def minmax_buckets(x, y, points):
+    """等間隔のバケットごとに最小値と最大値の点を残し、そのインデックスを返す"""
+    n = len(y)
+    if points >= n or points < 2:
+        return np.arange(n)
+
+    y = np.asarray(y, dtype=np.float64)
+    buckets = points // 2
+    bucket_ids = (np.arange(n) * buckets) // n
+
+    # バケット番号 → 値 の順に並べると、各バケットの先頭が最小・末尾が最大になる
+    order = np.lexsort((y, bucket_ids))
+    starts = np.searchsorted(bucket_ids[order], np.arange(buckets))
+    ends = np.append(starts[1:], n) - 1
+
+    return np.unique(np.concatenate([order[starts], order[ends]]))
+
+
+DOWNSAMPLE_METHODS = {
+    'lttb': lttb,
+    'minmax': minmax_buckets
+}
+
+
+def downsample(x, y, points, method='lttb'):
+    """チャート表示用に points 点程度まで間引いたインデックスを返す"""
+    if method not in DOWNSAMPLE_METHODS:
+        raise ValueError(f"未対応の間引き方法です: {method}")
+    return DOWNSAMPLE_METHODS[method](x, y, points)
@@ -0,0 +1,82 @@
+import threading
+import time
+from collections import OrderedDict
+
+# キャッシュのデフォルト設定
+DEFAULT_CACHE_SIZE = 1024      # 保持する予測結果の最大件数
+DEFAULT_CACHE_TTL = 300.0      # 予測結果を保持する秒数
+
+
+class ForecastCache:
+    """
+    予測結果の LRU/TTL キャッシュ
+
+    キーには系列・予測期間などのリクエストの内容に加えて、モデルのバージョンと
+    データのバージョンを含める。モデルの読み込みやデータの取り込みでバージョンが
+    上がると、古い結果は参照されなくなる（そのときにキャッシュも空にする）。
+    """
+
+    def __init__(self, max_entries=DEFAULT_CACHE_SIZE, ttl=DEFAULT_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self.data_version = 0
+        self.model_version = 0
+
+    def get(self, key):
+        """キャッシュされた結果を返す（ないか期限切れの場合は None）"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self._misses += 1
+            return None
+
+    def put(self, key, value):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def bump_data_version(self):
+        """売上データが変わったときに呼び出す"""
+        with self._lock:
+            self.data_version += 1
+            self._entries.clear()
+
+    def bump_model_version(self):
+        """予測に使うモデルが変わったときに呼び出す"""
+        with self._lock:
+            self.model_version += 1
+            self._entries.clear()
+
+    def versions(self):
+        with self._lock:
+            return self.model_version, self.data_version
+
+    def stats(self):
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'entries': len(self._entries),
+                'maxEntries': self.max_entries,
+                'ttl': self.ttl,
+                'hits': self._hits,
+                'misses': self._misses,
+                'hitRate': self._hits / lookups if lookups else 0.0,
+                'evictions': self._evictions,
+                'modelVersion': self.model_version,
+                'dataVersion': self.data_version
+            }
@@ -0,0 +1,312 @@
+import contextlib
+import io
+import itertools
+import math
+import multiprocessing
+import os
+import signal
+import sys
+import threading
+import time
+
+import numpy as np
+
+from app.backend.database import Database, sales_by_series
+from app.backend.parallel_training import available_cores
+from app.models.artifact import ARTIFACT_SUFFIX
+
+# 探索するハイパーパラメータと候補の値
+SEARCH_SPACE = {
+    'model_type': ('lstm', 'gru', 'tcn', 'transformer'),
+    'sequence_length': (7, 14, 28),
+    'hidden_layers': (1, 2, 3),
+    'hidden_units': (32, 64, 128),
+    'learning_rate': (0.0003, 0.001, 0.003)
+}
+
+# 各段階で次の段階に残す試行の割合の逆数
+DEFAULT_ETA = 3
+
+# 試行の評価で予測する最大の日数と、評価に使う最大の系列数
+SCORE_DAYS = 30
+SCORE_SERIES = 50
+
+# 次の段階で学習を続けるための最適化器などの状態を、試行のチェックポイントの隣に保存するファイルの接尾辞
+TRAINING_STATE_SUFFIX = '.state'
+
+# ワーカープロセスごとの状態（初期化時に設定する）
+_worker = {}
+
+
+def search_budget(data_size):
+    """
+    データサイズに応じた探索の予算を決める
+
+    Args:
+        data_size: データの行数
+
+    Returns:
+        max_epochs（1つの試行で学習する最大エポック数）, min_epochs（最初の段階のエポック数）,
+        eta, batch_size を持つ辞書
+    """
+    # 小さいデータセット (200行未満): 1エポックが短いので、長く学習してから比べる
+    if data_size < 200:
+        return {'max_epochs': 81, 'min_epochs': 27, 'eta': DEFAULT_ETA, 'batch_size': 16}
+    # 大きいデータセット (200-1000行)
+    elif data_size < 1000:
+        return {'max_epochs': 81, 'min_epochs': 9, 'eta': DEFAULT_ETA, 'batch_size': 32}
+    # 非常に大きいデータセット (1000行以上): 1エポックの更新回数が多いので、エポック数を抑える
+    else:
+        return {'max_epochs': 27, 'min_epochs': 3, 'eta': DEFAULT_ETA, 'batch_size': 64}
+
+
+def hyperband_brackets(max_epochs, min_epochs, eta=DEFAULT_ETA):
+    """
+    Hyperband のブラケットを [[(試行数, エポック数), ...], ...] で返す
+
+    各ブラケットは逐次半減法（successive halving）の段階のリストで、段階ごとに試行数を 1/eta にし、
+    残った試行を eta 倍のエポック数まで学習する。少ない試行を長く学習するブラケットから、
+    多くの試行を短く比較するブラケットまでを組み合わせる。
+    """
+    s_max = int(math.floor(math.log(max_epochs / min_epochs, eta) + 1e-9))
+    brackets = []
+    for s in range(s_max, -1, -1):
+        count = int(math.ceil((s_max + 1) / (s + 1) * eta ** s))
+        brackets.append([
+            (max(1, int(count / eta ** i)), int(round(max_epochs / eta ** (s - i))))
+            for i in range(s + 1)
+        ])
+    return brackets
+
+
+def sample_configs(count, rng):
+    """探索範囲から重複しない設定を count 個選ぶ（組み合わせの数を超える場合は重複を許す）"""
+    names = list(SEARCH_SPACE)
+    grid = list(itertools.product(*(SEARCH_SPACE[name] for name in names)))
+    indexes = rng.choice(len(grid), count, replace=count > len(grid))
+    return [dict(zip(names, grid[index])) for index in indexes]
+
+
+def _init_worker(db_path, series_ids, threads):
+    """ワーカープロセスの初期化: PyTorchのスレッド数を制限し、学習データを読み込んでおく"""
+    import torch
+
+    torch.set_num_threads(threads)
+    torch.set_num_interop_threads(1)
+    database = Database(db_path, pool_size=1)
+    try:
+        series_data = sales_by_series(database, series_ids)
+    finally:
+        database.close()
+    # 系列が1つの場合は1つの系列として学習する（run_training と同じ）
+    _worker['sales_data'] = series_data if len(series_data) > 1 else next(iter(series_data.values()), [])
+
+
+def _rollout_split(forecaster, sales_data, days):
+    """rollout_error で評価する系列・系列ID・日数を返す（評価できない場合は None）"""
+    series_list = list(sales_data.values())[:SCORE_SERIES] if isinstance(sales_data, dict) else [sales_data]
+    series_ids = list(sales_data)[:SCORE_SERIES] if isinstance(sales_data, dict) else None
+    split = forecaster.config.get('validation_split') or 0
+    sequence_length = forecaster.config['sequence_length']
+    days = min(days, min(int(len(rows) * split) for rows in series_list))
+    if days < 1 or min(len(rows) for rows in series_list) < days + sequence_length:
+        return None
+    return series_list, series_ids, days
+
+
+def _mape(series_list, predicted, days):
+    actual = np.array([[row[1] for row in rows[-days:]] for rows in series_list])
+    return float(np.mean(np.abs((actual - predicted) / np.where(actual == 0, 1, actual))) * 100)
+
+
+def rollout_error(forecaster, sales_data, days=SCORE_DAYS):
+    """検証用に分けた期間（最大 days 日）を、それより前の履歴から予測したときの誤差（MAPE, %）
+
+    検証損失は1日先（horizon 日先）の誤差なので、予測値をウィンドウに戻しながら何日も先まで予測する
+    実際の使い方での誤差とは異なる。学習に使っていない期間を実際と同じ方法で予測して評価する。
+    """
+    split = _rollout_split(forecaster, sales_data, days)
+    if split is None:
+        return None
+    series_list, series_ids, days = split
+    predicted = forecaster.predict_batch([rows[:-days] for rows in series_list], days, series_ids)
+    return _mape(series_list, predicted, days)
+
+
+def baseline_error(forecaster, sales_data, days=SCORE_DAYS):
+    """rollout_error と同じ期間を古典的な手法（baseline_forecast）で予測したときの誤差（MAPE, %）
+
+    学習したモデルが上回るべき基準として、学習済みモデルがない場合の予測と比べる。
+    """
+    from app.models.baselines import baseline_forecast
+
+    split = _rollout_split(forecaster, sales_data, days)
+    if split is None:
+        return None
+    series_list, _, days = split
+    predicted, _, _ = baseline_forecast([[row[1] for row in rows[:-days]] for rows in series_list], days)
+    return _mape(series_list, predicted, days)
+
+
+def _run_trial(task):
+    """1つの試行を epochs エポックまで学習し、検証用の期間を予測したときの誤差を返す
+
+    前の段階で学習したチェックポイントがあれば、そこから最適化器と学習率のスケジューラの状態も戻して学習を続ける
+    （状態はチェックポイントの隣の TRAINING_STATE_SUFFIX のファイルに保存する）。
+    検証用の期間の誤差を計算できない試行は score を None にして、他の試行と比べない。
+    失敗しても他の試行を続けられるように、例外は結果として返す。
+    """
+    trial_id, config, epochs, trained_epochs, batch_size, checkpoint, seed = task
+    try:
+        import torch
+        from app.models.lstm_model import DemandForecaster
+
+        start = time.perf_counter()
+        state_file = f"{checkpoint}{TRAINING_STATE_SUFFIX}"
+        with contextlib.redirect_stdout(io.StringIO()):
+            if trained_epochs:
+                forecaster = DemandForecaster()
+                if not forecaster.load_model(checkpoint, mmap=False):
+                    raise ValueError("チェックポイントを読み込めませんでした")
+                forecaster.training_state = torch.load(state_file)
+            else:
+                torch.manual_seed(seed + trial_id)
+                forecaster = DemandForecaster(config=config)
+            result = forecaster.train(_worker['sales_data'], epochs=epochs - trained_epochs, batch_size=batch_size,
+                                      resume=bool(trained_epochs))
+            forecaster.save_model(checkpoint)
+            torch.save(forecaster.training_state, state_file)
+
+        score = rollout_error(forecaster, _worker['sales_data'])
+        return {
+            'trialId': trial_id,
+            'epochs': epochs,
+            # 早期打ち切りで止まるまでに実際に学習したエポック数（前の段階からの通算）
+            'epochsRun': forecaster.metrics['epochs'],
+            'score': float(score) if score is not None and np.isfinite(score) else None,
+            'accuracy': float(result['accuracy']),
+            'seconds': time.perf_counter() - start
+        }
+    except Exception as e:
+        return {'trialId': trial_id, 'epochs': epochs, 'score': None, 'error': str(e)}
+
+
+def _exit_on_sigterm(signum, frame):
+    sys.exit(1)
+
+
+def hyperband_search(db_path, checkpoint_dir, series_ids=None, max_epochs=27, min_epochs=3, eta=DEFAULT_ETA,
+                     batch_size=32, base_config=None, workers=None, threads_per_worker=None, seed=0,
+                     callback=None):
+    """
+    Hyperband で学習の設定を探索する
+
+    ブラケットごとに SEARCH_SPACE から設定を無作為に選び、段階ごとに全ブラケットの試行をまとめて
+    プロセスプールで並列に学習する。各段階で検証用の期間の予測誤差（rollout_error）が小さい 1/eta の試行だけを次の段階に残し、
+    残りはそれ以上学習しない（早期打ち切り）。各試行のモデルは checkpoint_dir に保存する。
+
+    Args:
+        base_config: 探索しない設定（horizon など）
+        callback: callback(学習したエポック数 - 1, 予定の総エポック数, 試行の誤差) 形式の進捗通知関数
+
+    Returns:
+        best（最も誤差が小さい試行の config, score, accuracy, epochs（エポック数の予算）,
+        epochsRun（早期打ち切りを含めて実際に学習したエポック数）, checkpoint）,
+        trials, trialEpochs, seconds などを含む辞書
+    """
+    base_config = base_config or {}
+    rng = np.random.default_rng(seed)
+    cores = available_cores()
+    workers = max(1, workers or cores)
+    threads_per_worker = max(1, threads_per_worker or cores // workers)
+
+    # ブラケットごとの試行と、学習する予定の総エポック数（前の段階からの続きの分だけ数える）
+    brackets = hyperband_brackets(max_epochs, min_epochs, eta)
+    trials = []
+    bracket_trials = []
+    for rungs in brackets:
+        configs = sample_configs(rungs[0][0], rng)
+        ids = list(range(len(trials), len(trials) + len(configs)))
+        trials.extend({
+            'trialId': trial_id,
+            'config': dict(base_config, **config),
+            'epochs': 0,
+            'score': None,
+            'checkpoint': os.path.join(checkpoint_dir, f"trial-{trial_id}{ARTIFACT_SUFFIX}")
+        } for trial_id, config in zip(ids, configs))
+        bracket_trials.append(ids)
+    planned_epochs = sum(
+        count * (epochs - (rungs[i - 1][1] if i else 0))
+        for rungs in brackets for i, (count, epochs) in enumerate(rungs)
+    )
+
+    os.makedirs(checkpoint_dir, exist_ok=True)
+    print(f"設定の探索を開始: ブラケット数={len(brackets)}, 試行数={len(trials)}, "
+          f"予定の総エポック数={planned_epochs}, ワーカー数={workers}")
+
+    trained_epochs = 0
+    start = time.perf_counter()
+    pool = multiprocessing.get_context('spawn').Pool(
+        workers,
+        initializer=_init_worker,
+        initargs=(db_path, series_ids, threads_per_worker)
+    )
+    # ジョブのキャンセルで強制終了（SIGTERM）された場合も、finally でワーカーを止める
+    previous_handler = None
+    if threading.current_thread() is threading.main_thread():
+        previous_handler = signal.signal(signal.SIGTERM, _exit_on_sigterm)
+    try:
+        survivors = [list(ids) for ids in bracket_trials]
+        for rung in range(max(len(rungs) for rungs in brackets)):
+            # 各ブラケットの rung 段階目の試行をまとめて学習する
+            tasks = []
+            for rungs, ids in zip(brackets, survivors):
+                if rung >= len(rungs):
+                    continue
+                epochs = rungs[rung][1]
+                for trial_id in ids:
+                    trial = trials[trial_id]
+                    tasks.append((trial_id, trial['config'], epochs, trial['epochs'], batch_size,
+                                  trial['checkpoint'], seed))
+            for result in pool.imap_unordered(_run_trial, tasks):
+                trial = trials[result['trialId']]
+                trained_epochs += result['epochs'] - trial['epochs']
+                trial.update(result)
+                if 'error' in result:
+                    print(f"試行 {trial['trialId']} が失敗しました: {result['error']}")
+                if callback:
+                    callback(trained_epochs - 1, planned_epochs, result['score'] or 0.0)
+
+            # 誤差が小さい試行だけを次の段階に残す（失敗した試行は残さない）
+            for b, (rungs, ids) in enumerate(zip(brackets, survivors)):
+                if rung + 1 >= len(rungs):
+                    continue
+                ranked = sorted((trial_id for trial_id in ids if trials[trial_id]['score'] is not None),
+                                key=lambda trial_id: trials[trial_id]['score'])
+                survivors[b] = ranked[:rungs[rung + 1][0]]
+        pool.close()
+        pool.join()
+    finally:
+        # キャンセルなどで途中終了した場合は、実行中の試行も含めてワーカーを止める
+        pool.terminate()
+        if previous_handler is not None:
+            signal.signal(signal.SIGTERM, previous_handler)
+    elapsed = time.perf_counter() - start
+
+    # 誤差が最も小さい試行を選ぶ（同じ誤差なら長く学習した方）
+    finished = [trial for trial in trials if trial['score'] is not None]
+    if not finished:
+        raise ValueError("設定の探索で評価できた試行がありません（検証用の期間の予測誤差を計算できる試行がありませんでした）")
+    best = min(finished, key=lambda trial: (trial['score'], -trial['epochs']))
+
+    print(f"設定の探索が完了しました: {elapsed:.1f}秒, 最良の試行 {best['trialId']} "
+          f"(誤差 {best['score']:.4f}, {best['epochsRun']}エポック): {best['config']}")
+    return {
+        'best': {key: best[key] for key in ('config', 'score', 'accuracy', 'epochs', 'epochsRun', 'checkpoint')},
+        'trials': len(trials),
+        'failedTrials': sum(1 for trial in trials if 'error' in trial),
+        'trialEpochs': trained_epochs,
+        'brackets': brackets,
+        'seconds': elapsed,
+        'workers': workers
+    }
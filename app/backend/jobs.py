@@ -0,0 +1,228 @@
+import multiprocessing
+import queue
+import threading
+import time
+import uuid
+
+# ジョブの状態
+JOB_RUNNING = 'running'
+JOB_COMPLETED = 'completed'
+JOB_FAILED = 'failed'
+JOB_CANCELLED = 'cancelled'
+TERMINAL_STATES = (JOB_COMPLETED, JOB_FAILED, JOB_CANCELLED)
+
+
+class JobLimitError(Exception):
+    """同時実行できるジョブ数の上限に達した"""
+
+
+class JobCancelled(Exception):
+    """ワーカープロセス内でキャンセルが要求された"""
+
+
+def _job_entry(target, params, messages, cancel_event):
+    """ワーカープロセスのエントリポイント
+
+    target(params, callback) を実行し、callback(epoch, epochs, avg_loss) の
+    呼び出しを進捗メッセージとして親プロセスへ送る。
+    """
+    def callback(epoch, epochs, avg_loss):
+        messages.put(('progress', {'epoch': epoch + 1, 'epochs': epochs, 'loss': float(avg_loss)}))
+        if cancel_event.is_set():
+            raise JobCancelled()
+
+    try:
+        result = target(params, callback)
+        messages.put((JOB_COMPLETED, result))
+    except JobCancelled:
+        messages.put((JOB_CANCELLED, None))
+    except Exception as e:
+        messages.put((JOB_FAILED, str(e)))
+
+
+class TrainingJobManager:
+    """
+    学習ジョブを別プロセスで実行し、進捗を保持するマネージャー
+
+    各ジョブは spawn で起動したプロセスで実行される（HTTPサーバーのスレッドを
+    fork で複製しないため）。親プロセス側では監視スレッドがメッセージを受け取り、
+    ポーリング用のスナップショットと SSE 用のイベント列を更新する。
+    """
+
+    def __init__(self, max_jobs=1, cancel_grace=5.0, keep_finished=50):
+        self.max_jobs = max_jobs
+        self.cancel_grace = cancel_grace
+        self.keep_finished = keep_finished
+        self._ctx = multiprocessing.get_context('spawn')
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+
+    def submit(self, target, params, info=None, on_complete=None, daemon=True):
+        """ジョブを開始してジョブIDを返す。上限に達している場合は JobLimitError
+
+        on_complete を指定すると、ジョブが正常終了したときに結果を引数にして
+        （親プロセスの監視スレッドから）呼び出す。
+        ジョブの中でさらにプロセスを起動する場合は daemon=False にする
+        （デーモンプロセスは子プロセスを持てないため）。
+        """
+        with self._lock:
+            running = sum(1 for job in self._jobs.values() if job['status'] == JOB_RUNNING)
+            if running >= self.max_jobs:
+                raise JobLimitError(f"同時に実行できる学習ジョブは{self.max_jobs}件までです")
+
+            job_id = uuid.uuid4().hex[:12]
+            messages = self._ctx.Queue()
+            cancel_event = self._ctx.Event()
+            process = self._ctx.Process(
+                target=_job_entry,
+                args=(target, params, messages, cancel_event),
+                daemon=daemon
+            )
+            job = {
+                'id': job_id,
+                'status': JOB_RUNNING,
+                'info': info or {},
+                'createdAt': time.time(),
+                'finishedAt': None,
+                'epoch': 0,
+                'epochs': None,
+                'loss': None,
+                'result': None,
+                'error': None,
+                'events': [],
+                'process': process,
+                'messages': messages,
+                'cancel_event': cancel_event,
+                'on_complete': on_complete
+            }
+            self._jobs[job_id] = job
+            self._prune()
+
+        process.start()
+        threading.Thread(target=self._monitor, args=(job,), daemon=True).start()
+        return job_id
+
+    def _monitor(self, job):
+        """ワーカーからのメッセージを受け取り、ジョブの状態に反映する"""
+        process = job['process']
+        while True:
+            try:
+                kind, payload = job['messages'].get(timeout=0.5)
+            except queue.Empty:
+                if process.is_alive():
+                    continue
+                # 終了メッセージなしでプロセスが終了した
+                if job['cancel_event'].is_set():
+                    self._finish(job, JOB_CANCELLED)
+                else:
+                    self._finish(job, JOB_FAILED, error=f"ワーカープロセスが終了しました (exit code {process.exitcode})")
+                break
+
+            if kind == 'progress':
+                with self._changed:
+                    job['epoch'] = payload['epoch']
+                    job['epochs'] = payload['epochs']
+                    job['loss'] = payload['loss']
+                    job['events'].append(dict(payload, type='progress'))
+                    self._changed.notify_all()
+            elif kind == JOB_COMPLETED:
+                if job['on_complete']:
+                    try:
+                        job['on_complete'](payload)
+                    except Exception as e:
+                        print(f"ジョブ完了時の処理でエラーが発生しました: {e}")
+                self._finish(job, JOB_COMPLETED, result=payload)
+                break
+            else:
+                self._finish(job, kind, error=payload)
+                break
+
+        process.join(timeout=self.cancel_grace)
+
+    def _finish(self, job, status, result=None, error=None):
+        with self._changed:
+            if job['status'] in TERMINAL_STATES:
+                return
+            job['status'] = status
+            job['result'] = result
+            job['error'] = error
+            job['finishedAt'] = time.time()
+            job['events'].append({'type': status, 'result': result, 'error': error})
+            self._changed.notify_all()
+
+    def cancel(self, job_id):
+        """ジョブのキャンセルを要求する。猶予時間内に止まらなければ強制終了する"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return False
+            if job['status'] != JOB_RUNNING:
+                return True
+            job['cancel_event'].set()
+
+        def terminate_if_stuck():
+            if job['process'].is_alive():
+                job['process'].terminate()
+
+        timer = threading.Timer(self.cancel_grace, terminate_if_stuck)
+        timer.daemon = True
+        timer.start()
+        return True
+
+    def _snapshot(self, job):
+        return {
+            'jobId': job['id'],
+            'status': job['status'],
+            'epoch': job['epoch'],
+            'epochs': job['epochs'],
+            'loss': job['loss'],
+            'losses': [event['loss'] for event in job['events'] if event['type'] == 'progress'],
+            'result': job['result'],
+            'error': job['error'],
+            'createdAt': job['createdAt'],
+            'finishedAt': job['finishedAt'],
+            **job['info']
+        }
+
+    def get(self, job_id):
+        """ポーリング用にジョブの状態を返す（存在しない場合はNone）"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return self._snapshot(job) if job else None
+
+    def list(self):
+        with self._lock:
+            return [self._snapshot(job) for job in self._jobs.values()]
+
+    def iter_events(self, job_id, heartbeat=15.0):
+        """ジョブのイベントを順に返すジェネレーター（SSE用）
+
+        新しいイベントがない間は heartbeat 秒ごとに None を返す。
+        終了イベントを返したところで終わる。
+        """
+        index = 0
+        while True:
+            with self._changed:
+                job = self._jobs.get(job_id)
+                if job is None:
+                    return
+                if index >= len(job['events']):
+                    self._changed.wait(timeout=heartbeat)
+                pending = job['events'][index:]
+                index += len(pending)
+
+            if not pending:
+                yield None
+                continue
+            for event in pending:
+                yield event
+                if event['type'] in TERMINAL_STATES:
+                    return
+
+    def _prune(self):
+        """古い終了済みジョブを削除する（ロック取得済みで呼び出すこと）"""
+        finished = [job for job in self._jobs.values() if job['status'] in TERMINAL_STATES]
+        finished.sort(key=lambda job: job['finishedAt'])
+        for job in finished[:max(0, len(finished) - self.keep_finished)]:
+            del self._jobs[job['id']]
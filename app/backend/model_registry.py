@@ -0,0 +1,219 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+# 読み込んだモデルを保持するメモリの上限（重みの合計バイト数）
+DEFAULT_MEMORY_BUDGET = 256 * 1024 * 1024
+
+# 開いたままにしておくモデルファイルの数（1つのファイルに多数のモデルをまとめた場合に使い回す）
+MAX_OPEN_ARTIFACTS = 8
+
+# 一度に検索する系列数（SQLのパラメータ数の上限を超えないようにする）
+LOOKUP_CHUNK_SIZE = 500
+
+
+def data_version(rows, last_date):
+    """学習に使ったデータを表す文字列（件数と最後の日付）"""
+    return f"{rows}:{last_date}"
+
+
+def register_models(database, entries, settings_id=None):
+    """
+    学習済みモデルを登録する（同じ系列の有効なモデルは無効にする）
+
+    Args:
+        entries: 辞書のリスト。series_id（全系列のモデルは None）, model_file, model_name,
+            config, metrics, data_version を持つ
+
+    Returns:
+        登録したIDのリスト
+    """
+    created_at = datetime.now().isoformat()
+    ids = []
+    with database.transaction() as conn:
+        for entry in entries:
+            conn.execute("UPDATE model_registry SET active = 0 WHERE series_id IS ? AND active = 1",
+                         (entry['series_id'],))
+            cursor = conn.execute('''
+            INSERT INTO model_registry
+                (series_id, model_file, model_name, model_type, settings_id, data_version, config, metrics, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (
+                entry['series_id'], entry['model_file'], entry['model_name'],
+                entry['config'].get('model_type', 'lstm'), settings_id, entry.get('data_version'),
+                json.dumps(entry['config']), json.dumps(entry.get('metrics') or {}), created_at
+            ))
+            ids.append(cursor.lastrowid)
+    return ids
+
+
+def lookup_models(database, series_ids):
+    """系列ごとに登録されている有効なモデルを {系列ID: (登録ID, モデルファイル, モデル名)} で返す
+
+    系列ごとのモデルがない系列は含まない（全系列のモデルを使う）。
+    """
+    result = {}
+    for i in range(0, len(series_ids), LOOKUP_CHUNK_SIZE):
+        chunk = series_ids[i:i + LOOKUP_CHUNK_SIZE]
+        rows = database.query(f'''
+        SELECT series_id, id, model_file, model_name FROM model_registry
+        WHERE active = 1 AND series_id IN ({', '.join('?' * len(chunk))})
+        ''', chunk)
+        result.update((row[0], tuple(row[1:])) for row in rows)
+    return result
+
+
+def active_model_files(database):
+    """有効なモデルが使っているモデルファイルの集合"""
+    return {row[0] for row in database.query("SELECT DISTINCT model_file FROM model_registry WHERE active = 1")}
+
+
+def list_models(database, series_id=None, include_inactive=False, limit=100):
+    """登録されているモデルを新しい順に返す（API のレスポンス用の辞書のリスト）"""
+    conditions = []
+    params = []
+    if series_id is not None:
+        conditions.append("series_id = ?")
+        params.append(series_id)
+    if not include_inactive:
+        conditions.append("active = 1")
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+    rows = database.query(f'''
+    SELECT id, series_id, model_file, model_name, model_type, settings_id, data_version, metrics, created_at, active
+    FROM model_registry {where} ORDER BY id DESC LIMIT ?
+    ''', params + [limit])
+    return [{
+        'id': row[0],
+        'seriesId': row[1],
+        'modelFile': row[2],
+        'modelName': row[3],
+        'modelType': row[4],
+        'settingsId': row[5],
+        'dataVersion': row[6],
+        'metrics': json.loads(row[7]) if row[7] else {},
+        'createdAt': row[8],
+        'active': bool(row[9])
+    } for row in rows]
+
+
+def model_nbytes(forecaster):
+    """モデルの重みの合計バイト数"""
+    return sum(tensor.numel() * tensor.element_size() for tensor in forecaster.model.state_dict().values())
+
+
+class ModelRegistry:
+    """
+    系列ごとのモデルの読み込みと、読み込んだモデルの LRU キャッシュ
+
+    登録簿で系列のモデルを引き、読み込み済みならメモリ上のモデルをそのまま使い、
+    なければファイルから読み込む。重みの合計が memory_budget を超えたら、
+    最も長く使われていないモデルから破棄する。
+    """
+
+    def __init__(self, memory_budget=DEFAULT_MEMORY_BUDGET):
+        self.memory_budget = memory_budget
+        self._forecasters = OrderedDict()  # 登録ID → (モデル, バイト数)
+        self._artifacts = OrderedDict()    # (ファイル, 更新時刻) → ArtifactReader
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self._lookups = 0
+        self._found = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._load_seconds = 0.0
+
+    def forecasters_for(self, database, series_ids):
+        """系列ごとのモデルがある系列について {系列ID: DemandForecaster} を返す
+
+        モデルファイルが読み込めない系列は含めない（全系列のモデルか簡易予測で予測する）。
+        """
+        entries = lookup_models(database, series_ids)
+        with self._lock:
+            self._lookups += len(series_ids)
+            self._found += len(entries)
+        forecasters = {}
+        for series_id, entry in entries.items():
+            try:
+                forecasters[series_id] = self._get(*entry)
+            except Exception as e:
+                print(f"系列 {series_id} のモデルを読み込めませんでした: {e}")
+        return forecasters
+
+    def _get(self, registry_id, model_file, model_name):
+        with self._lock:
+            cached = self._forecasters.get(registry_id)
+            if cached is not None:
+                self._forecasters.move_to_end(registry_id)
+                self._hits += 1
+                return cached[0]
+            self._misses += 1
+
+        # 読み込みはロックの外で行う（同じモデルを同時に読み込んだ場合は後の方が残る）
+        start = time.perf_counter()
+        forecaster = self._load(model_file, model_name)
+        size = model_nbytes(forecaster)
+
+        with self._lock:
+            self._load_seconds += time.perf_counter() - start
+            previous = self._forecasters.pop(registry_id, None)
+            if previous is not None:
+                self._bytes -= previous[1]
+            self._forecasters[registry_id] = (forecaster, size)
+            self._bytes += size
+            # 今読み込んだモデルは残す
+            while self._bytes > self.memory_budget and len(self._forecasters) > 1:
+                _, (_, evicted_size) = self._forecasters.popitem(last=False)
+                self._bytes -= evicted_size
+                self._evictions += 1
+        return forecaster
+
+    def _load(self, model_file, model_name):
+        # PyTorchは系列ごとのモデルを使う場合だけ必要なので、ここで読み込む
+        from app.models.lstm_model import DemandForecaster
+
+        reader = self._open_artifact(model_file)
+        reader.metadata(model_name)  # モデルがない場合は KeyError
+        return DemandForecaster(reader, model_name=model_name)
+
+    def _open_artifact(self, model_file):
+        from app.models.artifact import ArtifactReader
+
+        key = (model_file, os.stat(model_file).st_mtime_ns)
+        with self._lock:
+            reader = self._artifacts.get(key)
+            if reader is not None:
+                self._artifacts.move_to_end(key)
+                return reader
+        reader = ArtifactReader(model_file)
+        with self._lock:
+            self._artifacts[key] = reader
+            while len(self._artifacts) > MAX_OPEN_ARTIFACTS:
+                self._artifacts.popitem(last=False)
+        return reader
+
+    def clear(self):
+        """読み込んだモデルをすべて破棄する（モデルが学習し直されたとき）"""
+        with self._lock:
+            self._forecasters.clear()
+            self._artifacts.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            loads = self._hits + self._misses
+            return {
+                'loadedModels': len(self._forecasters),
+                'bytes': self._bytes,
+                'memoryBudget': self.memory_budget,
+                'registryLookups': self._lookups,
+                'registryFound': self._found,
+                'hits': self._hits,
+                'misses': self._misses,
+                'hitRate': self._hits / loads if loads else 0.0,
+                'evictions': self._evictions,
+                'loadSeconds': self._load_seconds
+            }
@@ -0,0 +1,230 @@
+import contextlib
+import hashlib
+import io
+import json
+import multiprocessing
+import os
+import re
+import shutil
+import signal
+import sys
+import threading
+import time
+from datetime import datetime
+
+from app.backend.database import Database, list_series, sales_by_series
+from app.models.artifact import ARTIFACT_SUFFIX, DEFAULT_MODEL_NAME, pack_artifacts
+from app.models.windowing import window_count
+
+# 系列ごとのモデルの一覧（系列ID → モデルファイルとモデル名）を書き出すファイル名
+MANIFEST_FILE = 'manifest.json'
+
+# 全モデルを1つにまとめる場合のファイル名
+PACKED_FILE = f"series{ARTIFACT_SUFFIX}"
+
+# 学習ごとにモデルファイルを置くサブディレクトリの名前の接頭辞
+RUN_DIR_PREFIX = 'run-'
+
+# ワーカープロセスごとの状態（初期化時に設定する）
+_worker = {}
+
+
+def available_cores():
+    """このプロセスが使えるCPUコア数"""
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def model_filename(series_ids):
+    """系列ID（またはグループの先頭の系列ID）から、ファイル名に使える一意の名前を作る"""
+    key = '\n'.join(series_ids)
+    safe = re.sub(r'[^\w.-]', '_', series_ids[0])[:60]
+    suffix = f"+{len(series_ids) - 1}" if len(series_ids) > 1 else ''
+    return f"{safe}{suffix}-{hashlib.sha1(key.encode()).hexdigest()[:10]}{ARTIFACT_SUFFIX}"
+
+
+def remove_unused_runs(model_dir, used_files):
+    """model_dir の下の学習ごとのサブディレクトリのうち、used_files のファイルを含まないものを削除する
+
+    削除できないディレクトリ（Windows でまだメモリマップされているファイルがある場合など）は残し、
+    次に呼び出したときに削除し直す。
+
+    Returns:
+        削除したディレクトリのリスト
+    """
+    if not os.path.isdir(model_dir):
+        return []
+    used_dirs = {os.path.dirname(os.path.abspath(path)) for path in used_files}
+    removed = []
+    for name in sorted(os.listdir(model_dir)):
+        run_dir = os.path.abspath(os.path.join(model_dir, name))
+        if not name.startswith(RUN_DIR_PREFIX) or not os.path.isdir(run_dir) or run_dir in used_dirs:
+            continue
+        try:
+            shutil.rmtree(run_dir)
+        except OSError as e:
+            print(f"以前の学習のモデルを削除できませんでした（次の学習の完了時に削除し直します）: {e}")
+            continue
+        removed.append(run_dir)
+    return removed
+
+
+def _init_worker(db_path, threads):
+    """ワーカープロセスの初期化: PyTorchのスレッド数を制限し、DB接続を開く"""
+    import torch
+
+    # ワーカー数 × スレッド数がコア数を超えないようにする
+    torch.set_num_threads(threads)
+    torch.set_num_interop_threads(1)
+    _worker['database'] = Database(db_path, pool_size=1)
+
+
+def _train_group(task):
+    """1つのモデル（1系列、または複数系列のグローバルモデル）を学習して保存する
+
+    失敗しても他のグループの学習を続けられるように、例外は結果として返す。
+    """
+    series_ids, config, epochs, batch_size, model_dir = task
+    try:
+        return _train_model(series_ids, config, epochs, batch_size, model_dir)
+    except Exception as e:
+        return {'seriesIds': series_ids, 'error': str(e)}
+
+
+def _train_model(series_ids, config, epochs, batch_size, model_dir):
+    from app.models.lstm_model import DemandForecaster
+
+    start = time.perf_counter()
+    series_data = sales_by_series(_worker['database'], series_ids)
+    forecaster = DemandForecaster(config=config)
+    sales_data = series_data if len(series_ids) > 1 else series_data.get(series_ids[0], [])
+
+    model_file = os.path.join(model_dir, model_filename(series_ids))
+    # エポックごとのログは系列数が多いと膨大になるため出力しない
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = forecaster.train(sales_data, epochs=epochs, batch_size=batch_size)
+        forecaster.save_model(model_file)
+
+    return {
+        'seriesIds': series_ids,
+        'modelFile': model_file,
+        'modelName': DEFAULT_MODEL_NAME,
+        'accuracy': float(result['accuracy']),
+        'finalLoss': forecaster.metrics['final_loss'],
+        'trainedRows': forecaster.metrics['trained_rows'],
+        'trainingSeconds': time.perf_counter() - start
+    }
+
+
+def _exit_on_sigterm(signum, frame):
+    sys.exit(1)
+
+
+def train_series_parallel(db_path, model_dir, config=None, epochs=50, batch_size=32, series_ids=None,
+                          group_size=1, workers=None, threads_per_worker=None, pack=False, callback=None):
+    """
+    系列ごと（または group_size 系列ごと）のモデルをプロセスプールで並列に学習する
+
+    各ワーカーは自分でDBから担当の系列を読み込み、学習したモデルを model_dir の下の学習ごとの
+    サブディレクトリに保存する（サーバーがメモリマップしている以前のモデルファイルを上書きしないため）。
+    ワーカー数 × ワーカーあたりのスレッド数は、使えるコア数に収まるように決める。
+
+    Args:
+        group_size: 1つのモデルで学習する系列数（1の場合は系列ごとのモデル）
+        workers: ワーカープロセス数（省略時はコア数）
+        threads_per_worker: ワーカーあたりの PyTorch のスレッド数（省略時はコア数 / ワーカー数）
+        pack: 学習後に全モデルを1つのファイル（PACKED_FILE）にまとめるかどうか
+        callback: callback(完了したモデル数 - 1, モデル数, 最終損失) 形式の進捗通知関数
+
+    Returns:
+        models（学習したモデルの一覧）, failed（失敗したグループ）, seriesPerMinute などを含む辞書
+    """
+    config = config or {}
+    cores = available_cores()
+    workers = max(1, workers or cores)
+    threads_per_worker = max(1, threads_per_worker or cores // workers)
+
+    # 学習に必要な件数がある系列だけを対象にする
+    database = Database(db_path, pool_size=1)
+    try:
+        counts = {row[0]: row[1] for row in list_series(database)}
+    finally:
+        database.close()
+    sequence_length = config.get('sequence_length', 7)
+    horizon = config.get('horizon', 1)
+    series_ids = [
+        series_id for series_id in (series_ids or sorted(counts))
+        if window_count(counts.get(series_id, 0), sequence_length, horizon) > 0
+    ]
+    groups = [series_ids[i:i + group_size] for i in range(0, len(series_ids), group_size)]
+    if not groups:
+        raise ValueError("学習に必要なデータがある系列がありません")
+
+    run_dir = os.path.join(model_dir, f"{RUN_DIR_PREFIX}{datetime.now():%Y%m%d-%H%M%S-%f}")
+    os.makedirs(run_dir, exist_ok=True)
+    print(f"系列ごとの学習を開始: モデル数={len(groups)}, 系列数={len(series_ids)}, "
+          f"ワーカー数={workers}, スレッド数/ワーカー={threads_per_worker}")
+
+    models = []
+    failed = []
+    start = time.perf_counter()
+    pool = multiprocessing.get_context('spawn').Pool(
+        workers,
+        initializer=_init_worker,
+        initargs=(db_path, threads_per_worker)
+    )
+    # ジョブのキャンセルで強制終了（SIGTERM）された場合も、finally でワーカーを止める
+    previous_handler = None
+    if threading.current_thread() is threading.main_thread():
+        previous_handler = signal.signal(signal.SIGTERM, _exit_on_sigterm)
+    try:
+        tasks = [(group, config, epochs, batch_size, run_dir) for group in groups]
+        for model in pool.imap_unordered(_train_group, tasks):
+            if 'error' in model:
+                failed.append(model)
+            else:
+                models.append(model)
+            if callback:
+                callback(len(models) + len(failed) - 1, len(groups), model.get('finalLoss') or 0.0)
+        pool.close()
+        pool.join()
+    finally:
+        # キャンセルなどで途中終了した場合は、実行中の学習も含めてワーカーを止める
+        pool.terminate()
+        if previous_handler is not None:
+            signal.signal(signal.SIGTERM, previous_handler)
+
+    if pack and models:
+        # 多数のモデルを1つのファイルにまとめる（読み込み時は1回の memmap で済む）
+        packed_file = os.path.join(run_dir, PACKED_FILE)
+        pack_artifacts(packed_file, {
+            os.path.basename(model['modelFile']): (model['modelFile'], model['modelName']) for model in models
+        })
+        for model in models:
+            os.remove(model['modelFile'])
+            model['modelName'] = os.path.basename(model['modelFile'])
+            model['modelFile'] = packed_file
+    elapsed = time.perf_counter() - start
+
+    # 系列ID → モデルファイルとモデル名の一覧を書き出す
+    manifest = {
+        series_id: {'file': model['modelFile'], 'name': model['modelName']}
+        for model in models for series_id in model['seriesIds']
+    }
+    with open(os.path.join(model_dir, MANIFEST_FILE), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False)
+
+    trained_series = len(manifest)
+    print(f"系列ごとの学習が完了しました: {trained_series}系列, {elapsed:.1f}秒, "
+          f"{trained_series / elapsed * 60:.1f}系列/分")
+    return {
+        'models': models,
+        'failed': failed,
+        'trainedSeries': trained_series,
+        'trainingSeconds': elapsed,
+        'seriesPerMinute': trained_series / elapsed * 60,
+        'workers': workers,
+        'threadsPerWorker': threads_per_worker,
+        'manifest': os.path.join(model_dir, MANIFEST_FILE)
+    }
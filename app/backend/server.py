@@ -1,16 +1,12 @@
 import json
 import sys
 import os
-import csv
-import sqlite3
+import io
 from datetime import datetime, timedelta
 from http.server import HTTPServer, BaseHTTPRequestHandler
 import urllib.parse
 import numpy as np
-import pandas as pd
-from sklearn.preprocessing import MinMaxScaler
-from keras.models import Sequential
-from keras.layers import Dense
+import threading
 import time
 
 # アプリのルートディレクトリを取得
@@ -24,54 +20,172 @@ else:
 # データベースのパス設定
 DB_PATH = os.path.join(APP_ROOT, 'app', 'database', 'sales_data.db')
 MODEL_PATH = os.path.join(APP_ROOT, 'app', 'models')
+MODEL_FILE = os.path.join(MODEL_PATH, 'saved', 'demand_forecaster.fcm')
+LEGACY_MODEL_FILE = os.path.join(MODEL_PATH, 'saved', 'demand_forecaster.pt')  # 以前の形式（torch.save）
+SERIES_MODEL_DIR = os.path.join(MODEL_PATH, 'saved', 'series')
 
-# データベースの初期化
-def init_database():
-    os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+# appパッケージを読み込めるようにする
+if APP_ROOT not in sys.path:
+    sys.path.insert(0, APP_ROOT)
+
+from app.backend.coalescer import PredictCoalescer
+from app.backend.concurrency import PooledHTTPServer, pool_config_from_env
+from app.backend.database import (
+    DEFAULT_SERIES, Database, create_schema, normalize_date, recent_sales, recent_sales_by_series,
+    sales_in_range, iter_sales, sales_page, count_sales, list_series
+)
+from app.backend.downsampling import downsample
+from app.backend.date_index import DateIndexCache
+from app.backend.forecast_cache import ForecastCache
+from app.backend.hyperparameter_search import search_budget
+from app.backend.parallel_training import remove_unused_runs
+from app.backend.model_registry import ModelRegistry, active_model_files, list_models
+from app.backend.csv_import import import_csv, open_text_body
+from app.backend.jobs import JOB_RUNNING, TrainingJobManager, JobLimitError
+from app.backend.training import run_training, run_search_training, run_series_training
+from app.models.baselines import BASELINE_HISTORY_DAYS, baseline_forecast
+from app.models.calendar_features import horizon_dates
+
+# 予測レスポンスに含める実績データの既定の日数
+DEFAULT_HISTORY_DAYS = 365
+
+# /api/data のストリーミング応答で1回に書き出す行数
+STREAM_BATCH_SIZE = 1000
+
+# /api/predict/batch で一度に受け付けるリクエスト数の上限
+MAX_BATCH_REQUESTS = 10000
+
+# 予測結果のキャッシュ（件数と保持秒数は環境変数で変更可能）
+FORECAST_CACHE = ForecastCache(
+    max_entries=int(os.environ.get('FORECAST_CACHE_SIZE', 1024)),
+    ttl=float(os.environ.get('FORECAST_CACHE_TTL', 300))
+)
+
+# 前年比などの計算に使う系列ごとの日付インデックス（データのバージョンごとに作り直す。メモリの上限は環境変数で変更可能）
+DATE_INDEX = DateIndexCache(max_bytes=int(os.environ.get('FORECAST_DATE_INDEX_MB', 64)) * 1024 * 1024)
+
+# 系列ごとのモデルの登録簿と、読み込んだモデルのキャッシュ（メモリの上限は環境変数で変更可能）
+MODEL_REGISTRY = ModelRegistry(memory_budget=int(os.environ.get('FORECAST_MODEL_MEMORY_MB', 256)) * 1024 * 1024)
+
+# 学習ジョブの管理（同時実行数の上限は環境変数で変更可能）
+TRAINING_JOBS = TrainingJobManager(max_jobs=int(os.environ.get('FORECAST_MAX_TRAINING_JOBS', 1)))
+
+# データベース接続プール（DB_PATHごとに1つ）
+_database = None
+_database_lock = threading.Lock()
+
+def get_database():
+    """共有の接続プールを取得する"""
+    global _database
+    with _database_lock:
+        if _database is None or _database.path != DB_PATH:
+            if _database is not None:
+                _database.close()
+            _database = Database(DB_PATH)
+        return _database
+
+# 学習済みモデル（起動時と学習完了時に読み込み、メモリ上に保持する）
+_forecaster = None
+_forecaster_lock = threading.Lock()
+
+def load_forecaster(model_file=None):
+    """保存済みのモデルを読み込んで、予測に使うモデルを差し替える"""
+    global _forecaster
+    model_file = model_file or MODEL_FILE
+    if model_file == MODEL_FILE and not os.path.exists(model_file) and os.path.exists(LEGACY_MODEL_FILE):
+        model_file = LEGACY_MODEL_FILE
+    if not os.path.exists(model_file):
+        print("学習済みモデルがないため、古典的な手法（季節ナイーブ・Holt-Winters・Croston）で予測します")
+        return None
     
-    # 売上データテーブルの作成
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS sales_data (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        date TEXT NOT NULL,
-        sales REAL NOT NULL,
-        features TEXT
-    )
-    ''')
+    # PyTorchは学習済みモデルがある場合だけ必要なので、ここで読み込む
+    from app.models.lstm_model import DemandForecaster
     
-    # 設定テーブルの作成
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS settings (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        model_type TEXT NOT NULL,
-        hidden_layers INTEGER NOT NULL,
-        hidden_units INTEGER NOT NULL,
-        auto_mode INTEGER NOT NULL
-    )
-    ''')
+    forecaster = DemandForecaster()
+    # 次の学習がこのファイルを置き換えるので、メモリマップせずに読み込む
+    # （Windows ではメモリマップ中のファイルを os.replace できない）
+    if not forecaster.load_model(model_file, mmap=False):
+        return None
     
-    # デフォルト設定の挿入（存在しない場合）
-    cursor.execute("SELECT COUNT(*) FROM settings")
-    if cursor.fetchone()[0] == 0:
-        cursor.execute('''
-        INSERT INTO settings (model_type, hidden_layers, hidden_units, auto_mode)
-        VALUES (?, ?, ?, ?)
-        ''', ('lstm', 2, 64, 0))
+    with _forecaster_lock:
+        _forecaster = forecaster
+    FORECAST_CACHE.bump_model_version()
+    return forecaster
+
+def get_forecaster():
+    with _forecaster_lock:
+        return _forecaster
+
+def _is_model_type(model_type):
+    """学習できるモデルタイプかどうか（学習を依頼されたときだけ PyTorch を読み込む）"""
+    from app.models.lstm_model import MODEL_TYPES
+    return model_type in MODEL_TYPES
+
+def _positive_int(value, name):
+    """クエリパラメータを1以上の整数に変換する。変換できない場合は ValueError"""
+    try:
+        number = int(value)
+    except ValueError:
+        number = 0
+    if number < 1:
+        raise ValueError(f"{name} には1以上の整数を指定してください")
+    return number
+
+def reload_series_models():
+    """系列ごとのモデルが学習し直されたときに、読み込み済みのモデルと予測結果を破棄する"""
+    MODEL_REGISTRY.clear()
+    FORECAST_CACHE.bump_model_version()
+
+def finish_series_training(result):
+    """系列ごとの学習の完了時に、読み込み済みのモデルを破棄してから、
+    有効なモデルが使わなくなった以前の学習のモデルファイルを削除する"""
+    reload_series_models()
+    # 他の系列ごとの学習が実行中の場合は、まだ登録されていないそのジョブのモデルを消さないように削除しない
+    running = [job for job in TRAINING_JOBS.list() if job.get('kind') == 'series' and job['status'] == JOB_RUNNING]
+    if len(running) <= 1:
+        remove_unused_runs(SERIES_MODEL_DIR, active_model_files(get_database()))
+
+# 起動時の準備（サンプルデータの生成・学習済みモデルの読み込み）の状態
+# ポートを開いた後にバックグラウンドで行い、/api/ready で確認できる
+_warmup = {'state': 'pending', 'error': None, 'seconds': None}
+_warmup_lock = threading.Lock()
+
+def warm_up():
+    """起動時の準備を行う（サーバーの起動後にバックグラウンドのスレッドで実行する）"""
+    with _warmup_lock:
+        _warmup['state'] = 'warming'
+    start = time.perf_counter()
+    try:
+        # サンプルデータの生成
+        generate_sample_data()
+        
+        # 学習済みモデルを一度だけ読み込む（PyTorchの読み込みもここで行われる）
+        load_forecaster()
+    except Exception as e:
+        print(f"起動時の準備に失敗しました: {e}")
+        with _warmup_lock:
+            _warmup.update(state='failed', error=str(e), seconds=time.perf_counter() - start)
+        return
     
-    conn.commit()
-    conn.close()
+    with _warmup_lock:
+        _warmup.update(state='ready', seconds=time.perf_counter() - start)
+    print(f"起動時の準備が完了しました ({_warmup['seconds']:.2f}秒)")
+
+def warmup_status():
+    with _warmup_lock:
+        return dict(_warmup, ready=_warmup['state'] == 'ready', modelLoaded=get_forecaster() is not None)
+
+# データベースの初期化
+def init_database():
+    with get_database().transaction() as conn:
+        create_schema(conn)
 
 # サンプルデータの生成（デモ用）
 def generate_sample_data():
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+    database = get_database()
     
     # テーブルが空かどうかを確認
-    cursor.execute("SELECT COUNT(*) FROM sales_data")
-    if cursor.fetchone()[0] > 0:
-        conn.close()
+    if count_sales(database) > 0:
         return  # データが既に存在する場合は生成しない
     
     # 過去1年分のサンプルデータを生成
@@ -92,171 +206,163 @@ def generate_sample_data():
         sales_data.append((date.strftime('%Y-%m-%d'), max(0, sales), None))
     
     # データをデータベースに挿入
-    cursor.executemany('''
-    INSERT INTO sales_data (date, sales, features)
-    VALUES (?, ?, ?)
-    ''', sales_data)
-    
-    conn.commit()
-    conn.close()
+    with database.transaction() as conn:
+        conn.executemany('''
+        INSERT INTO sales_data (date, sales, features)
+        VALUES (?, ?, ?)
+        ''', sales_data)
+    FORECAST_CACHE.bump_data_version()
 
-class SimplePredictionModel:
-    """モデルが利用できない場合の簡易予測モデル"""
-    
-    def __init__(self):
-        print("簡易予測モデルを初期化しています")
-        self.trained = True
+def import_sales(database, text_stream, mode='replace'):
+    """CSVを取り込み、データが変わった場合は予測結果のキャッシュを無効にする"""
+    summary = import_csv(database, text_stream, mode)
+    if summary['inserted'] or summary['updated'] or summary['deleted']:
+        FORECAST_CACHE.bump_data_version()
+    return summary
+
+def forecast_series(histories, period, history_days, series_ids, forecaster=None, date_indexes=None):
+    """
+    複数の系列の予測をまとめて行い、系列ごとに /api/predict のレスポンスを返す
     
-    def predict(self, x_input):
-        """簡易的な予測を行う"""
-        # 入力の最後の値を基準に、少しランダム性を持たせた予測を返す
-        last_value = x_input[0][-1][0]
-        # 過去5〜10日分の変動率を考慮した予測
-        prediction = last_value * (1 + np.random.uniform(-0.05, 0.05))
-        return np.array([[prediction]])
+    学習済みモデルがある場合は全系列を1つのバッチにして順伝播する
+    （履歴がモデルの入力日数に満たない系列だけは古典的な手法で予測する）。
+    予測日数が系列ごとに違う場合は、最も長い日数でまとめて予測してから切り出す。
+    同じ入力（系列・データ・モデル）には常に同じ結果を返す（予測日数が違っても先頭は同じ値）。
     
-    def fit(self, x, y, epochs=10, batch_size=32, verbose=0):
-        """訓練のフリをする"""
-        print(f"簡易モデル: 訓練をシミュレート (エポック={epochs}, バッチサイズ={batch_size})")
-        time.sleep(0.5)  # 訓練の時間をシミュレート
-        return self
-
-# 需要予測モデルの実装（簡易版）
-# 実際のプロダクションでは、より洗練されたモデルを使用する
-class DemandForecastModel:
-    def __init__(self, settings=None):
-        self.settings = settings or {'model_type': 'lstm', 'hidden_layers': 2, 'hidden_units': 64}
-        self.scaler = MinMaxScaler(feature_range=(0, 1))
+    Args:
+        histories: 系列ごとの直近の行 [(date, sales), ...] のリスト（空でないこと）
+        period: 予測日数（系列ごとのリストも可）
+        history_days: レスポンスに含める実績の日数（系列ごとのリストも可）
+        series_ids: histories と同じ順の系列ID
+        forecaster: 予測に使うモデル（None の場合は古典的な手法で予測する）
+        date_indexes: histories と同じ順の SeriesDateIndex（前年比などの計算に使う。None の場合は計算しない）
+    """
+    periods = [period] * len(histories) if isinstance(period, int) else list(period)
+    history_days = [history_days] * len(histories) if isinstance(history_days, int) else list(history_days)
+    max_period = max(periods)
     
-    def prepare_data(self, data, seq_length=7):
-        # データの前処理
-        sales = np.array([float(row[1]) for row in data])
-        sales_scaled = self.scaler.fit_transform(sales.reshape(-1, 1))
-        
-        X, y = [], []
-        for i in range(len(sales_scaled) - seq_length):
-            X.append(sales_scaled[i:i+seq_length])
-            y.append(sales_scaled[i+seq_length])
-        
-        return np.array(X), np.array(y)
+    # 学習済みモデルがない系列と、履歴がモデルの入力日数に満たない系列は
+    # 古典的な手法（季節ナイーブ・Holt-Winters・Croston）で予測する
+    baseline = [i for i, rows in enumerate(histories)
+                if forecaster is None or len(rows) < forecaster.config['sequence_length']]
+    forecasts = np.empty((len(histories), max_period))
+    accuracies = [None] * len(histories)
+    model_types = ['baseline'] * len(histories)
+    methods = {}
+    if len(baseline) < len(histories):
+        # 学習済みモデルで予測（メモリ上のモデルで順伝播するだけ）
+        skipped = set(baseline)
+        modeled = [i for i in range(len(histories)) if i not in skipped]
+        forecasts[modeled] = np.maximum(forecaster.predict_batch(
+            [histories[i] for i in modeled], max_period, [series_ids[i] for i in modeled]
+        ), 0.0)
+        for i in modeled:
+            accuracies[i] = forecaster.metrics.get('accuracy')
+            model_types[i] = forecaster.config['model_type']
+    if baseline:
+        forecasts[baseline], baseline_methods, error_rates = baseline_forecast(
+            [[row[1] for row in histories[i]] for i in baseline], max_period
+        )
+        for i, method, rate in zip(baseline, baseline_methods, error_rates):
+            methods[i] = method
+            # 精度は直近の期間を除いて当てはめたときの、その期間の予測の誤差率から求める
+            accuracies[i] = None if np.isnan(rate) else float(max(0.0, 100 - rate))
     
-    def train(self, data, epochs=50, batch_size=32):
-        # 簡易実装: 実際にはPyTorchやTensorFlowを使用して深層学習モデルを訓練する
-        # ここではサンプルの進捗を返すだけ
-        print(f"モデルのトレーニングを開始: エポック数={epochs}, バッチサイズ={batch_size}")
-        
-        # 訓練進捗のシミュレーション
-        for epoch in range(epochs):
-            # 実際の訓練ロジックをここに実装
-            loss = 1.0 - (epoch / epochs) * 0.9  # 損失が徐々に減少するシミュレーション
-            print(f"エポック {epoch+1}/{epochs}, 損失: {loss:.4f}")
-        
-        # モデルの保存
-        # 実際の実装では、学習済みモデルをファイルに保存
-        print("モデルの訓練が完了しました。")
-        return {'accuracy': 85.0 + np.random.uniform(0, 10)}  # ダミーの精度
+    # 予測期間の日付は全系列分をまとめて生成する
+    forecast_dates = horizon_dates([rows[-1][0] for rows in histories], max_period).astype(str)
     
-    def predict(self, data, period=30):
-        # ダミーの予測結果を生成
-        last_date = datetime.strptime(data[-1][0], '%Y-%m-%d')
-        dates = [(last_date + timedelta(days=i+1)).strftime('%Y-%m-%d') for i in range(period)]
+    results = []
+    for i, rows in enumerate(histories):
+        period = periods[i]
+        forecast_values = forecasts[i, :period].tolist()
         
-        # 最近のデータから基本的なパターンを抽出
-        recent_sales = [float(row[1]) for row in data[-14:]]
-        mean_sales = np.mean(recent_sales)
-        std_sales = np.std(recent_sales)
+        # 日付とデータを分離
+        dates = [row[0] for row in rows[-history_days[i]:]]
+        values = [row[1] for row in rows[-history_days[i]:]]
         
-        # トレンドと季節性を考慮したシンプルな予測
-        forecast = []
-        for i in range(period):
-            # 週末効果
-            weekday = (last_date + timedelta(days=i+1)).weekday()
-            weekday_factor = 1.3 if weekday >= 5 else 1.0
-            
-            # 季節効果（単純化）
-            day_of_year = (last_date + timedelta(days=i+1)).timetuple().tm_yday
-            season_factor = 1.0 + 0.2 * np.sin(np.pi * day_of_year / 180)
-            
-            # 上昇トレンド
-            trend_factor = 1.0 + (i / 365) * 0.1
-            
-            # 基本予測値にノイズを加える
-            predicted_value = mean_sales * weekday_factor * season_factor * trend_factor
-            predicted_value += np.random.normal(0, std_sales * 0.1)
-            forecast.append(max(0, predicted_value))
-        
-        # 履歴データも返す（グラフ表示用）
-        historical_dates = [row[0] for row in data[-60:]]
-        historical_data = [float(row[1]) for row in data[-60:]]
+        # 前年比・前週比（日付のインデックスから期間の合計を引くだけ）
+        total_demand = sum(forecast_values)
+        comparisons = {'yearOverYearChange': None, 'samePeriodLastYear': None, 'weekOverWeekChange': None}
+        if date_indexes is not None and date_indexes[i] is not None:
+            comparisons = date_indexes[i].comparisons(total_demand, period)
         
-        # 前年同期と比較
-        year_ago_sales = [float(row[1]) for row in data if
-                          datetime.strptime(row[0], '%Y-%m-%d') >= last_date - timedelta(days=365) and
-                          datetime.strptime(row[0], '%Y-%m-%d') <= last_date - timedelta(days=365-period)]
-        
-        # 前年同期データがある場合は前年比を計算
-        if len(year_ago_sales) >= period:
-            yoy_change = (sum(forecast) / sum(year_ago_sales) - 1) * 100
-        else:
-            yoy_change = 0
-        
-        return {
-            'dates': dates,
-            'forecastData': forecast,
-            'historicalDates': historical_dates,
-            'historicalData': historical_data,
-            'totalDemand': sum(forecast),
-            'yearOverYearChange': yoy_change,
-            'accuracy': 85.0 + np.random.uniform(0, 10)  # ダミーの精度
-        }
-
-# データサイズに基づいて最適なパラメータを決定する関数
-def determine_optimal_parameters(data_size):
+        # 実績データと予測データを結合
+        results.append({
+            'dates': dates + forecast_dates[i, :period].tolist(),
+            'historicalData': values + [None] * period,
+            'forecastData': [None] * len(dates) + forecast_values,
+            'totalDemand': total_demand,  # 予測総需要
+            **comparisons,
+            'accuracy': accuracies[i],
+            'modelType': model_types[i],
+            **({'baselineMethod': methods[i]} if i in methods else {})
+        })
+    return results
+
+def predict_requests(requests):
     """
-    データサイズに基づいて最適なモデルパラメータを決定する
+    予測リクエスト [(系列ID, 予測日数, 実績の日数), ...] をまとめて処理する
     
-    Args:
-        data_size: データの行数
+    キャッシュにないリクエストだけを、系列の履歴を1つの接続でまとめて読み込み、
+    同じモデルを使うリクエストを1つのバッチにして予測する。
     
     Returns:
-        最適なパラメータの辞書
+        (requests と同じ順の結果のリスト（履歴がない系列は None）, 履歴がない系列IDのリスト)
     """
-    # 小さいデータセット (50行未満)
-    if data_size < 50:
-        return {
-            'model_type': 'lstm',
-            'hidden_layers': 1,
-            'hidden_units': 32,
-            'epochs': 30,
-            'batch_size': 4
-        }
-    # 中程度のデータセット (50-200行)
-    elif data_size < 200:
-        return {
-            'model_type': 'lstm',
-            'hidden_layers': 2,
-            'hidden_units': 64,
-            'epochs': 50,
-            'batch_size': 16
-        }
-    # 大きいデータセット (200-1000行)
-    elif data_size < 1000:
-        return {
-            'model_type': 'gru',
-            'hidden_layers': 3,
-            'hidden_units': 128,
-            'epochs': 100,
-            'batch_size': 32
-        }
-    # 非常に大きいデータセット (1000行以上)
-    else:
-        return {
-            'model_type': 'transformer',
-            'hidden_layers': 4,
-            'hidden_units': 256,
-            'epochs': 150,
-            'batch_size': 64
-        }
+    # モデルかデータが変わるとキーが変わる（バージョンを先に読むので、途中で変わった場合は古いキーに保存されるだけ）
+    model_version, data_version = FORECAST_CACHE.versions()
+    forecaster = get_forecaster()
+    keys = [
+        (series_id, period, history_days, model_version, data_version)
+        for series_id, period, history_days in requests
+    ]
+    results = [FORECAST_CACHE.get(key) for key in keys]
+    pending = [i for i, result in enumerate(results) if result is None]
+    if not pending:
+        return results, []
+    series_ids = list(dict.fromkeys(requests[i][0] for i in pending))
+    database = get_database()
+    
+    # 系列ごとのモデルがある系列はそのモデルで予測する（ない系列は全系列のモデルか簡易予測）
+    series_models = MODEL_REGISTRY.forecasters_for(database, series_ids)
+    models = [forecaster] + list(series_models.values())
+    
+    # 予測とグラフ表示に必要な直近のデータだけを取得
+    window = max([30] + [requests[i][2] for i in pending] +
+                 [model.config['sequence_length'] if model else BASELINE_HISTORY_DAYS for model in models])
+    histories = recent_sales_by_series(database, series_ids, window)
+    missing = [series_id for series_id in series_ids if not histories[series_id]]
+    pending = [i for i in pending if histories[requests[i][0]]]
+    
+    # 前年比の計算に使う日付のインデックス（データのバージョンごとに一度だけ作る）
+    indexes = DATE_INDEX.get_many(database, [series_id for series_id in series_ids if histories[series_id]],
+                                  data_version)
+    
+    # 同じモデルを使うリクエストごとにまとめて予測する
+    groups = {}
+    for i in pending:
+        model = series_models.get(requests[i][0], forecaster)
+        groups.setdefault(id(model), (model, []))[1].append(i)
+    for model, group in groups.values():
+        group_series = [requests[i][0] for i in group]
+        forecasts = forecast_series(
+            [histories[series_id] for series_id in group_series],
+            [requests[i][1] for i in group],
+            [requests[i][2] for i in group],
+            group_series, model,
+            [indexes[series_id] for series_id in group_series]
+        )
+        for i, result in zip(group, forecasts):
+            FORECAST_CACHE.put(keys[i], result)
+            results[i] = result
+    return results, missing
+
+# 同時に届いた /api/predict をまとめる待ち時間（ミリ秒、0 でまとめない）と1回の予測件数の上限
+PREDICT_COALESCER = PredictCoalescer(
+    predict_requests,
+    max_wait=float(os.environ.get('FORECAST_COALESCE_MS', 2)) / 1000,
+    max_batch=int(os.environ.get('FORECAST_COALESCE_MAX_BATCH', 64))
+)
 
 # リクエストハンドラ
 class DemandForecastHandler(BaseHTTPRequestHandler):
@@ -280,6 +386,144 @@ class DemandForecastHandler(BaseHTTPRequestHandler):
     def log_message(self, format, *args):
         print(f"[{self.log_date_time_string()}] {format % args}")
     
+    def _send_json_error(self, status, message):
+        self.send_response(status)
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Content-type', 'application/json')
+        self.end_headers()
+        self.wfile.write(json.dumps({'success': False, 'error': message}).encode())
+    
+    def _stream_job_events(self, job_id):
+        """学習ジョブのイベントをSSE形式で送信する（ジョブ終了で接続を閉じる）"""
+        if TRAINING_JOBS.get(job_id) is None:
+            self._send_json_error(404, '学習ジョブが見つかりません')
+            return
+        
+        self.send_response(200)
+        self.send_header('Content-type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.end_headers()
+        
+        try:
+            for event in TRAINING_JOBS.iter_events(job_id):
+                if event is None:
+                    # 接続維持のためのコメント行
+                    self.wfile.write(b': keepalive\n\n')
+                else:
+                    self.wfile.write(f"event: {event['type']}\ndata: {json.dumps(event)}\n\n".encode())
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            print(f"SSE接続が切断されました: {job_id}")
+    
+    def _handle_get_data(self, query):
+        """
+        GET /api/data の処理
+
+        クエリパラメータ:
+            from, to: 日付範囲（YYYY-MM-DD）
+            days: 直近の件数
+            limit, cursor: カーソル方式のページング（cursor はレスポンスの nextCursor）
+            points, downsample: チャート用の間引き（点数と方法 lttb / minmax）
+            stream=1: 全件をメモリに載せずに少しずつ書き出す
+            series: 系列ID（省略時は既定の系列）
+        """
+        def param(name, convert=str):
+            return convert(query[name][0]) if name in query else None
+        
+        def count_param(name):
+            return param(name, lambda value: _positive_int(value, name))
+        
+        try:
+            start = param('from', normalize_date)
+            end = param('to', normalize_date)
+            days = count_param('days')
+            limit = count_param('limit')
+            points = count_param('points')
+            method = param('downsample') or 'lttb'
+        except ValueError as e:
+            self._send_json_error(400, str(e))
+            return
+        
+        database = get_database()
+        columns = 'date, sales, features'
+        series_id = param('series') or DEFAULT_SERIES
+        
+        if param('stream') in ('1', 'true'):
+            self._stream_sales(iter_sales(database, start, end, columns, STREAM_BATCH_SIZE, series_id))
+            return
+        
+        response = {'success': True, 'series': series_id}
+        if points:
+            rows = sales_in_range(database, start, end, columns, series_id)
+            if rows:
+                x = np.array([row[0] for row in rows], dtype='datetime64[D]').astype(np.int64)
+                y = np.array([row[1] for row in rows], dtype=np.float64)
+                try:
+                    indices = downsample(x, y, points, method)
+                except ValueError as e:
+                    self._send_json_error(400, str(e))
+                    return
+                response['downsampled'] = {'method': method, 'sourceRows': len(rows), 'points': len(indices)}
+                rows = [rows[i] for i in indices]
+        elif limit:
+            rows, response['nextCursor'] = sales_page(database, limit, param('cursor'), start, end, columns, series_id)
+        elif days:
+            rows = recent_sales(database, days, columns, series_id)
+        else:
+            rows = sales_in_range(database, start, end, columns, series_id)
+        
+        response['salesData'] = [{'date': row[0], 'sales': row[1], 'features': row[2]} for row in rows]
+        self._set_headers()
+        self.wfile.write(json.dumps(response).encode())
+    
+    def _stream_sales(self, rows):
+        """売上データを通常と同じJSON形式で少しずつ書き出す（接続の終了で応答が終わる）"""
+        self._set_headers()
+        self.wfile.write(b'{"success": true, "salesData": [')
+        
+        batch = []
+        first = True
+        for row in rows:
+            batch.append(json.dumps({'date': row[0], 'sales': row[1], 'features': row[2]}))
+            if len(batch) >= STREAM_BATCH_SIZE:
+                self.wfile.write(((',' if not first else '') + ','.join(batch)).encode())
+                first = False
+                batch = []
+        if batch:
+            self.wfile.write(((',' if not first else '') + ','.join(batch)).encode())
+        
+        self.wfile.write(b']}')
+    
+    def _handle_csv_stream_import(self, content_length, mode='replace'):
+        """text/csv の本文をストリーミングで取り込み、集計結果だけを返す"""
+        print(f"CSVストリーミング取り込み: {content_length} バイト")
+        if content_length <= 0:
+            self._send_json_error(411, 'Content-Length が必要です')
+            return
+        
+        charset = self.headers.get_content_charset() or 'utf-8-sig'
+        try:
+            text_stream = open_text_body(self.rfile, content_length, charset)
+        except LookupError as e:
+            self._send_json_error(400, str(e))
+            return
+        self._send_import_summary(text_stream, mode)
+    
+    def _send_import_summary(self, text_stream, mode):
+        """CSVのテキストストリームを取り込み、集計結果だけを返す（取り込んだデータは返さない）"""
+        try:
+            start = time.perf_counter()
+            summary = import_sales(get_database(), text_stream, mode)
+            summary['elapsedSeconds'] = time.perf_counter() - start
+        except (ValueError, UnicodeDecodeError) as e:
+            print(f"CSVインポートエラー: {e}")
+            self._send_json_error(400, str(e))
+            return
+        
+        self._set_headers()
+        self.wfile.write(json.dumps({'success': True, 'summary': summary}).encode())
+    
     def do_GET(self):
         print(f"GETリクエスト受信: {self.path}")
         parsed_path = urllib.parse.urlparse(self.path)
@@ -287,35 +531,51 @@ class DemandForecastHandler(BaseHTTPRequestHandler):
         try:
             if parsed_path.path == '/api/data':
                 # データを取得
-                conn = sqlite3.connect(DB_PATH)
-                cursor = conn.cursor()
-                cursor.execute("SELECT date, sales, features FROM sales_data ORDER BY date")
-                sales_data = cursor.fetchall()
-                conn.close()
-                
-                response = {
-                    'success': True,
-                    'salesData': [{'date': row[0], 'sales': row[1], 'features': row[2]} for row in sales_data]
-                }
-                
-                self._set_headers()
-                self.wfile.write(json.dumps(response).encode())
+                self._handle_get_data(urllib.parse.parse_qs(parsed_path.query))
                 return
             
+            elif parsed_path.path == '/api/series':
+                # 系列の一覧を取得
+                series = [
+                    {'seriesId': row[0], 'rows': row[1], 'from': row[2], 'to': row[3]}
+                    for row in list_series(get_database())
+                ]
+                self._set_headers()
+                self.wfile.write(json.dumps({'success': True, 'series': series}).encode())
+                return
+            elif parsed_path.path == '/api/models':
+                # 学習済みモデルの登録簿と、読み込んだモデルのキャッシュの状態
+                query = urllib.parse.parse_qs(parsed_path.query)
+                try:
+                    limit = _positive_int(query.get('limit', ['100'])[0], 'limit')
+                except ValueError as e:
+                    self._send_json_error(400, str(e))
+                    return
+                models = list_models(
+                    get_database(),
+                    series_id=query.get('seriesId', [None])[0],
+                    include_inactive=query.get('all', ['0'])[0] in ('1', 'true'),
+                    limit=limit
+                )
+                self._set_headers()
+                self.wfile.write(json.dumps({'success': True, 'models': models, 'registry': MODEL_REGISTRY.stats()}).encode())
+                return
             elif parsed_path.path == '/api/settings':
                 # 設定を取得
-                conn = sqlite3.connect(DB_PATH)
-                cursor = conn.cursor()
-                cursor.execute("SELECT model_type, hidden_layers, hidden_units FROM settings ORDER BY id DESC LIMIT 1")
-                settings = cursor.fetchone()
-                conn.close()
+                settings = get_database().query_one('''
+                SELECT model_type, hidden_layers, hidden_units, sequence_length, learning_rate, auto_mode
+                FROM settings ORDER BY id DESC LIMIT 1
+                ''')
                 
                 response = {
                     'success': True,
                     'settings': {
                         'modelType': settings[0],
                         'hiddenLayers': settings[1],
-                        'hiddenUnits': settings[2]
+                        'hiddenUnits': settings[2],
+                        'sequenceLength': settings[3],
+                        'learningRate': settings[4],
+                        'autoMode': bool(settings[5])
                     }
                 }
                 
@@ -328,6 +588,47 @@ class DemandForecastHandler(BaseHTTPRequestHandler):
                 response = {'message': 'テストAPI成功', 'status': 'ok'}
                 self.wfile.write(json.dumps(response).encode())
                 return
+            elif parsed_path.path == '/api/ready':
+                # 起動時の準備の状態（準備中は 503 を返す）
+                status = warmup_status()
+                self.send_response(200 if status['ready'] else 503)
+                self.send_header('Content-type', 'application/json')
+                self.send_header('Access-Control-Allow-Origin', '*')
+                self.end_headers()
+                self.wfile.write(json.dumps(status).encode())
+                return
+            elif parsed_path.path == '/api/train/jobs':
+                # 学習ジョブの一覧
+                self._set_headers()
+                self.wfile.write(json.dumps({'success': True, 'jobs': TRAINING_JOBS.list()}).encode())
+                return
+            elif parsed_path.path.startswith('/api/train/jobs/') and parsed_path.path.endswith('/events'):
+                # 学習の進捗をServer-Sent Eventsで配信
+                job_id = parsed_path.path[len('/api/train/jobs/'):-len('/events')]
+                self._stream_job_events(job_id)
+                return
+            elif parsed_path.path.startswith('/api/train/jobs/'):
+                # 学習ジョブの状態を取得（ポーリング用）
+                job = TRAINING_JOBS.get(parsed_path.path[len('/api/train/jobs/'):])
+                if job is None:
+                    self._send_json_error(404, '学習ジョブが見つかりません')
+                    return
+                self._set_headers()
+                self.wfile.write(json.dumps({'success': True, 'job': job}).encode())
+                return
+            elif parsed_path.path == '/api/server/stats':
+                # ワーカープールの状態を取得
+                stats = self.server.stats() if hasattr(self.server, 'stats') else {}
+                self._set_headers()
+                self.wfile.write(json.dumps({
+                    'success': True,
+                    'pools': stats,
+                    'forecastCache': FORECAST_CACHE.stats(),
+                    'dateIndex': DATE_INDEX.stats(),
+                    'modelRegistry': MODEL_REGISTRY.stats(),
+                    'predictCoalescer': PREDICT_COALESCER.stats()
+                }).encode())
+                return
             
             # 存在しないエンドポイント
             self.send_response(404)
@@ -344,110 +645,123 @@ class DemandForecastHandler(BaseHTTPRequestHandler):
         print(f"POSTリクエスト受信: {self.path}")
         
         try:
-            content_length = int(self.headers['Content-Length'])
+            parsed_path = urllib.parse.urlparse(self.path)
+            content_length = int(self.headers.get('Content-Length', 0))
+            
+            # CSVの本文はJSONとして読み込まず、少しずつ取り込む
+            if parsed_path.path == '/api/data/import' and self.headers.get_content_type() == 'text/csv':
+                query = urllib.parse.parse_qs(parsed_path.query)
+                self._handle_csv_stream_import(content_length, query.get('mode', ['replace'])[0])
+                return
+            
             post_data = self.rfile.read(content_length)
             
             try:
-                data = json.loads(post_data.decode('utf-8'))
-                print(f"受信データ: {json.dumps(data, ensure_ascii=False)}")
+                # キャンセルなどボディのないPOSTは空のパラメータとして扱う
+                data = json.loads(post_data.decode('utf-8')) if post_data else {}
+                print(f"受信データ: {json.dumps(data, ensure_ascii=False)[:200]}")
             except json.JSONDecodeError as e:
                 print(f"JSONデコードエラー: {e}")
                 self.send_response(400)
                 self.send_header('Access-Control-Allow-Origin', '*')
                 self.end_headers()
                 return
-            
-            parsed_path = urllib.parse.urlparse(self.path)
+            if not isinstance(data, dict):
+                self._send_json_error(400, 'リクエストの本文にはJSONオブジェクトを指定してください')
+                return
             
             if parsed_path.path == '/api/predict':
-                # 需要予測を実行
-                period = int(data.get('period', 30))  # デフォルトは30日間
-                
-                # データベースから過去データを取得
-                conn = sqlite3.connect(DB_PATH)
-                cursor = conn.cursor()
-                cursor.execute("SELECT date, sales FROM sales_data ORDER BY date")
-                historical_data = cursor.fetchall()
-                conn.close()
-                
-                if not historical_data:
-                    self.send_error(400, "予測に必要な履歴データがありません")
+                # 需要予測を実行（seriesIds を指定すると複数の系列をまとめて予測する）
+                try:
+                    period = int(data.get('period', 30))  # デフォルトは30日間
+                    history_days = max(1, int(data.get('historyDays', DEFAULT_HISTORY_DAYS)))  # グラフに表示する実績の日数
+                except (TypeError, ValueError):
+                    self._send_json_error(400, 'リクエストの形式が正しくありません')
                     return
+                if period < 1:
+                    self._send_json_error(400, 'period には1以上の日数を指定してください')
+                    return
+                series_ids = data.get('seriesIds')
+                single = series_ids is None
+                if single:
+                    series_ids = [data.get('seriesId', DEFAULT_SERIES)]
+                elif not isinstance(series_ids, list) or not series_ids:
+                    self._send_json_error(400, 'seriesIds には系列IDの配列を指定してください')
+                    return
+                # /api/predict/batch と同じく、系列IDは文字列として扱う
+                series_ids = [str(series_id) for series_id in series_ids]
                 
-                # 日付とデータを分離
-                dates = [row[0] for row in historical_data]
-                values = [row[1] for row in historical_data]
-                
-                # データの前処理
-                values_array = np.array(values).reshape(-1, 1)
-                scaler = MinMaxScaler(feature_range=(0, 1))
-                scaled_values = scaler.fit_transform(values_array)
-                
-                # より簡単なアプローチで予測を生成
                 try:
-                    # 最近のデータから基本的なパターンを抽出
-                    recent_sales = values[-30:] if len(values) > 30 else values
-                    mean_sales = np.mean(recent_sales)
-                    std_sales = np.std(recent_sales)
+                    # 同時に届いた予測リクエストとまとめて1回のバッチ推論で処理する
+                    results, missing = PREDICT_COALESCER.submit(
+                        [(series_id, period, history_days) for series_id in series_ids]
+                    )
+                    if missing:
+                        if single:
+                            self._send_json_error(400, "予測に必要な履歴データがありません")
+                        else:
+                            self._send_json_error(404, f"系列が見つかりません: {', '.join(missing[:20])}")
+                        return
                     
-                    # トレンドと季節性を考慮したシンプルな予測
-                    forecast_values = []
-                    last_date = datetime.strptime(dates[-1], '%Y-%m-%d')
-                    
-                    for i in range(period):
-                        # 週末効果
-                        weekday = (last_date + timedelta(days=i+1)).weekday()
-                        weekday_factor = 1.3 if weekday >= 5 else 1.0
-                        
-                        # 季節効果（単純化）
-                        day_of_year = (last_date + timedelta(days=i+1)).timetuple().tm_yday
-                        season_factor = 1.0 + 0.2 * np.sin(np.pi * day_of_year / 180)
-                        
-                        # 上昇トレンド
-                        trend_factor = 1.0 + (i / 365) * 0.1
-                        
-                        # 基本予測値にノイズを加える
-                        predicted_value = mean_sales * weekday_factor * season_factor * trend_factor
-                        predicted_value += np.random.normal(0, std_sales * 0.1)
-                        forecast_values.append(max(0, predicted_value))
-                    
-                    # 予測期間の日付を生成
-                    forecast_dates = [(last_date + timedelta(days=i+1)).strftime('%Y-%m-%d') for i in range(period)]
-                    
-                    # 実績データと予測データを結合
-                    all_dates = dates + forecast_dates
-                    historical_values = values + [None] * period
-                    forecast_values_with_padding = [None] * len(dates) + forecast_values
-                    
-                    # 予測精度の計算（ダミー値）
-                    accuracy = 87.5 + (np.random.random() * 5)
-                    
-                    # 予測総需要
-                    total_demand = sum(forecast_values)
+                    # 結果をJSONで返す
+                    if single:
+                        response = results[0]
+                    else:
+                        response = {'success': True, 'period': period, 'series': dict(zip(series_ids, results))}
                     
-                    # 前年比（ダミー値）
-                    yoy_change = 0.0
+                    self._set_headers()
+                    self.wfile.write(json.dumps(response).encode())
+                    return
+                
+                except Exception as e:
+                    print(f"予測処理エラー: {e}")
+                    self._send_json_error(500, str(e))
+                    return
+            
+            elif parsed_path.path == '/api/predict/batch':
+                # 複数の予測リクエスト [{seriesId, period, historyDays}, ...] をまとめて処理する
+                items = data.get('requests')
+                if not isinstance(items, list) or not items:
+                    self._send_json_error(400, 'requests に予測リクエストの配列を指定してください')
+                    return
+                if len(items) > MAX_BATCH_REQUESTS:
+                    self._send_json_error(400, f"一度に処理できるリクエストは {MAX_BATCH_REQUESTS} 件までです")
+                    return
+                try:
+                    requests = [
+                        (str(item.get('seriesId', item.get('series', DEFAULT_SERIES))),
+                         max(1, int(item.get('period', 30))),
+                         max(1, int(item.get('historyDays', DEFAULT_HISTORY_DAYS))))
+                        for item in items
+                    ]
+                except (AttributeError, TypeError, ValueError):
+                    self._send_json_error(400, 'リクエストの形式が正しくありません')
+                    return
+                
+                try:
+                    start = time.perf_counter()
+                    results, missing = predict_requests(requests)
+                    elapsed = time.perf_counter() - start
                     
-                    # 結果をJSONで返す
-                    result = {
-                        'dates': all_dates,
-                        'historicalData': historical_values,
-                        'forecastData': forecast_values_with_padding,
-                        'totalDemand': total_demand,
-                        'yearOverYearChange': yoy_change,
-                        'accuracy': accuracy
+                    # 履歴がない系列のリクエストはその位置にエラーを返す（他のリクエストは処理する）
+                    response = {
+                        'success': True,
+                        'results': [
+                            result if result is not None else {'success': False, 'seriesId': series_id,
+                                                               'error': '予測に必要な履歴データがありません'}
+                            for result, (series_id, _, _) in zip(results, requests)
+                        ],
+                        'missing': missing,
+                        'seconds': elapsed
                     }
-                    
                     self._set_headers()
-                    self.wfile.write(json.dumps(result).encode())
+                    self.wfile.write(json.dumps(response).encode())
                     return
                 
                 except Exception as e:
                     print(f"予測処理エラー: {e}")
-                    self.send_response(500)
-                    self.send_header('Access-Control-Allow-Origin', '*')
-                    self.end_headers()
-                    self.wfile.write(json.dumps({'error': str(e)}).encode())
+                    self._send_json_error(500, str(e))
+                    return
             
             elif parsed_path.path == '/api/train':
                 # モデルを訓練
@@ -455,40 +769,36 @@ class DemandForecastHandler(BaseHTTPRequestHandler):
                     # 自動モードかどうかを確認
                     auto_mode = data.get('autoMode', False)
                     
-                    # データベース接続
-                    conn = sqlite3.connect(DB_PATH)
-                    cursor = conn.cursor()
+                    # 追加学習（読み込み済みのモデルを直近のデータで学習し直す）かどうかを確認
+                    fine_tune = bool(data.get('fineTune', False))
+                    base_forecaster = get_forecaster()
+                    if fine_tune and base_forecaster is None:
+                        self._send_json_error(400, "追加学習する学習済みモデルがありません")
+                        return
                     
                     # データサイズを取得
-                    cursor.execute("SELECT COUNT(*) FROM sales_data")
-                    data_size = cursor.fetchone()[0]
+                    database = get_database()
+                    data_size = count_sales(database)
                     
-                    if auto_mode:
-                        # データサイズに基づいて最適なパラメータを決定
-                        optimal_params = determine_optimal_parameters(data_size)
-                        
-                        # 自動生成されたパラメータを使用
-                        epochs = optimal_params['epochs']
-                        batch_size = optimal_params['batch_size']
-                        
-                        # 設定を更新
-                        cursor.execute("DELETE FROM settings")
-                        cursor.execute('''
-                        INSERT INTO settings (model_type, hidden_layers, hidden_units, auto_mode)
-                        VALUES (?, ?, ?, ?)
-                        ''', (optimal_params['model_type'], optimal_params['hidden_layers'], 
-                              optimal_params['hidden_units'], 1))
-                        
-                        conn.commit()
-                        
-                        # 使用したパラメータ情報を含める
-                        used_params = {
-                            'epochs': epochs,
-                            'batchSize': batch_size,
-                            'modelType': optimal_params['model_type'],
-                            'hiddenLayers': optimal_params['hidden_layers'],
-                            'hiddenUnits': optimal_params['hidden_units']
-                        }
+                    if fine_tune:
+                        # 学習済みモデルの構造をそのまま使い、エポック数だけを指定できる
+                        # （モデルを読み込み済みなので PyTorch は読み込まれている）
+                        from app.models.lstm_model import FINE_TUNE_DAYS, FINE_TUNE_EPOCHS, FINE_TUNE_REPLAY_RATIO
+                        auto_mode = False
+                        epochs = data.get('epochs', FINE_TUNE_EPOCHS)
+                        batch_size = data.get('batchSize', base_forecaster.config['batch_size'])
+                        model_type = base_forecaster.config['model_type']
+                        hidden_layers = base_forecaster.config['hidden_layers']
+                        hidden_units = base_forecaster.config['hidden_units']
+                    elif auto_mode:
+                        # データサイズに応じた予算で設定を探索する（構造は探索で選ばれたものに置き換わる）
+                        search = search_budget(data_size)
+                        search['seed'] = int(data.get('seed', 0))
+                        epochs = search['max_epochs']
+                        batch_size = search['batch_size']
+                        model_type = 'lstm'
+                        hidden_layers = 2
+                        hidden_units = 64
                     else:
                         # 手動設定の場合はユーザー指定の値を使用
                         epochs = data.get('epochs', 50)
@@ -496,44 +806,88 @@ class DemandForecastHandler(BaseHTTPRequestHandler):
                         model_type = data.get('modelType', 'lstm')
                         hidden_layers = data.get('hiddenLayers', 2)
                         hidden_units = data.get('hiddenUnits', 64)
-                        
-                        # 設定を更新
-                        cursor.execute("DELETE FROM settings")
-                        cursor.execute('''
-                        INSERT INTO settings (model_type, hidden_layers, hidden_units, auto_mode)
-                        VALUES (?, ?, ?, ?)
-                        ''', (model_type, hidden_layers, hidden_units, 0))
-                        
-                        conn.commit()
-                        
-                        # 使用したパラメータ情報
-                        used_params = {
-                            'epochs': epochs,
-                            'batchSize': batch_size,
-                            'modelType': model_type,
-                            'hiddenLayers': hidden_layers,
-                            'hiddenUnits': hidden_units
-                        }
+                        if not _is_model_type(model_type):
+                            self._send_json_error(400, f"未対応のモデルタイプです: {model_type}")
+                            return
                     
-                    conn.close()
+                    # 1回の順伝播で予測する日数（1の場合は1日ずつ予測する）
+                    horizon = int(base_forecaster.config['horizon'] if fine_tune else data.get('horizon', 1))
                     
-                    print(f"モデルのトレーニングを開始: エポック数={epochs}, バッチサイズ={batch_size}")
+                    # 設定を追加（最新の行が現在の設定。過去の行は登録簿のモデルから参照される）
+                    with database.transaction() as conn:
+                        settings_id = conn.execute('''
+                        INSERT INTO settings (model_type, hidden_layers, hidden_units, auto_mode)
+                        VALUES (?, ?, ?, ?)
+                        ''', (model_type, hidden_layers, hidden_units, 1 if auto_mode else 0)).lastrowid
                     
-                    # 訓練の進捗をシミュレート
-                    for epoch in range(1, epochs + 1):
-                        loss = 1.0 - (epoch / epochs) * 0.882
-                        print(f"エポック {epoch}/{epochs}, 損失: {loss:.4f}")
-                        time.sleep(0.05)  # 実際の学習時間をシミュレート
+                    # 使用したパラメータ情報
+                    used_params = {
+                        'epochs': epochs,
+                        'batchSize': batch_size,
+                        'modelType': model_type,
+                        'hiddenLayers': hidden_layers,
+                        'hiddenUnits': hidden_units,
+                        'horizon': horizon,
+                        'fineTune': fine_tune
+                    }
                     
-                    print("モデルの訓練が完了しました。")
+                    # 学習はワーカープロセスで実行し、ジョブIDをすぐに返す
+                    job_params = {
+                        'epochs': int(epochs),
+                        'batch_size': int(batch_size),
+                        'config': {
+                            'model_type': model_type,
+                            'hidden_layers': int(hidden_layers),
+                            'hidden_units': int(hidden_units),
+                            'horizon': horizon
+                        },
+                        'series_ids': data.get('seriesIds'),
+                        'settings_id': settings_id,
+                        'db_path': DB_PATH,
+                        'model_file': MODEL_FILE
+                    }
+                    # 検証用に分ける割合と早期終了までのエポック数（省略時はモデルの既定値。0で無効）
+                    if 'validationSplit' in data:
+                        job_params['config']['validation_split'] = float(data['validationSplit'])
+                        used_params['validationSplit'] = job_params['config']['validation_split']
+                    if 'patience' in data:
+                        job_params['config']['early_stopping_patience'] = int(data['patience']) or None
+                        used_params['patience'] = job_params['config']['early_stopping_patience']
+                    if fine_tune:
+                        job_params['base_model_file'] = MODEL_FILE if os.path.exists(MODEL_FILE) else LEGACY_MODEL_FILE
+                        job_params['fine_tune'] = {
+                            'recent_days': int(data.get('fineTuneDays', FINE_TUNE_DAYS)),
+                            'replay_ratio': float(data.get('replayRatio', FINE_TUNE_REPLAY_RATIO))
+                        }
+                        used_params['fineTuneDays'] = job_params['fine_tune']['recent_days']
+                        used_params['replayRatio'] = job_params['fine_tune']['replay_ratio']
+                    target = run_training
+                    if auto_mode:
+                        # 探索しない設定（horizon など）だけを渡す
+                        target = run_search_training
+                        job_params['search'] = search
+                        job_params['config'] = {'horizon': horizon}
+                        job_params['workers'] = data.get('workers')
+                        used_params['search'] = search
+                    try:
+                        job_id = TRAINING_JOBS.submit(
+                            target, job_params,
+                            info={'usedParams': used_params, 'autoMode': auto_mode},
+                            on_complete=lambda result: load_forecaster(result['modelFile']),
+                            # 自動設定モードではジョブの中で試行のプロセスプールを起動する
+                            daemon=not auto_mode
+                        )
+                    except JobLimitError as e:
+                        self._send_json_error(429, str(e))
+                        return
                     
-                    # ダミーの精度（実際にはモデルの評価結果を返す）
-                    accuracy = 85.0 + (np.random.random() * 10)
+                    print(f"学習ジョブを開始しました: {job_id}")
                     
                     # レスポンスを作成
                     response = {
                         'success': True,
-                        'accuracy': accuracy,
+                        'jobId': job_id,
+                        'status': 'running',
                         'usedParams': used_params,
                         'autoMode': auto_mode
                     }
@@ -547,121 +901,69 @@ class DemandForecastHandler(BaseHTTPRequestHandler):
                     self.send_error(500, str(e))
                 return
             
+            elif parsed_path.path == '/api/train/series':
+                # 系列ごとのモデルをプロセスプールで並列に学習する
+                if not _is_model_type(data.get('modelType', 'lstm')):
+                    self._send_json_error(400, f"未対応のモデルタイプです: {data.get('modelType')}")
+                    return
+                with get_database().transaction() as conn:
+                    settings_id = conn.execute('''
+                    INSERT INTO settings (model_type, hidden_layers, hidden_units, auto_mode)
+                    VALUES (?, ?, ?, 0)
+                    ''', (data.get('modelType', 'lstm'), int(data.get('hiddenLayers', 2)),
+                          int(data.get('hiddenUnits', 64)))).lastrowid
+                job_params = {
+                    'epochs': int(data.get('epochs', 50)),
+                    'batch_size': int(data.get('batchSize', 32)),
+                    'config': {
+                        'model_type': data.get('modelType', 'lstm'),
+                        'hidden_layers': int(data.get('hiddenLayers', 2)),
+                        'hidden_units': int(data.get('hiddenUnits', 64)),
+                        'horizon': int(data.get('horizon', 1))
+                    },
+                    'series_ids': data.get('seriesIds'),
+                    'group_size': max(1, int(data.get('groupSize', 1))),
+                    'workers': data.get('workers'),
+                    'threads_per_worker': data.get('threadsPerWorker'),
+                    'pack': bool(data.get('pack', False)),  # 全モデルを1つのファイルにまとめる
+                    'settings_id': settings_id,
+                    'db_path': DB_PATH,
+                    'model_dir': SERIES_MODEL_DIR
+                }
+                try:
+                    # ジョブのプロセスからさらにワーカープロセスを起動するため、デーモンにしない
+                    job_id = TRAINING_JOBS.submit(run_series_training, job_params, info={'kind': 'series'},
+                                                  on_complete=finish_series_training, daemon=False)
+                except JobLimitError as e:
+                    self._send_json_error(429, str(e))
+                    return
+                
+                print(f"系列ごとの学習ジョブを開始しました: {job_id}")
+                self._set_headers()
+                self.wfile.write(json.dumps({'success': True, 'jobId': job_id, 'status': 'running'}).encode())
+                return
+            
+            elif parsed_path.path.startswith('/api/train/jobs/') and parsed_path.path.endswith('/cancel'):
+                # 学習ジョブをキャンセル
+                job_id = parsed_path.path[len('/api/train/jobs/'):-len('/cancel')]
+                if not TRAINING_JOBS.cancel(job_id):
+                    self._send_json_error(404, '学習ジョブが見つかりません')
+                    return
+                self._set_headers()
+                self.wfile.write(json.dumps({'success': True, 'job': TRAINING_JOBS.get(job_id)}).encode())
+                return
+            
             elif parsed_path.path == '/api/data/import':
                 # CSVデータをインポート
                 print("データインポートAPIが呼び出されました")
-                if 'csvContent' in data:
-                    csv_content = data.get('csvContent', '')
-                    print(f"CSVデータ先頭部分: {csv_content[:100]}...")
-                    
-                    try:
-                        # CSVデータをパース
-                        csv_data = []
-                        reader = csv.reader(csv_content.splitlines())
-                        
-                        # ヘッダー行をスキップ
-                        headers = next(reader, None)
-                        print(f"CSVヘッダー: {headers}")
-                        
-                        # 日本語のヘッダーにも対応
-                        date_column = 0
-                        sales_column = 1
-                        features_column = 2
-                        
-                        # ヘッダーの位置を特定（日本語・英語両対応）
-                        if headers:
-                            for i, header in enumerate(headers):
-                                header_lower = header.lower()
-                                print(f"ヘッダー{i}: '{header}' (変換後: '{header_lower}')")
-                                if header_lower in ['date', '日付', 'date']:
-                                    date_column = i
-                                    print(f"日付列を検出: {i}")
-                                elif header_lower in ['sales', '売上', 'revenue']:
-                                    sales_column = i
-                                    print(f"売上列を検出: {i}")
-                                elif header_lower in ['features', '特徴量', 'category']:
-                                    features_column = i
-                                    print(f"特徴量列を検出: {i}")
-                        
-                        print(f"使用する列インデックス: 日付={date_column}, 売上={sales_column}, 特徴量={features_column}")
-                        
-                        row_count = 0
-                        for row in reader:
-                            row_count += 1
-                            if len(row) > 1:  # 最低2列（日付と売上）が必要
-                                try:
-                                    if row_count <= 3:
-                                        print(f"処理中の行 {row_count}: {row}")
-                                    
-                                    date = row[date_column].strip()
-                                    sales_str = row[sales_column].strip().replace(',', '')  # カンマを除去
-                                    sales = float(sales_str)
-                                    
-                                    features = None
-                                    if len(row) > features_column:
-                                        features = row[features_column].strip()
-                                    
-                                    csv_data.append((date, sales, features))
-                                    
-                                    if row_count <= 3:
-                                        print(f"変換後: ({date}, {sales}, {features})")
-                                except ValueError as e:
-                                    print(f"数値変換エラー: {e}, 行: {row}")
-                                    continue
-                                except IndexError as e:
-                                    print(f"インデックスエラー: {e}, 行: {row}")
-                                    continue
-                        
-                        print(f"合計で {len(csv_data)} 行のデータを読み込みました")
-                        
-                        if len(csv_data) == 0:
-                            raise ValueError("有効なデータがありません")
-                        
-                        print(f"CSVデータ例（最初の3行）: {csv_data[:3]}")
-                        
-                        # データベースに挿入
-                        conn = sqlite3.connect(DB_PATH)
-                        cursor = conn.cursor()
-                        
-                        # 既存のデータをクリア（オプション）
-                        cursor.execute("DELETE FROM sales_data")
-                        
-                        # 新しいデータを挿入
-                        cursor.executemany('''
-                        INSERT INTO sales_data (date, sales, features)
-                        VALUES (?, ?, ?)
-                        ''', csv_data)
-                        
-                        conn.commit()
-                        
-                        # インポートしたデータを返す
-                        cursor.execute("SELECT date, sales, features FROM sales_data ORDER BY date")
-                        sales_data = cursor.fetchall()
-                        conn.close()
-                        
-                        response = {
-                            'success': True,
-                            'data': [{'date': row[0], 'sales': row[1], 'features': row[2]} for row in sales_data]
-                        }
-                        
-                        self._set_headers()
-                        self.wfile.write(json.dumps(response).encode())
-                    except Exception as e:
-                        print(f"CSVインポートエラー: {e}")
-                        import traceback
-                        traceback.print_exc()
-                        self.send_response(400)
-                        self.send_header('Access-Control-Allow-Origin', '*')
-                        self.send_header('Content-type', 'application/json')
-                        self.end_headers()
-                        self.wfile.write(json.dumps({'success': False, 'error': str(e)}).encode())
-                else:
+                csv_content = data.get('csvContent')
+                if not isinstance(csv_content, str):
                     print("csvContentフィールドがありません")
-                    self.send_response(400)
-                    self.send_header('Access-Control-Allow-Origin', '*')
-                    self.send_header('Content-type', 'application/json')
-                    self.end_headers()
-                    self.wfile.write(json.dumps({'success': False, 'error': 'csvContentフィールドが必要です'}).encode())
+                    self._send_json_error(400, 'csvContentフィールドが必要です')
+                    return
+                print(f"CSVデータ先頭部分: {csv_content[:100]}...")
+                # 文字列で受け取ったCSVも、ストリーミング取り込みと同じ処理で取り込み、同じ集計結果を返す
+                self._send_import_summary(io.StringIO(csv_content, newline=''), data.get('mode', 'replace'))
                 return
             
             elif parsed_path.path == '/api/settings/save':
@@ -670,48 +972,50 @@ class DemandForecastHandler(BaseHTTPRequestHandler):
                     # 自動設定モードかどうかを確認
                     auto_mode = data.get('autoMode', False)
                     
-                    conn = sqlite3.connect(DB_PATH)
-                    cursor = conn.cursor()
-                    
-                    # 既存の設定をクリア
-                    cursor.execute("DELETE FROM settings")
-                    
-                    if auto_mode:
-                        # データサイズに基づいて最適なパラメータを決定
-                        cursor.execute("SELECT COUNT(*) FROM sales_data")
-                        data_size = cursor.fetchone()[0]
-                        
-                        # 最適なパラメータを取得
-                        optimal_params = determine_optimal_parameters(data_size)
-                        
-                        # 自動生成されたパラメータを保存
-                        cursor.execute('''
-                        INSERT INTO settings (model_type, hidden_layers, hidden_units, auto_mode)
-                        VALUES (?, ?, ?, ?)
-                        ''', (optimal_params['model_type'], optimal_params['hidden_layers'], 
-                              optimal_params['hidden_units'], 1))
-                        
-                        # 自動生成されたパラメータをレスポンスに含める
-                        response = {
-                            'success': True,
-                            'autoMode': True,
-                            'generatedParams': optimal_params
-                        }
-                    else:
-                        # 手動設定の場合はユーザー指定の値を保存
-                        model_type = data.get('modelType', 'lstm')
-                        hidden_layers = data.get('hiddenLayers', 2)
-                        hidden_units = data.get('hiddenUnits', 64)
-                        
-                        cursor.execute('''
-                        INSERT INTO settings (model_type, hidden_layers, hidden_units, auto_mode)
-                        VALUES (?, ?, ?, ?)
-                        ''', (model_type, hidden_layers, hidden_units, 0))
+                    with get_database().transaction() as conn:
+                        cursor = conn.cursor()
                         
-                        response = {'success': True, 'autoMode': False}
-                    
-                    conn.commit()
-                    conn.close()
+                        # 設定は上書きせずに追加する（最新の行が現在の設定）
+                        if auto_mode:
+                            # 最後に探索で選ばれた設定を引き継ぐ（まだ探索していない場合は既定値）
+                            # 学習時には、データサイズに応じた予算で設定を探索し直す
+                            cursor.execute("SELECT COUNT(*) FROM sales_data")
+                            data_size = cursor.fetchone()[0]
+                            searched = cursor.execute('''
+                            SELECT model_type, hidden_layers, hidden_units, sequence_length, learning_rate
+                            FROM settings WHERE search_result IS NOT NULL ORDER BY id DESC LIMIT 1
+                            ''').fetchone() or ('lstm', 2, 64, None, None)
+                            
+                            cursor.execute('''
+                            INSERT INTO settings (model_type, hidden_layers, hidden_units, sequence_length, learning_rate, auto_mode)
+                            VALUES (?, ?, ?, ?, ?, ?)
+                            ''', tuple(searched) + (1,))
+                            
+                            # 探索の予算と現在の設定をレスポンスに含める
+                            response = {
+                                'success': True,
+                                'autoMode': True,
+                                'searchBudget': search_budget(data_size),
+                                'generatedParams': {
+                                    'modelType': searched[0],
+                                    'hiddenLayers': searched[1],
+                                    'hiddenUnits': searched[2],
+                                    'sequenceLength': searched[3],
+                                    'learningRate': searched[4]
+                                }
+                            }
+                        else:
+                            # 手動設定の場合はユーザー指定の値を保存
+                            model_type = data.get('modelType', 'lstm')
+                            hidden_layers = data.get('hiddenLayers', 2)
+                            hidden_units = data.get('hiddenUnits', 64)
+                            
+                            cursor.execute('''
+                            INSERT INTO settings (model_type, hidden_layers, hidden_units, auto_mode)
+                            VALUES (?, ?, ?, ?)
+                            ''', (model_type, hidden_layers, hidden_units, 0))
+                            
+                            response = {'success': True, 'autoMode': False}
                     
                     self._set_headers()
                     self.wfile.write(json.dumps(response).encode())
@@ -737,19 +1041,25 @@ class DemandForecastHandler(BaseHTTPRequestHandler):
             self.end_headers()
             self.wfile.write(json.dumps({'error': str(e)}).encode())
 
-def run_server(port=5003):
+def create_server(port=5003, concurrent=True, pool_config=None):
+    """HTTPサーバーを作成する（concurrent=Falseの場合は従来のシングルスレッド構成）"""
+    server_address = ('localhost', port)
+    if concurrent:
+        return PooledHTTPServer(server_address, DemandForecastHandler, pool_config)
+    return HTTPServer(server_address, DemandForecastHandler)
+
+def run_server(port=5003, concurrent=True, pool_config=None):
     # データベースの初期化
     init_database()
     
-    # サンプルデータの生成
-    generate_sample_data()
-    
-    # サーバーの起動
+    # サーバーの起動（ポートを先に開き、時間のかかる準備はバックグラウンドで行う）
     print(f"サーバーを起動しています (ポート {port})...")
-    server_address = ('localhost', port)
-    httpd = HTTPServer(server_address, DemandForecastHandler)
+    httpd = create_server(port, concurrent, pool_config)
+    if concurrent:
+        print(f"ワーカープール設定: {httpd.config}")
+    threading.Thread(target=warm_up, name='warm-up', daemon=True).start()
     print(f"サーバーが起動しました。localhost:{port}")
     httpd.serve_forever()
 
 if __name__ == '__main__':
-    run_server() 
\ No newline at end of file
+    run_server(pool_config=pool_config_from_env()) 
\ No newline at end of file
@@ -0,0 +1,308 @@
+import json
+import os
+import tempfile
+import time
+
+from app.backend.database import Database, list_series, recent_sales_by_series, sales_by_series
+from app.backend.model_registry import data_version, register_models
+from app.models.artifact import DEFAULT_MODEL_NAME
+from app.models.windowing import window_count
+
+
+def run_training(params, callback):
+    """学習ジョブの本体（ワーカープロセスで実行される）
+
+    データベースから売上データを読み込んで DemandForecaster を学習し、
+    params['model_file'] に保存する。複数の系列がある場合は全系列で1つのモデルを学習する。
+
+    Args:
+        params: 学習パラメータ（epochs, batch_size, config, db_path, model_file,
+            series_ids（省略時は全系列）, settings_id（登録簿に記録する設定のID）,
+            fine_tune（指定した場合は base_model_file のモデルを追加学習する。
+            recent_days, replay_ratio を持つ辞書））
+        callback: callback(epoch, epochs, avg_loss) 形式の進捗通知関数
+
+    Returns:
+        学習結果の辞書
+    """
+    # PyTorchはワーカープロセスでだけ必要なので、ここで読み込む
+    from app.models.lstm_model import DemandForecaster
+
+    config = params.get('config') or {}
+    fine_tune = params.get('fine_tune')
+    if fine_tune is not None:
+        # 追加学習では学習済みモデルの構造と設定をそのまま使う
+        forecaster = DemandForecaster()
+        if not forecaster.load_model(params['base_model_file'], mmap=False):
+            raise ValueError("追加学習する学習済みモデルを読み込めませんでした")
+        config = forecaster.config
+    else:
+        forecaster = DemandForecaster(config=config)
+
+    database = Database(params['db_path'], pool_size=1)
+    try:
+        series_ids = params.get('series_ids')
+        if config.get('max_history'):
+            series_ids = series_ids or [row[0] for row in list_series(database)]
+            series_data = recent_sales_by_series(database, series_ids, config['max_history'])
+        else:
+            series_data = sales_by_series(database, series_ids)
+    finally:
+        database.close()
+
+    windows = sum(
+        window_count(len(rows), forecaster.config['sequence_length'], forecaster.config['horizon'])
+        for rows in series_data.values()
+    )
+    if windows == 0:
+        raise ValueError("学習に必要なデータが不足しています")
+
+    # 系列が1つの場合は従来どおり1つの系列として学習する
+    # （追加学習では学習済みモデルと同じ形で渡す）
+    multi_series = len(series_data) > 1
+    if fine_tune is not None:
+        multi_series = bool(forecaster.series_scales)
+        if not multi_series and len(series_data) > 1:
+            raise ValueError("1系列で学習したモデルは複数系列のデータで追加学習できません。全期間で学習し直してください")
+    sales_data = series_data if multi_series else next(iter(series_data.values()))
+    total_rows = sum(len(rows) for rows in series_data.values())
+
+    print(f"モデルの{'追加学習' if fine_tune is not None else 'トレーニング'}を開始: エポック数={params['epochs']}, "
+          f"バッチサイズ={params['batch_size']}, 系列数={len(series_data)}, データ件数={total_rows}")
+
+    start = time.perf_counter()
+    if fine_tune is not None:
+        result = forecaster.fine_tune(
+            sales_data,
+            epochs=params['epochs'],
+            batch_size=params['batch_size'],
+            recent_days=fine_tune['recent_days'],
+            replay_ratio=fine_tune['replay_ratio'],
+            callback=callback
+        )
+    else:
+        result = forecaster.train(
+            sales_data,
+            epochs=params['epochs'],
+            batch_size=params['batch_size'],
+            callback=callback
+        )
+    training_seconds = time.perf_counter() - start
+
+    forecaster.save_model(params['model_file'])
+    print("モデルの訓練が完了しました。")
+
+    last_date = max(rows[-1][0] for rows in series_data.values() if rows)
+    _register_global_model(params, forecaster, data_version(total_rows, last_date))
+
+    response = {
+        'accuracy': float(result['accuracy']),
+        'finalLoss': forecaster.metrics['final_loss'],
+        'trainedRows': total_rows,
+        'trainedSeries': len(series_data),
+        'trainingSeconds': training_seconds,
+        'epochsRun': len(result['epoch_losses']),
+        'bestEpoch': result.get('best_epoch'),
+        'validationLoss': forecaster.metrics.get('validation_loss'),
+        'modelFile': params['model_file']
+    }
+    if fine_tune is not None:
+        response['fineTune'] = _fine_tune_summary(forecaster.metrics, total_rows, training_seconds)
+    response['baseline'] = _baseline_summary(forecaster, sales_data)
+    return response
+
+
+def run_search_training(params, callback):
+    """自動設定モードの学習ジョブの本体（ワーカープロセスからさらにプロセスプールで試行を並列に学習する）
+
+    Hyperband で設定を探索し、検証用の期間の予測誤差が最も小さい試行のモデルを params['model_file'] に保存する。
+    選ばれた設定は settings の params['settings_id'] の行に記録する。
+
+    Args:
+        params: 学習パラメータ（search（max_epochs, min_epochs, eta, batch_size, seed）, config（探索しない設定）,
+            db_path, model_file, series_ids, settings_id, workers, threads_per_worker）
+        callback: callback(学習したエポック数 - 1, 予定の総エポック数, 試行の誤差) 形式の進捗通知関数
+    """
+    from app.backend.hyperparameter_search import hyperband_search
+    from app.models.lstm_model import DemandForecaster
+
+    search = params['search']
+    # 試行のモデルは保存先と同じディレクトリの一時ディレクトリに保存し、探索が終わったら削除する
+    model_dir = os.path.dirname(params['model_file'])
+    os.makedirs(model_dir, exist_ok=True)
+    with tempfile.TemporaryDirectory(prefix='search-', dir=model_dir) as checkpoint_dir:
+        result = hyperband_search(
+            params['db_path'],
+            checkpoint_dir,
+            series_ids=params.get('series_ids'),
+            max_epochs=search['max_epochs'],
+            min_epochs=search['min_epochs'],
+            eta=search['eta'],
+            batch_size=search['batch_size'],
+            base_config=params.get('config'),
+            workers=params.get('workers'),
+            threads_per_worker=params.get('threads_per_worker'),
+            seed=search.get('seed', 0),
+            callback=callback
+        )
+        best = result['best']
+        forecaster = DemandForecaster()
+        if not forecaster.load_model(best['checkpoint'], mmap=False):
+            raise ValueError("探索で選ばれたモデルを読み込めませんでした")
+    forecaster.metrics['training_seconds'] = result['seconds']
+    forecaster.save_model(params['model_file'])
+
+    database = Database(params['db_path'], pool_size=1)
+    try:
+        series_info = list_series(database)
+        series_data = sales_by_series(database, params.get('series_ids'))
+    finally:
+        database.close()
+    if params.get('series_ids'):
+        series_info = [row for row in series_info if row[0] in params['series_ids']]
+    total_rows = sum(row[1] for row in series_info)
+    _register_global_model(params, forecaster, data_version(total_rows, max(row[3] for row in series_info)))
+
+    # 選ばれた設定を記録する（自動設定モードの設定として参照される）
+    config = best['config']
+    summary = {
+        'config': config,
+        'validationLoss': best['score'],
+        'epochs': best['epochsRun'],
+        'epochBudget': best['epochs'],
+        'trials': result['trials'],
+        'trialEpochs': result['trialEpochs'],
+        'seconds': result['seconds']
+    }
+    database = Database(params['db_path'], pool_size=1)
+    try:
+        with database.transaction() as conn:
+            conn.execute('''
+            UPDATE settings SET model_type = ?, hidden_layers = ?, hidden_units = ?,
+                sequence_length = ?, learning_rate = ?, search_result = ?
+            WHERE id = ?
+            ''', (config.get('model_type', 'lstm'), config['hidden_layers'], config['hidden_units'],
+                  config['sequence_length'], config['learning_rate'], json.dumps(summary), params.get('settings_id')))
+    finally:
+        database.close()
+
+    return {
+        'accuracy': float(best['accuracy']),
+        'finalLoss': forecaster.metrics['final_loss'],
+        'trainedRows': total_rows,
+        'trainedSeries': len(series_info),
+        'trainingSeconds': result['seconds'],
+        'validationLoss': best['score'],
+        'modelFile': params['model_file'],
+        'search': {key: summary[key] for key in ('trials', 'trialEpochs', 'seconds')},
+        'baseline': _baseline_summary(
+            forecaster, series_data if len(series_data) > 1 else next(iter(series_data.values()), [])
+        ),
+        # 画面に表示する、探索で選ばれた設定
+        'bestParams': {
+            'epochs': best['epochsRun'],
+            'batchSize': search['batch_size'],
+            'modelType': config.get('model_type', 'lstm'),
+            'hiddenLayers': config['hidden_layers'],
+            'hiddenUnits': config['hidden_units'],
+            'sequenceLength': config['sequence_length'],
+            'learningRate': config['learning_rate']
+        }
+    }
+
+
+def _baseline_summary(forecaster, sales_data):
+    """検証用の期間の予測の誤差（MAPE, %）を、古典的な手法（学習済みモデルがない場合の予測）と比べる"""
+    from app.backend.hyperparameter_search import baseline_error, rollout_error
+
+    model_error = rollout_error(forecaster, sales_data)
+    if model_error is None:
+        return None
+    error = baseline_error(forecaster, sales_data)
+    print(f"検証用の期間の誤差: モデル {model_error:.2f}%, 古典的な手法 {error:.2f}%")
+    return {'modelError': model_error, 'baselineError': error, 'beatsBaseline': model_error < error}
+
+
+def _register_global_model(params, forecaster, version):
+    """登録簿に全系列のモデルとして記録する"""
+    database = Database(params['db_path'], pool_size=1)
+    try:
+        register_models(database, [{
+            'series_id': None,
+            'model_file': params['model_file'],
+            'model_name': DEFAULT_MODEL_NAME,
+            'config': forecaster.config,
+            'metrics': forecaster.metrics,
+            'data_version': version
+        }], params.get('settings_id'))
+    finally:
+        database.close()
+
+
+def _fine_tune_summary(metrics, total_rows, training_seconds):
+    """追加学習の内容と、全期間で学習し直した場合と比べて短縮できた時間の見積もり
+
+    全期間で学習し直す時間は、最後に全期間で学習したときの時間をデータ件数の比で伸ばして見積もる
+    （その時間が記録されていない古いモデルでは None）。
+    """
+    summary = {
+        'recentWindows': metrics['fine_tune']['recent_windows'],
+        'replayWindows': metrics['fine_tune']['replay_windows'],
+        'fineTuneCount': metrics['fine_tune']['count'],
+        'fullTrainingSeconds': None,
+        'savedSeconds': None,
+        'speedup': None
+    }
+    if metrics.get('training_seconds') and metrics.get('base_rows'):
+        full_seconds = metrics['training_seconds'] * total_rows / metrics['base_rows']
+        summary['fullTrainingSeconds'] = full_seconds
+        summary['savedSeconds'] = full_seconds - training_seconds
+        summary['speedup'] = full_seconds / training_seconds if training_seconds > 0 else None
+    return summary
+
+
+def run_series_training(params, callback):
+    """系列ごとの学習ジョブの本体（ワーカープロセスからさらにプロセスプールで並列に学習する）
+
+    Args:
+        params: 学習パラメータ（epochs, batch_size, config, db_path, model_dir,
+            series_ids, group_size, workers, threads_per_worker, pack, settings_id）
+        callback: callback(完了したモデル数 - 1, モデル数, 最終損失) 形式の進捗通知関数
+    """
+    from app.backend.parallel_training import train_series_parallel
+
+    result = train_series_parallel(
+        params['db_path'],
+        params['model_dir'],
+        config=params.get('config'),
+        epochs=params['epochs'],
+        batch_size=params['batch_size'],
+        series_ids=params.get('series_ids'),
+        group_size=params.get('group_size', 1),
+        workers=params.get('workers'),
+        threads_per_worker=params.get('threads_per_worker'),
+        pack=params.get('pack', False),
+        callback=callback
+    )
+
+    # 系列ごとのモデルを登録簿に記録する
+    database = Database(params['db_path'], pool_size=1)
+    try:
+        series_info = {row[0]: row for row in list_series(database)}
+        register_models(database, [
+            {
+                'series_id': series_id,
+                'model_file': model['modelFile'],
+                'model_name': model['modelName'],
+                'config': params.get('config') or {},
+                'metrics': {key: model[key] for key in ('accuracy', 'finalLoss', 'trainedRows')},
+                'data_version': data_version(series_info[series_id][1], series_info[series_id][3])
+            }
+            for model in result['models'] for series_id in model['seriesIds']
+        ], params.get('settings_id'))
+    finally:
+        database.close()
+
+    # 個々のモデルの情報はマニフェストと登録簿に書き出してあるので、ジョブの結果には集計だけを残す
+    result['models'] = len(result['models'])
+    return result
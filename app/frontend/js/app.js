@@ -31,7 +31,7 @@ document.addEventListener('DOMContentLoaded', function() {
     autoModeToggle.addEventListener('change', function() {
       if (this.checked) {
         manualSettings.style.display = 'none';
-        autoModeDescription.textContent = 'オン（データサイズに応じて最適なパラメータを自動設定します）';
+        autoModeDescription.textContent = 'オン（複数の設定を試して最適なパラメータを自動で選びます）';
       } else {
         manualSettings.style.display = 'block';
         autoModeDescription.textContent = 'オフ（手動でパラメータを設定します）';
@@ -83,6 +83,9 @@ document.addEventListener('DOMContentLoaded', function() {
   // ツールチップをセットアップ
   setupTooltips();
   
+  // バックエンドの学習ジョブから届く進捗を表示
+  window.api.onTrainingProgress(updateTrainingProgress);
+  
   // 初期データロード
   loadInitialData();
 });
@@ -130,6 +133,7 @@ async function runPrediction() {
 function displayPredictionResults(result) {
   // メトリクスを更新
   document.getElementById('total-demand').textContent = formatNumber(result.totalDemand);
+  // 前年同期の実績がない場合や、精度を評価できない場合は null が返る
   document.getElementById('yoy-change').textContent = formatPercentage(result.yearOverYearChange);
   document.getElementById('prediction-accuracy').textContent = formatPercentage(result.accuracy);
   
@@ -238,12 +242,14 @@ async function importData() {
       
       // バックエンドにデータを送信
       const result = await window.api.saveData({
-        csvContent: csvContent
+        csvContent: csvContent,
+        mode: document.getElementById('import-mode').value
       });
       
       if (result.success) {
-        alert('データが正常にインポートされました。');
-        renderDataTable(result.data);
+        const summary = result.summary;
+        alert(`データが正常にインポートされました。\n取り込み件数: ${summary.rows}件 (不正な行: ${summary.rejected}件)\n期間: ${summary.dateRange.from} 〜 ${summary.dateRange.to}\n追加: ${summary.inserted}件, 更新: ${summary.updated}件, 削除: ${summary.deleted}件`);
+        loadInitialData();
       } else {
         alert('データのインポートに失敗しました。');
       }
@@ -314,29 +320,22 @@ async function trainModel() {
     document.getElementById('train-model').textContent = '学習中...';
     document.getElementById('training-status').textContent = '学習開始...';
     
-    // 学習の進捗をモニタリングするイベントリスナーを設定
-    const progressInterval = setInterval(() => {
-      // 実際の実装では、進捗状況をバックエンドから取得する処理が必要
-      // ここではデモとして進捗バーをランダムに更新
-      const currentProgress = parseInt(document.getElementById('training-progress-bar').style.width || '0');
-      if (currentProgress < 100) {
-        const newProgress = Math.min(currentProgress + Math.random() * 10, 99);
-        document.getElementById('training-progress-bar').style.width = `${newProgress}%`;
-        document.getElementById('training-status').textContent = `学習中... ${Math.round(newProgress)}%`;
-      }
-    }, 1000);
-    
     // バックエンドにトレーニングリクエストを送信
     const result = await window.api.trainModel(params);
     
+    if (!result.success) {
+      document.getElementById('training-status').textContent =
+        result.status === 'cancelled' ? '学習がキャンセルされました' : 'エラーが発生しました';
+      return;
+    }
+    
     // 学習完了時の処理
-    clearInterval(progressInterval);
     document.getElementById('training-progress-bar').style.width = '100%';
     document.getElementById('training-status').textContent = '学習完了！';
     
     setTimeout(() => {
       if (isAutoMode) {
-        alert(`モデルの学習が完了しました。\n精度: ${formatPercentage(result.accuracy)}\n\n自動設定値: エポック数=${result.usedParams.epochs}, バッチサイズ=${result.usedParams.batchSize}, モデルタイプ=${result.usedParams.modelType}, 隠れ層数=${result.usedParams.hiddenLayers}`);
+        alert(`モデルの学習が完了しました。\n精度: ${formatPercentage(result.accuracy)}\n\n自動設定値: エポック数=${result.usedParams.epochs}, バッチサイズ=${result.usedParams.batchSize}, モデルタイプ=${result.usedParams.modelType}, 隠れ層数=${result.usedParams.hiddenLayers}, 隠れユニット数=${result.usedParams.hiddenUnits}, 入力日数=${result.usedParams.sequenceLength}, 学習率=${result.usedParams.learningRate}`);
       } else {
         alert(`モデルの学習が完了しました。\n精度: ${formatPercentage(result.accuracy)}`);
       }
@@ -352,6 +351,16 @@ async function trainModel() {
   }
 }
 
+// 学習ジョブの進捗を表示する関数
+function updateTrainingProgress(job) {
+  if (job.status === 'running' && job.epochs) {
+    const progress = Math.round((job.epoch / job.epochs) * 100);
+    document.getElementById('training-progress-bar').style.width = `${progress}%`;
+    document.getElementById('training-status').textContent =
+      `学習中... ${progress}% (エポック ${job.epoch}/${job.epochs}, 損失: ${job.loss.toFixed(4)})`;
+  }
+}
+
 // 設定を保存する関数
 async function saveSettings() {
   // 自動設定モードかどうかを確認
@@ -388,7 +397,7 @@ async function saveSettings() {
     await window.api.saveSettings(params);
     
     if (isAutoMode) {
-      alert('自動設定モードが有効になりました。データサイズに基づいて最適なパラメータが使用されます。');
+      alert('自動設定モードが有効になりました。学習時にデータサイズに応じた予算でパラメータを探索します。');
     } else {
       alert('設定が保存されました。');
     }
@@ -403,8 +412,11 @@ function formatNumber(num) {
   return new Intl.NumberFormat('ja-JP').format(num);
 }
 
-// ユーティリティ関数 - パーセンテージのフォーマット
+// ユーティリティ関数 - パーセンテージのフォーマット（値がない場合は「—」）
 function formatPercentage(num) {
+  if (num === null || num === undefined) {
+    return '—';
+  }
   return new Intl.NumberFormat('ja-JP', { style: 'percent', minimumFractionDigits: 1, maximumFractionDigits: 1 }).format(num / 100);
 }
 
@@ -508,7 +520,7 @@ function setupTooltips() {
       hideTooltip();
       
       tooltipTimer = setTimeout(() => {
-        currentTooltip = showTooltip(autoMode.parentElement, 'オンにすると、データサイズに応じて最適なパラメータが自動的に設定されます');
+        currentTooltip = showTooltip(autoMode.parentElement, 'オンにすると、複数の設定を試して、検証データで最も誤差の小さいパラメータが自動的に選ばれます');
       }, 800);
     });
     
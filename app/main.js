@@ -35,9 +35,12 @@ function createWindow() {
 
 // Pythonバックエンドを開始
 function startBackendServer() {
+  // ビルドしたアプリでは app パッケージ（backend と models）ごと resources/python/app に置く
+  // （server.py は app.backend・app.models を読み込むため。resources/app は Electron が
+  //  アプリ本体として読み込む場所なので使わない）
   const serverPath = isDev 
     ? path.join(__dirname, 'backend', 'server.py')
-    : path.join(process.resourcesPath, 'backend', 'server.py');
+    : path.join(process.resourcesPath, 'python', 'app', 'backend', 'server.py');
   
   console.log('Starting backend server from:', serverPath);
   
@@ -83,8 +86,30 @@ app.on('before-quit', () => {
   }
 });
 
-// バックエンドサーバーが起動するまで少し待機
-const waitForBackend = () => new Promise(resolve => setTimeout(resolve, 2000));
+// バックエンドの起動確認の間隔と上限（ミリ秒）
+const BACKEND_POLL_INTERVAL = 100;
+const BACKEND_START_TIMEOUT = 30000;
+let backendReady = null;
+
+// バックエンドの起動時の準備が終わるまで待機（/api/ready が 200 を返すまでポーリングする）
+// 準備に失敗した場合も、ポートが開いていれば簡易予測で応答できるため待機を終える
+const waitForBackend = () => {
+  if (!backendReady) {
+    backendReady = (async () => {
+      const deadline = Date.now() + BACKEND_START_TIMEOUT;
+      while (Date.now() < deadline) {
+        try {
+          const response = await axios.get(`${BACKEND_URL}/api/ready`, { validateStatus: () => true });
+          if (response.status === 200 || response.data.state === 'failed') return;
+        } catch (error) {
+          // ポートがまだ開いていない
+        }
+        await new Promise(resolve => setTimeout(resolve, BACKEND_POLL_INTERVAL));
+      }
+    })();
+  }
+  return backendReady;
+};
 
 // IPC通信の設定
 ipcMain.handle('predict-demand', async (event, data) => {
@@ -98,23 +123,59 @@ ipcMain.handle('predict-demand', async (event, data) => {
   }
 });
 
+// 学習ジョブの進捗を確認する間隔（ミリ秒）
+const TRAINING_POLL_INTERVAL = 500;
+
 // モデルトレーニングのIPC処理
+// 学習はバックグラウンドジョブとして実行されるため、完了までポーリングして進捗をレンダラーに送る
 ipcMain.handle('train-model', async (event, data) => {
   try {
     await waitForBackend();
     const response = await axios.post(`${BACKEND_URL}/api/train`, data);
-    return response.data;
+    const { jobId, usedParams, autoMode } = response.data;
+    
+    while (true) {
+      await new Promise(resolve => setTimeout(resolve, TRAINING_POLL_INTERVAL));
+      const jobResponse = await axios.get(`${BACKEND_URL}/api/train/jobs/${jobId}`);
+      const job = jobResponse.data.job;
+      event.sender.send('training-progress', job);
+      
+      if (job.status === 'completed') {
+        // 自動設定モードでは探索で選ばれた設定を表示する
+        const params = job.result.bestParams ? { ...usedParams, ...job.result.bestParams } : usedParams;
+        return { success: true, jobId, accuracy: job.result.accuracy, usedParams: params, autoMode };
+      }
+      if (job.status !== 'running') {
+        return { success: false, jobId, status: job.status, error: job.error };
+      }
+    }
   } catch (error) {
     console.error('モデル学習エラー:', error);
     return { error: 'モデルの学習中にエラーが発生しました' };
   }
 });
 
+// 学習ジョブのキャンセル
+ipcMain.handle('cancel-training', async (event, jobId) => {
+  try {
+    const response = await axios.post(`${BACKEND_URL}/api/train/jobs/${jobId}/cancel`);
+    return response.data;
+  } catch (error) {
+    console.error('学習キャンセルエラー:', error);
+    return { error: '学習のキャンセル中にエラーが発生しました', success: false };
+  }
+});
+
 // データ保存のIPC処理
 ipcMain.handle('save-data', async (event, data) => {
   try {
     await waitForBackend();
-    const response = await axios.post(`${BACKEND_URL}/api/data/import`, data);
+    // CSVはJSONに埋め込まず、text/csv のままストリーミング取り込みAPIに送る
+    const mode = encodeURIComponent(data.mode || 'replace');
+    const response = await axios.post(`${BACKEND_URL}/api/data/import?mode=${mode}`, data.csvContent, {
+      headers: { 'Content-Type': 'text/csv; charset=utf-8' },
+      maxBodyLength: Infinity
+    });
     return response.data;
   } catch (error) {
     console.error('データ保存エラー:', error);
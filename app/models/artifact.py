@@ -0,0 +1,145 @@
+import json
+import os
+import struct
+
+import numpy as np
+
+# 学習済みモデルのファイル形式
+#
+#   [マジック 8バイト][形式のバージョン uint32][ヘッダーの長さ uint64]
+#   [ヘッダー（JSON、ALIGNMENT バイト境界まで空白で埋める）]
+#   [データ領域（各テンソルを ALIGNMENT バイト境界にそろえて並べた平坦なバッファ）]
+#
+# ヘッダーには1つ以上のモデルを名前ごとに持ち、各モデルはメタデータ（設定・正規化パラメータなど）と
+# テンソルの一覧（dtype・形状・データ領域内の [開始, 終了) オフセット）を持つ。
+# データ領域はそのまま memmap できるので、読み込み時にテンソルをコピーしない。
+MAGIC = b'FCMODEL\0'
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+ARTIFACT_SUFFIX = '.fcm'
+
+# 1つのモデルだけを保存したファイルでのモデル名
+DEFAULT_MODEL_NAME = 'default'
+
+_PREFIX = struct.Struct('<8sIQ')
+
+
+def _aligned(size):
+    return (size + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def is_artifact(path):
+    """path がこの形式のファイルかどうか"""
+    with open(path, 'rb') as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def write_artifact(path, models):
+    """
+    複数のモデルを1つのファイルに書き出す（一時ファイルに書いてから置き換える）
+
+    Args:
+        models: {モデル名: (メタデータの辞書, {テンソル名: numpy配列})}
+    """
+    header = {'version': FORMAT_VERSION, 'models': {}}
+    arrays = []
+    offset = 0
+    for name, (metadata, tensors) in models.items():
+        entries = {}
+        for tensor_name, array in tensors.items():
+            array = np.ascontiguousarray(array)
+            entries[tensor_name] = {
+                'dtype': array.dtype.str,
+                'shape': list(array.shape),
+                'offsets': [offset, offset + array.nbytes]
+            }
+            arrays.append((offset, array))
+            offset = _aligned(offset + array.nbytes)
+        header['models'][name] = {'metadata': metadata, 'tensors': entries}
+
+    header_bytes = json.dumps(header, ensure_ascii=False).encode('utf-8')
+    header_bytes += b' ' * (_aligned(_PREFIX.size + len(header_bytes)) - _PREFIX.size - len(header_bytes))
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(_PREFIX.pack(MAGIC, FORMAT_VERSION, len(header_bytes)))
+        f.write(header_bytes)
+        data_start = f.tell()
+        for array_offset, array in arrays:
+            f.seek(data_start + array_offset)
+            f.write(array.tobytes())
+        # 最後のテンソルの後ろの詰め物もファイルに含める
+        f.truncate(data_start + offset)
+    os.replace(tmp_path, path)
+
+
+class ArtifactReader:
+    """
+    モデルファイルの読み込み
+
+    mmap=True の場合はデータ領域を copy-on-write で memmap するだけで、
+    テンソルの中身は実際に参照されたときに OS がディスクから読み込む。
+    """
+
+    def __init__(self, path, mmap=True):
+        self.path = path
+        with open(path, 'rb') as f:
+            magic, version, header_length = _PREFIX.unpack(f.read(_PREFIX.size))
+            if magic != MAGIC:
+                raise ValueError(f"モデルファイルの形式が正しくありません: {path}")
+            if version > FORMAT_VERSION:
+                raise ValueError(f"対応していないモデルファイルのバージョンです: {version}")
+            header = json.loads(f.read(header_length).decode('utf-8'))
+            data_start = _PREFIX.size + header_length
+            self.version = version
+            self.models = header['models']
+            self.data_size = os.fstat(f.fileno()).st_size - data_start
+            if not mmap or self.data_size == 0:
+                self._buffer = np.frombuffer(f.read(), dtype=np.uint8).copy()
+
+        if mmap and self.data_size > 0:
+            self._buffer = np.memmap(path, dtype=np.uint8, mode='c', offset=data_start)
+
+    def names(self):
+        return list(self.models)
+
+    def metadata(self, name=None):
+        return self.models[self._name(name)]['metadata']
+
+    def tensors(self, name=None):
+        """{テンソル名: numpy配列}（データ領域のビュー）を返す"""
+        result = {}
+        for tensor_name, entry in self.models[self._name(name)]['tensors'].items():
+            start, end = entry['offsets']
+            result[tensor_name] = self._buffer[start:end].view(np.dtype(entry['dtype'])).reshape(entry['shape'])
+        return result
+
+    def nbytes(self, name=None):
+        """モデルのテンソルの合計バイト数"""
+        return sum(end - start for start, end in
+                   (entry['offsets'] for entry in self.models[self._name(name)]['tensors'].values()))
+
+    def _name(self, name):
+        if name is None:
+            # 名前を省略した場合は、1つだけのモデル（または既定の名前のモデル）
+            if DEFAULT_MODEL_NAME in self.models or len(self.models) != 1:
+                return DEFAULT_MODEL_NAME
+            return next(iter(self.models))
+        if name not in self.models:
+            raise KeyError(f"モデルが見つかりません: {name}")
+        return name
+
+
+def pack_artifacts(path, sources):
+    """
+    モデルファイルをまとめて1つのファイルにする
+
+    Args:
+        sources: {まとめた後のモデル名: (元のファイル, 元のファイル内のモデル名 または None)}
+    """
+    models = {}
+    for name, (source_path, source_name) in sources.items():
+        reader = ArtifactReader(source_path, mmap=False)
+        models[name] = (reader.metadata(source_name), reader.tensors(source_name))
+    write_artifact(path, models)
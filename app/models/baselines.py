@@ -0,0 +1,239 @@
+import numpy as np
+
+# 季節の周期（日）
+SEASON_LENGTH = 7
+
+# 需要がある日の平均間隔（ADI）がこれを超える系列は間欠的な需要として Croston 法で予測する（Syntetos-Boylan の基準）
+INTERMITTENT_ADI = 1.32
+
+# 予測に使う直近の日数（Holt-Winters の初期化と平滑化に使う）
+BASELINE_HISTORY_DAYS = 112
+
+# Holt-Winters（加法・減衰トレンド）の平滑化係数の候補。系列ごとに1期先の誤差が最小の組み合わせを選ぶ
+HW_ALPHAS = (0.05, 0.2, 0.5)
+HW_BETAS = (0.0, 0.02)
+HW_GAMMAS = (0.05, 0.2)
+HW_DAMPING = 0.98
+
+# Croston 法の平滑化係数
+CROSTON_ALPHA = 0.1
+
+# 手法を選ぶときに評価に使う直近の日数（この期間を除いて当てはめ、予測の誤差を比べる）
+SELECTION_DAYS = 14
+
+# 手法の名前（predict_batch が返す系列ごとの手法）
+METHODS = ('naive', 'seasonal_naive', 'holt_winters', 'croston')
+
+
+def seasonal_naive(values, prediction_days, season_length=SEASON_LENGTH):
+    """季節ナイーブ: 直近の1周期をそのまま繰り返す
+
+    Args:
+        values: 形状 (系列数, 日数) の配列（日数 >= season_length）
+
+    Returns:
+        形状 (系列数, prediction_days) の予測値
+    """
+    last_season = values[:, -season_length:]
+    return last_season[:, np.arange(prediction_days) % season_length]
+
+
+def holt_winters(values, prediction_days, season_length=SEASON_LENGTH):
+    """加法の Holt-Winters（減衰トレンド）を全系列・全候補の係数でまとめて当てはめて予測する
+
+    時間方向のループ1回で、系列 × 係数の候補の配列を同時に更新する（誤差修正形の ETS(A,Ad,A)）。
+    最初の2周期で水準・トレンド・季節成分を初期化し、系列ごとに1期先の予測の二乗誤差が最小の係数を選ぶ。
+
+    Args:
+        values: 形状 (系列数, 日数) の配列（日数 >= 2 * season_length）
+
+    Returns:
+        形状 (系列数, prediction_days) の予測値
+    """
+    return _holt_winters(values, prediction_days, season_length)[0]
+
+
+def _holt_winters(values, prediction_days, season_length=SEASON_LENGTH, holdout_days=0):
+    """holt_winters の本体
+
+    holdout_days を指定すると、最後の holdout_days 日の直前までで当てはめた状態からのその期間の予測も返す
+    （手法を選ぶための評価を、当てはめ直さずに同じループで行う）。
+
+    Returns:
+        (予測値, 最後の holdout_days 日の予測値（holdout_days が0の場合は None）)
+    """
+    count, length = values.shape
+    m = season_length
+    grid = np.array([(a, b, g) for a in HW_ALPHAS for b in HW_BETAS for g in HW_GAMMAS])
+    alpha, beta, gamma = (grid[:, i, None] for i in range(3))  # 形状 (候補数, 1)
+    series = np.ascontiguousarray(values.T)  # 時刻ごとの値を連続したメモリから読む
+
+    first = series[:m].mean(axis=0)
+    level = np.tile(first, (len(grid), 1))
+    trend = np.tile((series[m:2 * m].mean(axis=0) - first) / m, (len(grid), 1))
+    season = np.repeat((series[:m] - first)[:, None, :], len(grid), axis=1)  # 形状 (m, 候補数, 系列数)
+    sse = np.zeros((len(grid), count))
+    held_out = None
+    # ループの中で配列を確保しないように、途中の値の置き場所を先に確保しておく
+    error = np.empty_like(level)
+    step = np.empty_like(level)
+    for t in range(m, length):
+        if t == length - holdout_days:
+            held_out = _hw_forecast(level, trend, season, sse, t, holdout_days)
+        s = season[t % m]
+        trend *= HW_DAMPING
+        # error = 値 - (水準 + 減衰したトレンド + 季節成分)
+        np.subtract(series[t], level, out=error)
+        error -= trend
+        error -= s
+        np.multiply(error, error, out=step)
+        sse += step
+        level += trend
+        np.multiply(alpha, error, out=step)
+        level += step
+        np.multiply(beta, error, out=step)
+        trend += step
+        np.multiply(gamma, error, out=step)
+        s += step
+    return _hw_forecast(level, trend, season, sse, length, prediction_days), held_out
+
+
+def _hw_forecast(level, trend, season, sse, t, prediction_days):
+    """時刻 t までの状態から、系列ごとに二乗誤差が最小の候補で prediction_days 日を予測する"""
+    m = season.shape[0]
+    best = np.argmin(sse, axis=0)
+    columns = np.arange(len(best))
+    steps = np.arange(1, prediction_days + 1)
+    damping = np.cumsum(HW_DAMPING ** steps)
+    return (level[best, columns][:, None] + trend[best, columns][:, None] * damping
+            + season[(t + steps - 1) % m][:, best, columns].T)
+
+
+def croston(values, prediction_days, alpha=CROSTON_ALPHA):
+    """Croston 法（SBA による偏りの補正つき）: 需要の大きさと間隔を別々に平滑化する
+
+    間欠的な需要（売上が0の日が多い系列）では、需要の平均的な大きさ / 平均的な間隔の一定値を予測する。
+
+    Args:
+        values: 形状 (系列数, 日数) の配列
+
+    Returns:
+        形状 (系列数, prediction_days) の予測値（売上がない系列は0）
+    """
+    count, length = values.shape
+    demand = values > 0
+    demand_days = demand.sum(axis=1)
+    has_demand = demand_days > 0
+    # 需要の大きさと間隔の初期値は、期間全体の平均
+    size = np.where(has_demand, values.sum(axis=1) / np.maximum(demand_days, 1), 0.0)
+    interval = np.where(has_demand, length / np.maximum(demand_days, 1), 1.0)
+    since = np.ones(count)
+    for t in range(length):
+        d = demand[:, t]
+        size = np.where(d, size + alpha * (values[:, t] - size), size)
+        interval = np.where(d, interval + alpha * (since - interval), interval)
+        since = np.where(d, 1.0, since + 1.0)
+    rate = (1 - alpha / 2) * size / interval
+    return np.repeat(rate[:, None], prediction_days, axis=1)
+
+
+def is_intermittent(values):
+    """需要がある日の平均間隔（ADI）が INTERMITTENT_ADI を超える系列かどうか"""
+    demand_days = (values > 0).sum(axis=1)
+    return values.shape[1] > INTERMITTENT_ADI * demand_days
+
+
+def _forecast_methods(values, prediction_days, holdout_days, intermittent):
+    """同じ長さの系列をまとめて、手法ごとの予測値を返す
+
+    Holt-Winters は間欠的でない系列、Croston 法は間欠的な系列だけについて計算する（他の系列は nan）。
+
+    Returns:
+        ({手法: 形状 (系列数, prediction_days) の予測値},
+         {手法: 最後の holdout_days 日を除いて当てはめたときの、その期間の予測値})
+    """
+    length = values.shape[1]
+    train = values[:, :length - holdout_days]
+    forecasts = {'naive': np.repeat(values[:, -1:], prediction_days, axis=1)}
+    held_out = {'naive': np.repeat(train[:, -1:], holdout_days, axis=1)}
+    if length - holdout_days >= SEASON_LENGTH:
+        forecasts['seasonal_naive'] = seasonal_naive(values, prediction_days)
+        held_out['seasonal_naive'] = seasonal_naive(train, holdout_days)
+    for method, rows in (('holt_winters', ~intermittent), ('croston', intermittent)):
+        if method == 'holt_winters' and length - holdout_days < 3 * SEASON_LENGTH:
+            continue
+        forecasts[method] = np.full((len(values), prediction_days), np.nan)
+        held_out[method] = np.full((len(values), holdout_days), np.nan)
+        if not rows.any():
+            continue
+        if method == 'holt_winters':
+            forecasts[method][rows], held_out[method][rows] = _holt_winters(
+                values[rows], prediction_days, holdout_days=holdout_days
+            )
+        else:
+            forecasts[method][rows] = croston(values[rows], prediction_days)
+            held_out[method][rows] = croston(train[rows], holdout_days)
+    return forecasts, held_out
+
+
+def _select(values, held_out, intermittent):
+    """系列ごとに使う手法の番号（METHODS の位置）と、最後の期間の予測の誤差率（%）を返す
+
+    間欠的な系列は Croston 法、それ以外は最後の期間を除いて当てはめたときに
+    その期間の絶対誤差の合計が最も小さい手法を選ぶ。
+    """
+    count = len(values)
+    actual = values[:, values.shape[1] - held_out['naive'].shape[1]:]
+    errors = np.full((len(METHODS), count), np.inf)
+    for method, forecast in held_out.items():
+        errors[METHODS.index(method)] = np.abs(actual - forecast).sum(axis=1)
+    # Croston 法（METHODS の最後）は間欠的な系列だけに使う
+    croston_index = METHODS.index('croston')
+    methods = np.argmin(np.nan_to_num(errors[:croston_index], nan=np.inf), axis=0)
+    methods[intermittent] = croston_index
+    best_error = errors[methods, np.arange(count)]
+    totals = np.abs(actual).sum(axis=1)
+    error_rate = np.where(totals > 0, best_error / np.maximum(totals, 1e-12) * 100, np.nan)
+    return methods, error_rate
+
+
+def baseline_forecast(value_lists, prediction_days):
+    """
+    複数の系列を古典的な手法（直前の値・季節ナイーブ・Holt-Winters・Croston）でまとめて予測する
+
+    長さが同じ系列ごとに配列にまとめ、直近 SELECTION_DAYS 日を除いて当てはめたときの誤差で系列ごとに手法を選び、
+    全期間で当てはめた状態から予測する（Holt-Winters は両方を同じループで計算する）。
+
+    Args:
+        value_lists: 系列ごとの売上のリスト（直近 BASELINE_HISTORY_DAYS 日を使う。空でないこと）
+        prediction_days: 予測日数
+
+    Returns:
+        (形状 (系列数, prediction_days) の予測値（0以上）, 系列ごとの手法の名前のリスト,
+         系列ごとの直近 SELECTION_DAYS 日の予測の誤差率（%。評価できない場合は nan）)
+    """
+    series = [np.asarray(values[-BASELINE_HISTORY_DAYS:], dtype=np.float64) for values in value_lists]
+    lengths = np.array([len(values) for values in series])
+    forecasts = np.empty((len(series), prediction_days))
+    methods = np.zeros(len(series), dtype=np.int64)
+    error_rates = np.full(len(series), np.nan)
+    for length in np.unique(lengths):
+        indexes = np.flatnonzero(lengths == length)
+        values = np.stack([series[i] for i in indexes])
+        holdout_days = min(SELECTION_DAYS, length - SEASON_LENGTH)
+        if holdout_days < 1:
+            # 評価する期間がとれない短い系列は直前の値を使う
+            forecasts[indexes] = values[:, -1:]
+            continue
+        intermittent = is_intermittent(values)
+        candidates, held_out = _forecast_methods(values, prediction_days, holdout_days, intermittent)
+        selected, error_rate = _select(values, held_out, intermittent)
+        group = np.empty((len(indexes), prediction_days))
+        for number, method in enumerate(METHODS):
+            chosen = selected == number
+            if chosen.any():
+                group[chosen] = candidates[method][chosen]
+        forecasts[indexes] = group
+        methods[indexes] = selected
+        error_rates[indexes] = error_rate
+    return np.maximum(forecasts, 0.0), [METHODS[number] for number in methods], error_rates
@@ -0,0 +1,15 @@
+import numpy as np
+
+
+def to_days(dates):
+    """日付（YYYY-MM-DD の文字列・datetime64 など）を datetime64[D] の配列に変換する"""
+    return np.asarray(dates, dtype='datetime64[D]')
+
+
+def horizon_dates(last_dates, period):
+    """最後の日付の翌日から period 日分の日付を返す
+
+    last_dates が1つの日付なら形状 (period,)、配列なら (系列数, period) になる。
+    """
+    last_dates = to_days(last_dates)
+    return last_dates[..., None] + np.arange(1, period + 1)
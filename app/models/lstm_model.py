@@ -1,3 +1,4 @@
+import copy
 import os
 import numpy as np
 import torch
@@ -6,8 +7,17 @@ import torch.optim as optim
 from torch.utils.data import DataLoader, TensorDataset
 from sklearn.preprocessing import MinMaxScaler
 import json
+import time
 from datetime import datetime
 
+from app.models.artifact import ArtifactReader, DEFAULT_MODEL_NAME, is_artifact, write_artifact
+from app.models.windowing import sliding_windows
+
+# 追加学習（ファインチューニング）の既定値
+FINE_TUNE_EPOCHS = 10        # エポック数
+FINE_TUNE_DAYS = 28          # 予測対象に含むウィンドウを学習に使う直近の日数
+FINE_TUNE_REPLAY_RATIO = 1.0  # 直近のウィンドウ数に対して、それより前から無作為に混ぜるウィンドウ数の比率
+
 class LSTMForecastModel(nn.Module):
     def __init__(self, input_size=1, hidden_size=64, num_layers=2, output_size=1):
         super(LSTMForecastModel, self).__init__()
@@ -28,21 +38,129 @@ class LSTMForecastModel(nn.Module):
     
     def forward(self, x):
         # LSTMの初期隠れ状態を初期化
-        h0 = torch.zeros(self.num_layers, x.size(0), self.hidden_size).to(x.device)
-        c0 = torch.zeros(self.num_layers, x.size(0), self.hidden_size).to(x.device)
+        h0 = torch.zeros(self.num_layers, x.size(0), self.hidden_size, device=x.device)
+        c0 = torch.zeros(self.num_layers, x.size(0), self.hidden_size, device=x.device)
         
         # LSTM層に入力を渡す
         out, _ = self.lstm(x, (h0, c0))
         
-        # 最後のタイムステップの出力のみを使用
+        # 最後のタイムステップの出力のみを使用（output_size 日分を一度に出力する）
         out = self.fc(out[:, -1, :])
         return out
+    
+    def rescale_io(self, factor, shift):
+        """正規化を変えても同じ予測になるように入力層と出力層の重みを変換する
+        
+        変更前の正規化での値 x_old と変更後の値 x_new が x_old = factor * x_new + shift の関係にあるとき、
+        入力は x_new から x_old を計算し、出力は x_old から x_new に戻すように重みに織り込む。
+        """
+        _rescale_io(self.lstm.weight_ih_l0, self.lstm.bias_ih_l0, self.fc, factor, shift)
+
+class GRUForecastModel(nn.Module):
+    """GRU による予測モデル（ゲートが3つで、LSTM より1ステップあたりの計算が少ない）"""
+    def __init__(self, input_size=1, hidden_size=64, num_layers=2, output_size=1):
+        super(GRUForecastModel, self).__init__()
+        self.gru = nn.GRU(
+            input_size=input_size,
+            hidden_size=hidden_size,
+            num_layers=num_layers,
+            batch_first=True,
+            dropout=0.2 if num_layers > 1 else 0.0
+        )
+        self.fc = nn.Linear(hidden_size, output_size)
+    
+    def forward(self, x):
+        out, _ = self.gru(x)
+        return self.fc(out[:, -1, :])
+    
+    def rescale_io(self, factor, shift):
+        """LSTMForecastModel.rescale_io と同じ（GRU も入力のバイアスはリセットゲートの外側で足される）"""
+        _rescale_io(self.gru.weight_ih_l0, self.gru.bias_ih_l0, self.fc, factor, shift)
+
+class TCNForecastModel(nn.Module):
+    """膨張畳み込み（dilated causal convolution）を重ねた TCN による予測モデル
+    
+    層ごとに膨張率を2倍にし、カーネル幅はウィンドウ全体（sequence_length 日）が受容野に入るように決める。
+    時間方向に並列に計算できるので、RNN より学習が速い。
+    """
+    def __init__(self, input_size=1, hidden_size=64, num_layers=2, output_size=1, sequence_length=7):
+        super(TCNForecastModel, self).__init__()
+        self.kernel_size = 1 + max(1, -(-(sequence_length - 1) // (2 ** num_layers - 1)))
+        self.input = nn.Linear(input_size, hidden_size)
+        self.convs = nn.ModuleList(
+            nn.Conv1d(hidden_size, hidden_size, self.kernel_size, dilation=2 ** i) for i in range(num_layers)
+        )
+        self.dropout = nn.Dropout(0.2)
+        self.fc = nn.Linear(hidden_size, output_size)
+    
+    def forward(self, x):
+        out = self.input(x).transpose(1, 2)  # (バッチ, チャネル, 時間)
+        for conv in self.convs:
+            # 過去側だけを埋める因果的な畳み込み（0 ではなく最初の値で埋めるので、rescale_io で同じ予測を保てる）
+            padded = nn.functional.pad(out, ((self.kernel_size - 1) * conv.dilation[0], 0), mode='replicate')
+            out = out + self.dropout(torch.relu(conv(padded)))
+        return self.fc(out[:, :, -1])
+    
+    def rescale_io(self, factor, shift):
+        """LSTMForecastModel.rescale_io と同じ"""
+        _rescale_io(self.input.weight, self.input.bias, self.fc, factor, shift)
+
+class TransformerForecastModel(nn.Module):
+    """小さな Transformer エンコーダによる予測モデル（位置埋め込みは学習する）"""
+    def __init__(self, input_size=1, hidden_size=64, num_layers=2, output_size=1, sequence_length=7):
+        super(TransformerForecastModel, self).__init__()
+        self.input = nn.Linear(input_size, hidden_size)
+        self.position = nn.Parameter(torch.zeros(1, sequence_length, hidden_size))
+        layer = nn.TransformerEncoderLayer(
+            d_model=hidden_size,
+            nhead=4 if hidden_size % 4 == 0 else 1,
+            dim_feedforward=hidden_size * 2,
+            dropout=0.1,
+            batch_first=True
+        )
+        self.encoder = nn.TransformerEncoder(layer, num_layers, enable_nested_tensor=False)
+        self.fc = nn.Linear(hidden_size, output_size)
+    
+    def forward(self, x):
+        out = self.encoder(self.input(x) + self.position[:, -x.size(1):])
+        return self.fc(out[:, -1, :])
+    
+    def rescale_io(self, factor, shift):
+        """LSTMForecastModel.rescale_io と同じ"""
+        _rescale_io(self.input.weight, self.input.bias, self.fc, factor, shift)
+
+def _rescale_io(input_weight, input_bias, fc, factor, shift):
+    """入力を線形変換する層の重み（形状 (出力数, 1)）とバイアス、出力層 fc に正規化の変更を織り込む"""
+    with torch.no_grad():
+        input_bias += input_weight[:, 0] * shift
+        input_weight *= factor
+        fc.weight /= factor
+        fc.bias -= shift
+        fc.bias /= factor
+
+# model_type の設定値とモデルのクラス
+MODEL_TYPES = {
+    'lstm': LSTMForecastModel,
+    'gru': GRUForecastModel,
+    'tcn': TCNForecastModel,
+    'transformer': TransformerForecastModel
+}
+
+# 構造がウィンドウの長さ（sequence_length）で決まるモデル
+WINDOWED_MODEL_TYPES = ('tcn', 'transformer')
 
 class DemandForecaster:
-    def __init__(self, model_path=None, config=None):
-        """需要予測器の初期化"""
+    def __init__(self, model_path=None, config=None, model_name=None):
+        """需要予測器の初期化
+        
+        model_path（ファイルまたは ArtifactReader）を指定すると保存済みのモデルを読み込む。
+        その場合は初期値のモデルを作らないので、多数のモデルを読み込むときもメモリを余分に使わない。
+        """
         self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
         self.scaler = MinMaxScaler(feature_range=(0, 1))
+        self.series_scales = {}  # 複数系列で学習した場合の系列ごとの [最小値, 幅]
+        self.metrics = {}  # 最後の学習結果（精度など）
+        self.training_state = None  # 学習を続きから再開するための状態（最良のエポックの時点の最適化器など）
         
         # デフォルト設定
         self.config = {
@@ -50,65 +168,245 @@ class DemandForecaster:
             'hidden_layers': 2,
             'hidden_units': 64,
             'sequence_length': 7,  # 何日分のデータを見て予測するか
+            'horizon': 1,  # 1回の順伝播で何日先まで予測するか（1の場合は1日ずつ自己回帰で予測）
             'learning_rate': 0.001,
-            'batch_size': 32
+            'batch_size': 32,
+            'max_history': None,  # 学習に使う直近の日数（Noneの場合は全期間）
+            'validation_split': 0.2,  # 系列ごとに最後の何割のウィンドウを検証用にするか（0の場合は分割しない）
+            'early_stopping_patience': 20,  # 検証損失が何エポック改善しなければ打ち切るか（Noneの場合は打ち切らない）
+            'min_delta': 1e-4,  # 改善とみなす損失の減少幅
+            'lr_patience': 8,  # 検証損失が何エポック改善しなければ学習率を下げるか（Noneの場合は下げない）
+            'lr_factor': 0.5,  # 学習率を下げるときの倍率
+            'min_lr': 1e-5  # 学習率の下限
         }
         
         # 設定を更新（指定された場合）
         if config:
             self.config.update(config)
         
-        # モデルの作成
-        self.model = LSTMForecastModel(
-            input_size=1,
-            hidden_size=self.config['hidden_units'],
-            num_layers=self.config['hidden_layers'],
-            output_size=1
-        ).to(self.device)
-        
-        # 既存のモデルを読み込む
-        if model_path and os.path.exists(model_path):
-            self.load_model(model_path)
+        # 既存のモデルを読み込む（読み込めない場合は新しいモデルを作成）
+        self.model = None
+        if isinstance(model_path, ArtifactReader) or (model_path and os.path.exists(model_path)):
+            self.load_model(model_path, model_name)
+        if self.model is None:
+            self.model = self._build_model()
+    
+    def _build_model(self, device=None):
+        model_type = self.config['model_type']
+        if model_type not in MODEL_TYPES:
+            raise ValueError(f"未対応のモデルタイプです: {model_type}")
+        options = {'sequence_length': self.config['sequence_length']} if model_type in WINDOWED_MODEL_TYPES else {}
+        # device='meta' の場合はパラメータのメモリを確保しない（読み込んだテンソルを後から割り当てる）
+        with torch.device(device or self.device):
+            return MODEL_TYPES[model_type](
+                input_size=1,
+                hidden_size=self.config['hidden_units'],
+                num_layers=self.config['hidden_layers'],
+                output_size=self.config['horizon'],
+                **options
+            )
     
-    def prepare_data(self, sales_data, sequence_length=None):
-        """時系列データを学習用にシーケンスに変換"""
+    def prepare_data(self, sales_data, sequence_length=None, horizon=None, stride=1):
+        """時系列データを学習用にシーケンスに変換
+        
+        ウィンドウは正規化済みの系列のストライド付きビューとして作り、
+        そのままテンソルにする（ウィンドウごとのコピーは行わない）。
+        """
         if sequence_length is None:
             sequence_length = self.config['sequence_length']
+        if horizon is None:
+            horizon = self.config['horizon']
+        
+        # 学習に使う期間を直近に限定（指定がある場合）
+        max_history = self.config.get('max_history')
+        if max_history:
+            sales_data = sales_data[-max_history:]
         
         # 売上データを抽出して正規化
-        sales = np.array([float(row[1]) for row in sales_data]).reshape(-1, 1)
-        sales_scaled = self.scaler.fit_transform(sales)
+        sales = np.fromiter((row[1] for row in sales_data), dtype=np.float64, count=len(sales_data)).reshape(-1, 1)
+        sales_scaled = self.scaler.fit_transform(sales).astype(np.float32)
         
-        X, y = [], []
-        for i in range(len(sales_scaled) - sequence_length):
-            X.append(sales_scaled[i:i+sequence_length])
-            y.append(sales_scaled[i+sequence_length])
+        X, y = sliding_windows(sales_scaled, sequence_length, horizon, stride, writeable=True)
         
-        # Numpy配列をPyTorchテンソルに変換
-        X_tensor = torch.FloatTensor(np.array(X)).to(self.device)
-        y_tensor = torch.FloatTensor(np.array(y)).to(self.device)
+        # Numpy配列のビューをPyTorchテンソルに変換（CPUではメモリを共有する）
+        X_tensor = torch.from_numpy(X).to(self.device)
+        y_tensor = torch.from_numpy(y[:, :, 0]).to(self.device)
         
         return X_tensor, y_tensor
     
-    def train(self, sales_data, epochs=50, batch_size=None, learning_rate=None, callback=None):
-        """モデルを訓練"""
+    def prepare_series(self, series_data, sequence_length=None, horizon=None):
+        """複数の系列を学習用のシーケンスに変換（全系列で1つのモデルを学習する場合）
+        
+        系列ごとに最小値・最大値で正規化し（パラメータは series_scales に保存）、
+        系列をまたがないようにウィンドウを作って1つのテンソルにまとめる。
+        
+        Args:
+            series_data: {系列ID: 行のリスト} の辞書
+        
+        Returns:
+            (X, y, low, scale, counts) low と scale はウィンドウごとの正規化パラメータ（精度の評価用）、
+            counts は系列ごとのウィンドウ数（X の中で系列ごとに時系列順に並ぶ）
+        """
+        if sequence_length is None:
+            sequence_length = self.config['sequence_length']
+        if horizon is None:
+            horizon = self.config['horizon']
+        max_history = self.config.get('max_history')
+        
+        self.series_scales = {}
+        X_parts, y_parts, lows, scales = [], [], [], []
+        for series_id, sales_data in series_data.items():
+            if max_history:
+                sales_data = sales_data[-max_history:]
+            sales = np.fromiter((row[1] for row in sales_data), dtype=np.float64, count=len(sales_data))
+            if len(sales) == 0:
+                continue
+            
+            low = float(sales.min())
+            scale = float(sales.max() - low) or 1.0
+            self.series_scales[series_id] = [low, scale]
+            
+            sales_scaled = ((sales - low) / scale).astype(np.float32).reshape(-1, 1)
+            X, y = sliding_windows(sales_scaled, sequence_length, horizon, writeable=True)
+            if len(X) == 0:
+                continue
+            X_parts.append(torch.from_numpy(X))
+            y_parts.append(torch.from_numpy(y[:, :, 0]))
+            lows.append(np.full(len(X), low))
+            scales.append(np.full(len(X), scale))
+        
+        if not X_parts:
+            raise ValueError("学習に必要なデータが不足しています")
+        
+        X_tensor = torch.cat(X_parts).to(self.device)
+        y_tensor = torch.cat(y_parts).to(self.device)
+        counts = [len(part) for part in lows]
+        return X_tensor, y_tensor, np.concatenate(lows).reshape(-1, 1), np.concatenate(scales).reshape(-1, 1), counts
+    
+    def train(self, sales_data, epochs=50, batch_size=None, learning_rate=None, callback=None, resume=False):
+        """モデルを訓練
+        
+        sales_data に {系列ID: 行のリスト} の辞書を渡すと、全系列で1つのモデルを学習する。
+        系列ごとに最後の validation_split の割合のウィンドウを検証用に分け（時系列順の分割）、
+        検証損失が改善しなくなったら学習率を下げ、さらに改善しなければ epochs に達する前に打ち切る。
+        モデルは検証損失が最も小さかったエポックの重みに戻し、精度は検証用のウィンドウで評価する。
+        
+        resume=True の場合は、前回の学習の training_state（最良のエポックの時点の最適化器・学習率のスケジューラの
+        状態と最良の損失）から学習を続け、metrics のエポック数は前回からの通算にする。
+        """
         if batch_size is None:
             batch_size = self.config['batch_size']
         if learning_rate is None:
             learning_rate = self.config['learning_rate']
         
         # データの準備
-        X, y = self.prepare_data(sales_data)
+        if isinstance(sales_data, dict):
+            X, y, low, scale, counts = self.prepare_series(sales_data)
+            trained_rows = sum(len(rows) for rows in sales_data.values())
+        else:
+            X, y = self.prepare_data(sales_data)
+            self.series_scales = {}
+            low, scale = self.scaler.data_min_[0], 1 / self.scaler.scale_[0]
+            counts = [len(X)]
+            trained_rows = len(sales_data)
+        
+        # 時系列順に学習用と検証用に分ける（検証用のウィンドウがない場合は学習損失で判断する）
+        validation = self._validation_mask(counts)
+        X_val = y_val = None
+        if validation.any():
+            mask = torch.from_numpy(validation).to(self.device)
+            X, y, X_val, y_val = X[~mask], y[~mask], X[mask], y[mask]
+            if np.ndim(low):
+                low, scale = low[validation], scale[validation]
+        
+        state = self.training_state if resume else None
+        start_epoch = state['epoch'] if state else 0
+        start = time.perf_counter()
+        history = self._fit(X, y, epochs, batch_size, learning_rate, callback, X_val, y_val, state)
+        epoch_losses = history['epoch_losses']
+        if history['state'] is not None:
+            self.training_state = dict(history['state'], epoch=start_epoch + history['best_epoch'])
+        elif not resume:
+            self.training_state = None
+        
+        # 最終的な精度を評価（検証用のウィンドウがある場合はそちらで評価する）
+        accuracy = self._evaluate(X, y, low, scale) if X_val is None else self._evaluate(X_val, y_val, low, scale)
+        self.metrics = {
+            'accuracy': float(accuracy),
+            'final_loss': float(epoch_losses[-1]) if epoch_losses else None,
+            'validation_loss': history['best_loss'] if X_val is not None else None,
+            'trained_rows': trained_rows,
+            'trained_series': len(self.series_scales) or 1,
+            'epochs': start_epoch + len(epoch_losses),
+            'best_epoch': start_epoch + history['best_epoch'],
+            'training_seconds': time.perf_counter() - start  # 追加学習で短縮できた時間の見積もりに使う
+        }
+        
+        return {
+            'accuracy': accuracy,
+            'epoch_losses': epoch_losses,
+            'validation_losses': history['validation_losses'],
+            'best_epoch': history['best_epoch']
+        }
+    
+    def _validation_mask(self, counts):
+        """系列ごとに最後の validation_split の割合のウィンドウを True にしたマスクを返す
+        
+        counts は系列ごとのウィンドウ数。学習用のウィンドウが残らない系列は分割しない。
+        """
+        split = self.config.get('validation_split') or 0
+        mask = np.zeros(sum(counts), dtype=bool)
+        offset = 0
+        for count in counts:
+            validation_count = int(count * split)
+            if 0 < validation_count < count:
+                mask[offset + count - validation_count:offset + count] = True
+            offset += count
+        return mask
+    
+    def _fit(self, X, y, epochs, batch_size, learning_rate, callback=None, X_val=None, y_val=None, state=None):
+        """ウィンドウ X, y でモデルの重みを更新する
+        
+        X_val, y_val（省略時は学習損失）の損失が min_delta 以上改善しないエポックが lr_patience 回続いたら
+        学習率を lr_factor 倍にし、early_stopping_patience 回続いたら打ち切る。
+        終了時には損失が最も小さかったエポックの重みに戻す。
+        state（前回の戻り値の state）を渡すと、最適化器・スケジューラの状態と最良の損失を引き継いで続きから学習する。
+        
+        Returns:
+            epoch_losses（エポックごとの平均学習損失）, validation_losses, best_epoch, best_loss,
+            state（最良のエポックの時点の optimizer・scheduler の状態と best_loss。改善しなかった場合は None）を持つ辞書
+        """
         dataset = TensorDataset(X, y)
         dataloader = DataLoader(dataset, batch_size=batch_size, shuffle=True)
         
         # 損失関数と最適化器の設定
         criterion = nn.MSELoss()
         optimizer = optim.Adam(self.model.parameters(), lr=learning_rate)
+        scheduler = None
+        if self.config.get('lr_patience'):
+            scheduler = optim.lr_scheduler.ReduceLROnPlateau(
+                optimizer, factor=self.config['lr_factor'], patience=self.config['lr_patience'],
+                threshold=self.config['min_delta'], threshold_mode='abs', min_lr=self.config['min_lr']
+            )
+        patience = self.config.get('early_stopping_patience')
+        min_delta = self.config['min_delta']
+        
+        # 前回の学習の続きから始める場合は、最良のエポックの時点の状態に戻す
+        best_loss = float('inf')
+        if state is not None:
+            optimizer.load_state_dict(state['optimizer'])
+            if scheduler is not None and state.get('scheduler') is not None:
+                scheduler.load_state_dict(state['scheduler'])
+            best_loss = state['best_loss']
         
         # 訓練ループ
         self.model.train()
         epoch_losses = []
+        validation_losses = []
+        best_epoch = 0
+        best_state = None
+        best_training_state = None
+        stale_epochs = 0
         
         for epoch in range(epochs):
             total_loss = 0
@@ -132,28 +430,186 @@ class DemandForecaster:
             avg_loss = total_loss / len(dataloader)
             epoch_losses.append(avg_loss)
             
+            monitored_loss = avg_loss
+            if X_val is not None:
+                monitored_loss = self._loss(X_val, y_val, criterion, batch_size)
+                validation_losses.append(monitored_loss)
+                self.model.train()
+            if scheduler is not None:
+                scheduler.step(monitored_loss)
+            
+            # 最も損失が小さいエポックの重みを残しておく
+            if monitored_loss < best_loss - min_delta:
+                best_loss = monitored_loss
+                best_epoch = epoch + 1
+                best_state = {name: tensor.detach().clone() for name, tensor in self.model.state_dict().items()}
+                best_training_state = {
+                    'optimizer': copy.deepcopy(optimizer.state_dict()),
+                    'scheduler': copy.deepcopy(scheduler.state_dict()) if scheduler is not None else None,
+                    'best_loss': best_loss
+                }
+                stale_epochs = 0
+            else:
+                stale_epochs += 1
+            
             # コールバック関数があれば呼び出し
             if callback:
                 callback(epoch, epochs, avg_loss)
             
-            print(f"エポック {epoch+1}/{epochs}, 損失: {avg_loss:.4f}")
+            if X_val is not None:
+                print(f"エポック {epoch+1}/{epochs}, 損失: {avg_loss:.4f}, 検証損失: {monitored_loss:.4f}")
+            else:
+                print(f"エポック {epoch+1}/{epochs}, 損失: {avg_loss:.4f}")
+            
+            if patience and stale_epochs >= patience:
+                print(f"{patience}エポック改善しなかったため学習を打ち切ります（最良: エポック {best_epoch}）")
+                break
         
-        # 最終的な精度を評価
-        accuracy = self._evaluate(X, y)
+        if best_state is not None:
+            self.model.load_state_dict(best_state)
+        
+        return {
+            'epoch_losses': epoch_losses,
+            'validation_losses': validation_losses,
+            'best_epoch': best_epoch,
+            'best_loss': best_loss if best_state is not None else None,
+            'state': best_training_state
+        }
+    
+    def _loss(self, X, y, criterion, batch_size):
+        """重みを更新せずに X, y の平均損失を計算する"""
+        self.model.eval()
+        total_loss = 0.0
+        chunk = max(batch_size, 1024)
+        with torch.inference_mode():
+            for i in range(0, len(X), chunk):
+                total_loss += criterion(self.model(X[i:i + chunk]), y[i:i + chunk]).item() * len(X[i:i + chunk])
+        return total_loss / len(X)
+    
+    def fine_tune(self, sales_data, epochs=FINE_TUNE_EPOCHS, batch_size=None, learning_rate=None,
+                  recent_days=FINE_TUNE_DAYS, replay_ratio=FINE_TUNE_REPLAY_RATIO, seed=0, callback=None):
+        """読み込んだモデルを新しいデータで追加学習する（重みを引き継いで学習を再開する）
+        
+        直近 recent_days 日を予測対象に含むウィンドウと、それより前のウィンドウから無作為に選んだ
+        replay_ratio 倍のウィンドウ（過去のパターンを忘れないように混ぜる）だけで学習する。
+        正規化パラメータは学習済みの範囲を引き継ぎ、1系列のモデルでは新しいデータが範囲を超えた分だけ広げて、
+        その変換を重みに織り込む（広げても追加学習前の予測は変わらない）。
+        複数系列のモデルでは、学習済みの系列は元の範囲のまま、新しい系列は渡された履歴から範囲を決める。
+        
+        sales_data は train と同じ形式（全期間の行のリスト、または {系列ID: 行のリスト}）。
+        """
+        if batch_size is None:
+            batch_size = self.config['batch_size']
+        if learning_rate is None:
+            learning_rate = self.config['learning_rate']
+        sequence_length = self.config['sequence_length']
+        horizon = self.config['horizon']
+        rng = np.random.default_rng(seed)
+        
+        if isinstance(sales_data, dict):
+            series_items = list(sales_data.items())
+            trained_rows = sum(len(rows) for rows in sales_data.values())
+        else:
+            series_items = [(None, sales_data)]
+            trained_rows = len(sales_data)
+        
+        recent, older = [], []
+        for series_id, rows in series_items:
+            sales = np.fromiter((row[1] for row in rows), dtype=np.float64, count=len(rows))
+            if len(sales) == 0:
+                continue
+            if series_id is None:
+                low, scale = self._extend_scaler(sales)
+            else:
+                if series_id not in self.series_scales:
+                    self.series_scales[series_id] = [float(sales.min()), float(sales.max() - sales.min()) or 1.0]
+                low, scale = self.series_scales[series_id]
+            
+            sales_scaled = ((sales - low) / scale).astype(np.float32).reshape(-1, 1)
+            X, y = sliding_windows(sales_scaled, sequence_length, horizon)
+            if len(X) == 0:
+                continue
+            # 予測対象の最後の日が直近 recent_days 日に入るウィンドウを新しいデータとして扱う
+            is_recent = np.arange(len(X)) + sequence_length + horizon > len(sales) - recent_days
+            for mask, parts in ((is_recent, recent), (~is_recent, older)):
+                if mask.any():
+                    parts.append((X[mask], y[mask][:, :, 0], np.full(int(mask.sum()), low), np.full(int(mask.sum()), scale)))
+        
+        if not recent:
+            raise ValueError("追加学習に必要なデータが不足しています")
+        
+        def stack(parts, index):
+            return np.concatenate([part[index] for part in parts])
+        
+        X_recent, y_recent = stack(recent, 0), stack(recent, 1)
+        X_train, y_train = X_recent, y_recent
+        replay_windows = 0
+        if older and replay_ratio > 0:
+            X_older = stack(older, 0)
+            replay_windows = min(len(X_older), int(round(len(X_recent) * replay_ratio)))
+            replay = rng.choice(len(X_older), replay_windows, replace=False)
+            X_train = np.concatenate([X_recent, X_older[replay]])
+            y_train = np.concatenate([y_recent, stack(older, 1)[replay]])
+        
+        to_tensor = lambda array: torch.from_numpy(np.ascontiguousarray(array)).to(self.device)
+        start = time.perf_counter()
+        epoch_losses = self._fit(to_tensor(X_train), to_tensor(y_train), epochs, batch_size, learning_rate,
+                                 callback)['epoch_losses']
+        
+        # 精度は新しいデータ（直近のウィンドウ）で評価する
+        accuracy = self._evaluate(to_tensor(X_recent), to_tensor(y_recent),
+                                  stack(recent, 2).reshape(-1, 1), stack(recent, 3).reshape(-1, 1))
+        previous = self.metrics
+        self.metrics = {
+            'accuracy': float(accuracy),
+            'final_loss': float(epoch_losses[-1]) if epoch_losses else None,
+            'trained_rows': trained_rows,
+            'trained_series': len(self.series_scales) or 1,
+            'epochs': previous.get('epochs'),
+            # 全期間で学習し直した場合の時間の見積もり用に、最後に全期間で学習したときの値を引き継ぐ
+            'training_seconds': previous.get('training_seconds'),
+            'base_rows': previous.get('base_rows', previous.get('trained_rows')),
+            'fine_tune': {
+                'count': previous.get('fine_tune', {}).get('count', 0) + 1,
+                'epochs': epochs,
+                'recent_windows': int(len(X_recent)),
+                'replay_windows': replay_windows,
+                'seconds': time.perf_counter() - start
+            }
+        }
         
         return {
             'accuracy': accuracy,
             'epoch_losses': epoch_losses
         }
     
-    def _evaluate(self, X, y):
-        """モデルの精度を評価"""
+    def _extend_scaler(self, sales):
+        """1系列のモデルの正規化の範囲を sales を含むように広げ、(最小値, 幅) を返す"""
+        old_low = float(self.scaler.data_min_[0])
+        old_scale = float(1 / self.scaler.scale_[0])
+        low = min(old_low, float(sales.min()))
+        scale = max(old_low + old_scale, float(sales.max())) - low
+        if low != old_low or scale != old_scale:
+            # 変更前の正規化の値 = (scale / old_scale) * 変更後の値 + (low - old_low) / old_scale
+            self.model.rescale_io(scale / old_scale, (low - old_low) / old_scale)
+            self._set_scaler(low, scale)
+        return low, scale
+    
+    def _set_scaler(self, low, scale):
+        self.scaler.data_min_ = np.array([low])
+        self.scaler.data_max_ = np.array([low + scale])
+        self.scaler.data_range_ = np.array([scale])
+        self.scaler.scale_ = np.array([1 / scale])
+        self.scaler.min_ = np.array([-low / scale])
+    
+    def _evaluate(self, X, y, low, scale):
+        """モデルの精度を評価（low, scale は正規化パラメータ。ウィンドウごとの配列も可）"""
         self.model.eval()
         with torch.no_grad():
             predictions = self.model(X)
             # スケールを元に戻す
-            y_true = self.scaler.inverse_transform(y.cpu().numpy())
-            y_pred = self.scaler.inverse_transform(predictions.cpu().numpy())
+            y_true = y.cpu().numpy() * scale + low
+            y_pred = predictions.cpu().numpy() * scale + low
             
             # 平均絶対誤差率（MAPE）を計算
             mape = np.mean(np.abs((y_true - y_pred) / y_true)) * 100
@@ -163,84 +619,153 @@ class DemandForecaster:
     
     def predict(self, sales_data, prediction_days=30):
         """将来の需要を予測"""
-        self.model.eval()
+        return self.predict_batch([sales_data], prediction_days)[0]
+    
+    def _scales(self, series_list, series_ids):
+        """系列ごとの正規化パラメータ（最小値, 幅）の配列を返す"""
+        if not self.series_scales:
+            # 1つの系列で学習したモデル
+            count = len(series_list)
+            return np.full(count, self.scaler.data_min_[0]), np.full(count, 1 / self.scaler.scale_[0])
         
-        # 最新のデータを取得
-        latest_sequence = np.array([float(row[1]) for row in sales_data[-self.config['sequence_length']:]])
+        lows = np.empty(len(series_list))
+        scales = np.empty(len(series_list))
+        for i, sales_data in enumerate(series_list):
+            series_id = series_ids[i] if series_ids is not None else None
+            if series_id in self.series_scales:
+                lows[i], scales[i] = self.series_scales[series_id]
+            else:
+                # 学習時になかった系列は、渡された履歴から正規化パラメータを決める
+                values = [float(row[1]) for row in sales_data]
+                lows[i] = min(values)
+                scales[i] = (max(values) - lows[i]) or 1.0
+        return lows, scales
+    
+    def predict_batch(self, series_list, prediction_days=30, series_ids=None):
+        """複数の系列の将来の需要をまとめて予測し、形状 (系列数, prediction_days) の配列を返す
         
-        # データの正規化
-        latest_sequence_scaled = self.scaler.transform(latest_sequence.reshape(-1, 1))
+        各系列の直近 sequence_length 日を1つのバッチにして順伝播する（各系列の履歴は空でないこと。
+        sequence_length 日に満たない場合は最初の値で埋めるので、呼び出し側で別の方法で予測してもよい）。
+        series_ids を指定すると、学習時に保存した系列ごとの正規化パラメータを使う。
+        horizon 日分を出力するモデルでは1回の順伝播で horizon 日先まで予測し、
+        それを超える分は予測値をウィンドウに戻して続きを予測する。
+        """
+        self.model.eval()
+        sequence_length = self.config['sequence_length']
         
-        # 予測結果
-        predictions = []
-        current_sequence = latest_sequence_scaled.flatten()
+        # 最新のデータを取得して正規化
+        # （履歴が sequence_length 日に満たない系列は、最初の値を繰り返して古い側を埋める）
+        latest = np.empty((len(series_list), sequence_length), dtype=np.float64)
+        for i, sales_data in enumerate(series_list):
+            values = [float(row[1]) for row in sales_data[-sequence_length:]]
+            latest[i, :sequence_length - len(values)] = values[0]
+            latest[i, sequence_length - len(values):] = values
+        lows, scales = self._scales(series_list, series_ids)
+        latest_scaled = (latest - lows[:, None]) / scales[:, None]
         
-        with torch.no_grad():
-            for _ in range(prediction_days):
-                # 現在のシーケンスから次の値を予測
-                x = torch.FloatTensor(current_sequence[-self.config['sequence_length']:].reshape(1, -1, 1)).to(self.device)
-                predicted = self.model(x)
-                
-                # 予測値をリストに追加
-                predictions.append(predicted.cpu().numpy()[0, 0])
-                
-                # シーケンスを更新
-                current_sequence = np.append(current_sequence, predicted.cpu().numpy()[0, 0])
+        # 入力ウィンドウと予測値を1つのバッファに確保しておき、ウィンドウをずらしながら書き込む
+        buffer = torch.empty(len(series_list), sequence_length + prediction_days, 1, device=self.device)
+        buffer[:, :sequence_length, 0] = torch.from_numpy(latest_scaled)
         
-        # スケールを元に戻す
-        predictions_rescaled = self.scaler.inverse_transform(np.array(predictions).reshape(-1, 1))
+        with torch.inference_mode():
+            position = 0
+            while position < prediction_days:
+                predicted = self.model(buffer[:, position:position + sequence_length])
+                steps = min(predicted.size(1), prediction_days - position)
+                buffer[:, sequence_length + position:sequence_length + position + steps, 0] = predicted[:, :steps]
+                position += steps
         
-        return predictions_rescaled.flatten()
+        # スケールを元に戻す
+        predictions = buffer[:, sequence_length:, 0].cpu().numpy().astype(np.float64)
+        return predictions * scales[:, None] + lows[:, None]
     
-    def save_model(self, model_path):
-        """モデルを保存"""
-        os.makedirs(os.path.dirname(model_path), exist_ok=True)
-        
-        model_state = {
-            'model_state_dict': self.model.state_dict(),
+    def _metadata(self):
+        """モデルファイルに保存する設定・正規化パラメータ・学習結果"""
+        return {
             'config': self.config,
             'scaler_params': {
                 'scale_': self.scaler.scale_.tolist(),
                 'min_': self.scaler.min_.tolist(),
                 'data_min_': self.scaler.data_min_.tolist(),
                 'data_max_': self.scaler.data_max_.tolist(),
-                'data_range_': self.scaler.data_range_.tolist()
-            },
+                'data_range_': self.scaler.data_range_.tolist(),
+                'n_samples_seen_': int(self.scaler.n_samples_seen_)
+            } if not self.series_scales else None,
+            'series_scales': self.series_scales,
+            'metrics': self.metrics,
             'timestamp': datetime.now().isoformat()
         }
+    
+    def artifact_entry(self):
+        """write_artifact に渡す (メタデータ, {テンソル名: numpy配列}) を返す"""
+        tensors = {name: tensor.detach().cpu().numpy() for name, tensor in self.model.state_dict().items()}
+        return self._metadata(), tensors
+    
+    def save_model(self, model_path):
+        """モデルを保存
         
-        torch.save(model_state, model_path)
+        拡張子が .pt の場合は従来の torch.save 形式、それ以外はメモリマップで読み込める形式で保存する。
+        """
+        os.makedirs(os.path.dirname(model_path), exist_ok=True)
+        
+        if model_path.endswith('.pt'):
+            model_state = self._metadata()
+            model_state['model_state_dict'] = self.model.state_dict()
+            torch.save(model_state, model_path)
+        else:
+            write_artifact(model_path, {DEFAULT_MODEL_NAME: self.artifact_entry()})
         print(f"モデルが保存されました: {model_path}")
     
-    def load_model(self, model_path):
-        """保存されたモデルを読み込む"""
+    def load_model(self, model_path, name=None, mmap=True):
+        """保存されたモデルを読み込む
+        
+        Args:
+            model_path: モデルファイル（または読み込み済みの ArtifactReader）
+            name: 複数のモデルをまとめたファイルの場合のモデル名
+            mmap: テンソルをメモリマップして、コピーせずに読み込むかどうか
+        """
         try:
-            model_state = torch.load(model_path, map_location=self.device)
-            
-            # モデル設定を更新
-            self.config = model_state['config']
+            if isinstance(model_path, ArtifactReader) or is_artifact(model_path):
+                reader = model_path if isinstance(model_path, ArtifactReader) else ArtifactReader(model_path, mmap)
+                metadata = reader.metadata(name)
+                state_dict = {key: torch.from_numpy(value) for key, value in reader.tensors(name).items()}
+                model_path = reader.path
+            else:
+                metadata = torch.load(model_path, map_location=self.device)
+                state_dict = metadata['model_state_dict']
             
-            # モデル構造を再構築
-            self.model = LSTMForecastModel(
-                input_size=1,
-                hidden_size=self.config['hidden_units'],
-                num_layers=self.config['hidden_layers'],
-                output_size=1
-            ).to(self.device)
+            # モデル設定を更新（古いファイルにない項目はデフォルト値のまま）
+            self.config.update(metadata['config'])
+            self.metrics = metadata.get('metrics', {})
+            # 以前は model_type に関わらず LSTM で学習していたので、その頃のファイルは LSTM として読み込む
+            if any(key.startswith('lstm.') for key in state_dict):
+                self.config['model_type'] = 'lstm'
             
-            # モデルパラメータを読み込み
-            self.model.load_state_dict(model_state['model_state_dict'])
+            # モデル構造を再構築し、パラメータを読み込む
+            # （CPUでは初期値を作らず、メモリマップしたテンソルをコピーせずにそのまま使う）
+            if self.device.type == 'cpu':
+                model = self._build_model('meta')
+                model.load_state_dict(state_dict, assign=True)
+            else:
+                model = self._build_model()
+                model.load_state_dict(state_dict)
+            self.model = model
             
             # スケーラーパラメータを復元
-            scaler_params = model_state['scaler_params']
-            self.scaler.scale_ = np.array(scaler_params['scale_'])
-            self.scaler.min_ = np.array(scaler_params['min_'])
-            self.scaler.data_min_ = np.array(scaler_params['data_min_'])
-            self.scaler.data_max_ = np.array(scaler_params['data_max_'])
-            self.scaler.data_range_ = np.array(scaler_params['data_range_'])
+            self.series_scales = metadata.get('series_scales', {})
+            scaler_params = metadata['scaler_params']
+            if scaler_params:
+                self.scaler.scale_ = np.array(scaler_params['scale_'])
+                self.scaler.min_ = np.array(scaler_params['min_'])
+                self.scaler.data_min_ = np.array(scaler_params['data_min_'])
+                self.scaler.data_max_ = np.array(scaler_params['data_max_'])
+                self.scaler.data_range_ = np.array(scaler_params['data_range_'])
+                # 読み込んだモデルを学習し直すとき（fit で前回の値を消すとき）に必要
+                self.scaler.n_samples_seen_ = scaler_params.get('n_samples_seen_', self.metrics.get('trained_rows', 1))
+                self.scaler.n_features_in_ = 1
             
             print(f"モデルが読み込まれました: {model_path}")
             return True
         except Exception as e:
             print(f"モデルの読み込みに失敗しました: {e}")
-            return False 
\ No newline at end of file
+            return False
@@ -0,0 +1,41 @@
+import numpy as np
+from numpy.lib.stride_tricks import as_strided
+
+
+def window_count(length, window, horizon=1, stride=1):
+    """長さ length の系列から作れるウィンドウの数"""
+    if window < 1 or horizon < 0 or stride < 1:
+        raise ValueError("window・stride は1以上、horizon は0以上を指定してください")
+    return max(0, (length - window - horizon) // stride + 1)
+
+
+def sliding_windows(series, window, horizon=1, stride=1, writeable=False):
+    """
+    時系列から学習用の入力ウィンドウと正解ウィンドウを作る（コピーなし）
+
+    i 番目のウィンドウは X[i] = series[i*stride : i*stride+window]、
+    y[i] = series[i*stride+window : i*stride+window+horizon] になる。
+    どちらも series のメモリを共有するストライド付きのビューなので、
+    行数が増えても追加のメモリ確保やコピーは発生しない。
+
+    Args:
+        series: 形状 (n,) または (n, 特徴量数) の配列
+        window: 入力ウィンドウの長さ
+        horizon: 予測する先の長さ（0 の場合 y は空のウィンドウになる）
+        stride: ウィンドウの開始位置の間隔
+        writeable: True の場合は書き込み可能なビューを返す
+            （torch.from_numpy にそのまま渡す場合に指定する。ウィンドウ同士は
+            メモリを共有しているので、ビューへの書き込みは行わないこと）
+
+    Returns:
+        (X, y) 形状は (ウィンドウ数, window, ...) と (ウィンドウ数, horizon, ...)
+    """
+    series = np.asarray(series)
+    count = window_count(len(series), window, horizon, stride)
+    step = series.strides[0]
+    feature_shape = series.shape[1:]
+    strides = (step * stride, step) + series.strides[1:]
+
+    X = as_strided(series, shape=(count, window) + feature_shape, strides=strides, writeable=writeable)
+    y = as_strided(series[window:], shape=(count, horizon) + feature_shape, strides=strides, writeable=writeable)
+    return X, y
@@ -8,6 +8,12 @@ contextBridge.exposeInMainWorld('api', {
   // モデルの再トレーニング
   trainModel: (data) => ipcRenderer.invoke('train-model', data),
   
+  // 学習の進捗を受け取る
+  onTrainingProgress: (callback) => ipcRenderer.on('training-progress', (event, job) => callback(job)),
+  
+  // 学習のキャンセル
+  cancelTraining: (jobId) => ipcRenderer.invoke('cancel-training', jobId),
+  
   // データの保存
   saveData: (data) => ipcRenderer.invoke('save-data', data),
   
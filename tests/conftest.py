@@ -0,0 +1,92 @@
+import contextlib
+import io
+import os
+import sys
+
+import pytest
+
+# リポジトリのルートから app パッケージを読み込めるようにする
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from app.backend.database import Database, create_schema  # noqa: E402
+
+
+@pytest.fixture
+def database(tmp_path):
+    """スキーマを作成した一時的なデータベース"""
+    database = Database(str(tmp_path / 'sales.db'))
+    with database.transaction() as conn:
+        create_schema(conn)
+    yield database
+    database.close()
+
+
+@pytest.fixture
+def forecaster():
+    """2エポックだけ学習した小さなモデル（sequence_length = 7）"""
+    torch = pytest.importorskip('torch')
+    from app.models.lstm_model import DemandForecaster
+
+    torch.manual_seed(0)
+    forecaster = DemandForecaster(config={'hidden_units': 16, 'hidden_layers': 2, 'sequence_length': 7})
+    with contextlib.redirect_stdout(io.StringIO()):
+        forecaster.train(daily_rows(120), epochs=2)
+    return forecaster
+
+
+def daily_rows(days, start='2024-01-01', level=100.0, seed=0):
+    """週周期とノイズのある1系列分の行 [(date, sales), ...]"""
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    dates = np.datetime64(start) + np.arange(days)
+    values = level * (1 + 0.3 * np.sin(2 * np.pi * np.arange(days) / 7)) + rng.normal(0, level * 0.05, days)
+    return [(str(date), float(value)) for date, value in zip(dates, values)]
+
+
+@pytest.fixture
+def api(tmp_path, monkeypatch):
+    """サンプルデータ（系列 'default' の1年分）を入れた一時的なデータベースでサーバーを起動し、
+    request(method, path, body=None, raw=None, content_type=...) -> (ステータス, JSON またはバイト列) を返す"""
+    import json
+    import threading
+    import urllib.error
+    import urllib.request
+
+    import numpy as np
+
+    from app.backend import server
+
+    saved = tmp_path / 'saved'
+    monkeypatch.setattr(server, 'DB_PATH', str(tmp_path / 'api.db'))
+    monkeypatch.setattr(server, 'MODEL_FILE', str(saved / 'demand_forecaster.fcm'))
+    monkeypatch.setattr(server, 'SERIES_MODEL_DIR', str(saved / 'series'))
+    monkeypatch.setattr(server, '_forecaster', None)
+    server.MODEL_REGISTRY.clear()
+    with contextlib.redirect_stdout(io.StringIO()):
+        server.init_database()
+        np.random.seed(0)
+        server.generate_sample_data()
+    httpd = server.create_server(0)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    base = f"http://localhost:{httpd.server_address[1]}"
+
+    def request(method, path, body=None, raw=None, content_type='application/json'):
+        data = raw if raw is not None else (json.dumps(body).encode() if body is not None else None)
+        req = urllib.request.Request(base + path, data=data, method=method, headers={'Content-Type': content_type})
+        try:
+            with urllib.request.urlopen(req) as response:
+                status, payload = response.status, response.read()
+        except urllib.error.HTTPError as e:
+            status, payload = e.code, e.read()
+        try:
+            return status, json.loads(payload)
+        except ValueError:
+            return status, payload
+
+    yield request
+    httpd.shutdown()
+    httpd.server_close()
+    server.get_database().close()
@@ -0,0 +1,75 @@
+import contextlib
+import io
+
+import numpy as np
+import pytest
+
+from app.backend.model_registry import active_model_files, register_models
+from app.backend.parallel_training import RUN_DIR_PREFIX, remove_unused_runs
+from conftest import daily_rows
+
+torch = pytest.importorskip('torch')
+
+
+def test_artifact_round_trip_and_replace(forecaster, tmp_path):
+    from app.models.lstm_model import DemandForecaster
+
+    model_file = str(tmp_path / 'model.fcm')
+    history = daily_rows(60)
+    with contextlib.redirect_stdout(io.StringIO()):
+        forecaster.save_model(model_file)
+        loaded = DemandForecaster()
+        assert loaded.load_model(model_file, mmap=False)
+    assert loaded.config['sequence_length'] == 7
+    np.testing.assert_allclose(loaded.predict_batch([history], 5), forecaster.predict_batch([history], 5), rtol=1e-6)
+
+    # 読み込んだ後も同じパスに保存し直すことができ、読み込み直すと新しい重みになる
+    with torch.no_grad():
+        forecaster.model.fc.bias += 1.0
+    with contextlib.redirect_stdout(io.StringIO()):
+        forecaster.save_model(model_file)
+        reloaded = DemandForecaster()
+        assert reloaded.load_model(model_file)
+    np.testing.assert_allclose(reloaded.predict_batch([history], 5), forecaster.predict_batch([history], 5), rtol=1e-6)
+    assert not np.allclose(reloaded.predict_batch([history], 5), loaded.predict_batch([history], 5))
+
+
+def test_artifact_keeps_several_models_and_dtypes(tmp_path):
+    from app.models.artifact import ArtifactReader, write_artifact
+
+    path = str(tmp_path / 'packed.fcm')
+    write_artifact(path, {
+        'a': ({'config': {'n': 1}}, {'w': np.arange(6, dtype=np.float32).reshape(2, 3)}),
+        'b': ({'config': {'n': 2}}, {'w': np.ones(3, dtype=np.float64), 'i': np.arange(4, dtype=np.int64)})
+    })
+
+    for mmap in (True, False):
+        reader = ArtifactReader(path, mmap=mmap)
+        assert reader.names() == ['a', 'b']
+        assert reader.metadata('b') == {'config': {'n': 2}}
+        np.testing.assert_array_equal(reader.tensors('a')['w'], np.arange(6, dtype=np.float32).reshape(2, 3))
+        assert reader.tensors('b')['i'].dtype == np.int64
+
+
+def test_remove_unused_runs_keeps_directories_with_active_models(database, tmp_path):
+    model_dir = tmp_path / 'series'
+    runs = [model_dir / f"{RUN_DIR_PREFIX}2024010{i}-000000-000000" for i in range(3)]
+    for run in runs:
+        run.mkdir(parents=True)
+        (run / 'model.fcm').write_bytes(b'')
+    (model_dir / 'manifest.json').write_text('{}')
+    config = {'model_type': 'lstm'}
+    register_models(database, [
+        {'series_id': 'a', 'model_file': str(runs[0] / 'model.fcm'), 'model_name': 'default', 'config': config},
+        {'series_id': 'b', 'model_file': str(runs[1] / 'model.fcm'), 'model_name': 'default', 'config': config}
+    ])
+    # 系列 a を学習し直すと、以前の run-0 のモデルは無効になる
+    register_models(database, [
+        {'series_id': 'a', 'model_file': str(runs[2] / 'model.fcm'), 'model_name': 'default', 'config': config}
+    ])
+
+    removed = remove_unused_runs(str(model_dir), active_model_files(database))
+
+    assert removed == [str(runs[0])]
+    assert sorted(path.name for path in model_dir.iterdir()) == ['manifest.json', runs[1].name, runs[2].name]
+    assert remove_unused_runs(str(tmp_path / 'missing'), set()) == []
@@ -0,0 +1,50 @@
+import numpy as np
+
+from app.models.baselines import baseline_forecast, croston, holt_winters, is_intermittent, seasonal_naive
+
+
+def test_baseline_forecast_handles_seasonal_intermittent_and_short_series():
+    days = np.arange(112)
+    seasonal = list(100 + 30 * np.sin(2 * np.pi * days / 7))
+    intermittent = [5.0 if day % 4 == 0 else 0.0 for day in days]
+
+    forecasts, methods, error_rates = baseline_forecast([seasonal, intermittent, [3.0, 4.0]], 14)
+
+    assert forecasts.shape == (3, 14)
+    assert methods[0] in ('seasonal_naive', 'holt_winters')
+    np.testing.assert_allclose(forecasts[0], seasonal[-7:] * 2, atol=1.0)
+    assert methods[1] == 'croston'
+    assert methods[2] == 'naive' and np.isnan(error_rates[2])
+    np.testing.assert_allclose(forecasts[2], 4.0)
+
+
+def test_seasonal_naive_repeats_the_last_week():
+    values = np.arange(20, dtype=np.float64).reshape(2, 10)
+
+    np.testing.assert_array_equal(seasonal_naive(values, 9)[0], [3, 4, 5, 6, 7, 8, 9, 3, 4])
+
+
+def test_holt_winters_follows_trend_and_season_for_many_series_at_once():
+    days = np.arange(112)
+    pattern = np.array([0, 5, 10, 5, 0, -5, -10], dtype=np.float64)
+    values = np.stack([50 + level + 0.5 * days + pattern[days % 7] for level in (0.0, 100.0, 200.0)])
+
+    forecasts = holt_winters(values, 14)
+
+    # トレンドは減衰するので、先の日ほど少し低めになる
+    future = np.arange(112, 126)
+    expected = 50 + np.array([[0.0], [100.0], [200.0]]) + 0.5 * future + pattern[future % 7]
+    np.testing.assert_allclose(forecasts, expected, rtol=0.05)
+    weekly_increase = forecasts[:, 7:] - forecasts[:, :7]
+    assert np.all((weekly_increase > 0) & (weekly_increase <= 7 * 0.5))
+
+
+def test_croston_predicts_the_average_demand_rate_of_intermittent_series():
+    values = np.zeros((2, 120))
+    values[0, ::4] = 8.0
+
+    forecasts = croston(values, 5)
+
+    assert is_intermittent(values).tolist() == [True, True]
+    np.testing.assert_allclose(forecasts[0], 8.0 / 4 * 0.95, rtol=0.05)
+    np.testing.assert_array_equal(forecasts[1], 0.0)
@@ -0,0 +1,39 @@
+import pytest
+
+
+def test_batch_returns_results_in_request_order_with_errors_for_missing_series(api):
+    status, body = api('POST', '/api/predict/batch', {'requests': [
+        {'seriesId': 'default', 'period': 3},
+        {'seriesId': 'unknown'},
+        {'series': 'default', 'period': 5, 'historyDays': 10}
+    ]})
+
+    assert status == 200 and body['missing'] == ['unknown']
+    first, missing, last = body['results']
+    assert len(first['forecastData']) - first['forecastData'].count(None) == 3
+    assert missing == {'success': False, 'seriesId': 'unknown', 'error': '予測に必要な履歴データがありません'}
+    assert len(last['dates']) == 15
+    # 同じ系列の予測は予測日数が違っても先頭が同じ
+    assert last['forecastData'][10:13] == first['forecastData'][-3:]
+
+
+@pytest.mark.parametrize('body', [
+    {},
+    {'requests': []},
+    {'requests': {'seriesId': 'default'}},
+    {'requests': ['default']},
+    {'requests': [{'period': 'abc'}]}
+])
+def test_batch_rejects_malformed_requests(api, body):
+    status, response = api('POST', '/api/predict/batch', body)
+
+    assert status == 400 and response['success'] is False
+
+
+def test_batch_rejects_too_many_requests(api, monkeypatch):
+    from app.backend import server
+
+    monkeypatch.setattr(server, 'MAX_BATCH_REQUESTS', 2)
+    status, _ = api('POST', '/api/predict/batch', {'requests': [{}] * 3})
+
+    assert status == 400
@@ -0,0 +1,109 @@
+import threading
+
+import pytest
+
+from app.backend.coalescer import PredictCoalescer
+
+
+def _fake_predict(calls, missing_ids=()):
+    def predict(requests):
+        calls.append(list(requests))
+        results = [None if series_id in missing_ids else (series_id, period) for series_id, period, _ in requests]
+        return results, [series_id for series_id, _, _ in requests if series_id in missing_ids]
+    return predict
+
+
+def _submit_concurrently(coalescer, request_lists):
+    results = [None] * len(request_lists)
+    barrier = threading.Barrier(len(request_lists))
+
+    def run(i):
+        barrier.wait()
+        results[i] = coalescer.submit(request_lists[i])
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(len(request_lists))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_concurrent_requests_are_merged_and_split_back():
+    calls = []
+    coalescer = PredictCoalescer(_fake_predict(calls, missing_ids={'gone'}), max_wait=0.2, max_batch=64)
+    request_lists = [[('a', 1, 7)], [('b', 2, 7), ('gone', 3, 7)], [('c', 4, 7)]]
+
+    results = _submit_concurrently(coalescer, request_lists)
+
+    assert len(calls) == 1 and len(calls[0]) == 4
+    assert results[0] == ([('a', 1)], [])
+    assert results[1] == ([('b', 2), None], ['gone'])
+    assert results[2] == ([('c', 4)], [])
+    stats = coalescer.stats()
+    assert stats['batches'] == 1 and stats['requests'] == 3 and stats['forecasts'] == 4
+
+
+def test_batch_closes_at_max_batch():
+    calls = []
+    coalescer = PredictCoalescer(_fake_predict(calls), max_wait=5.0, max_batch=2)
+
+    results = _submit_concurrently(coalescer, [[('a', 1, 7)], [('b', 1, 7)]])
+
+    # 上限に達したら待ち時間を待たずに予測する
+    assert sorted(len(call) for call in calls) == [2]
+    assert sorted(result[0][0][0] for result in results) == ['a', 'b']
+
+
+def test_errors_reach_every_request_in_the_batch():
+    def predict(requests):
+        raise RuntimeError('boom')
+
+    coalescer = PredictCoalescer(predict, max_wait=0.2)
+    errors = []
+
+    def run():
+        try:
+            coalescer.submit([('a', 1, 7)])
+        except RuntimeError as e:
+            errors.append(str(e))
+
+    threads = [threading.Thread(target=run) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == ['boom'] * 3
+
+
+def test_zero_wait_calls_predict_directly():
+    calls = []
+    coalescer = PredictCoalescer(_fake_predict(calls), max_wait=0)
+    assert coalescer.submit([('a', 1, 7)]) == ([('a', 1)], [])
+    assert coalescer.stats()['enabled'] is False and coalescer.stats()['batches'] == 0
+
+
+@pytest.mark.parametrize('body, status', [
+    ({'period': -3}, 400),
+    ({'period': 0}, 400),
+    ({'period': 'x'}, 400),
+    ({'period': None}, 400),
+    ({'period': 3, 'seriesId': 'missing'}, 400),
+    ([1, 2], 400),
+    ({'period': 3}, 200)
+])
+def test_predict_validates_the_request(api, body, status):
+    assert api('POST', '/api/predict', body)[0] == status
+
+
+def test_predict_failure_returns_a_single_json_500(api, monkeypatch):
+    from app.backend import server
+
+    def fail(requests):
+        raise RuntimeError('predict failed')
+
+    monkeypatch.setattr(server.PREDICT_COALESCER, 'submit', fail)
+    status, body = api('POST', '/api/predict', {'period': 3})
+    # 500 の後に 404 のステータス行が続くと本文が JSON として読めない
+    assert status == 500
+    assert body == {'success': False, 'error': 'predict failed'}
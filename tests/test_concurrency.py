@@ -0,0 +1,72 @@
+import threading
+import time
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler
+
+from app.backend.concurrency import DEFAULT_POOL_CONFIG, BoundedWorkerPool, PooledHTTPServer, pool_config_from_env
+
+release = threading.Event()
+
+
+class BlockingHandler(BaseHTTPRequestHandler):
+    """学習のルートは release が立つまで応答しないハンドラー"""
+
+    def do_GET(self):
+        if self.path == '/api/train':
+            release.wait(10)
+        self.send_response(200)
+        self.end_headers()
+        self.wfile.write(threading.current_thread().name.encode())
+
+    def log_message(self, format, *args):
+        pass
+
+
+def test_pool_config_from_env_converts_types():
+    config = pool_config_from_env({'FORECAST_SLOW_WORKERS': '3', 'FORECAST_PEEK_TIMEOUT': '0.5'})
+
+    assert config['slow_workers'] == 3 and config['peek_timeout'] == 0.5
+    assert config['fast_workers'] == DEFAULT_POOL_CONFIG['fast_workers']
+
+
+def test_bounded_pool_rejects_tasks_beyond_workers_and_queue():
+    pool = BoundedWorkerPool('test', 1, 1)
+    started = threading.Event()
+    done = threading.Event()
+    try:
+        assert pool.try_submit(lambda: (started.set(), done.wait(10)))
+        assert pool.try_submit(lambda: None)
+        assert not pool.try_submit(lambda: None)
+        assert pool.stats()['rejected'] == 1
+    finally:
+        done.set()
+        pool.shutdown(wait=True)
+    assert pool.stats()['inFlight'] == 0
+
+
+def test_fast_requests_are_served_while_slow_routes_are_busy():
+    release.clear()
+    httpd = PooledHTTPServer(('localhost', 0), BlockingHandler, {'slow_workers': 1, 'slow_queue_size': 0})
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    base = f"http://localhost:{httpd.server_address[1]}"
+    slow = threading.Thread(target=lambda: urllib.request.urlopen(base + '/api/train', timeout=10).read())
+    try:
+        slow.start()
+        while httpd.stats()['slow']['inFlight'] == 0:
+            time.sleep(0.01)
+
+        # 学習のプールが埋まっていても、軽いリクエストは別のプールで応答する
+        with urllib.request.urlopen(base + '/api/test', timeout=5) as response:
+            assert response.read().startswith(b'fast-worker')
+        try:
+            urllib.request.urlopen(base + '/api/train', timeout=5)
+            raise AssertionError('混雑時は 503 になるはず')
+        except urllib.error.HTTPError as e:
+            assert e.code == 503 and e.headers['Retry-After'] == '1'
+    finally:
+        release.set()
+        slow.join()
+        httpd.shutdown()
+        httpd.server_close()
+    assert httpd.stats()['slow']['rejected'] == 1
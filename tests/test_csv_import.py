@@ -0,0 +1,91 @@
+import contextlib
+import io
+
+import pytest
+
+from app.backend.csv_import import import_csv
+
+
+def run_import(database, text, mode='replace', batch_size=2):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return import_csv(database, io.StringIO(text), mode=mode, batch_size=batch_size)
+
+
+def stored(database):
+    return database.query("SELECT series_id, date, sales FROM sales_data ORDER BY series_id, date")
+
+
+INITIAL = '''date,sales,sku
+2024-01-01,10,A
+2024-01-02,11,A
+2024-01-03,12,A
+2024-01-04,13,A
+2024-01-01,20,B
+'''
+
+
+def test_import_reports_rejected_rows_and_changed_ranges(database):
+    summary = run_import(database, INITIAL + '2024-01-05,abc,A\nnot-a-date,1,A\n\n')
+
+    assert summary['rows'] == 5 and summary['series'] == 2
+    assert summary['inserted'] == 5 and summary['updated'] == 0 and summary['deleted'] == 0
+    assert summary['rejected'] == 2
+    assert [row['line'] for row in summary['rejectedRows']] == [7, 8]
+    assert summary['dateRange'] == {'from': '2024-01-01', 'to': '2024-01-04'}
+    assert summary['changedRanges'] == [
+        {'series': 'A', 'from': '2024-01-01', 'to': '2024-01-04'},
+        {'series': 'B', 'from': '2024-01-01', 'to': '2024-01-01'}
+    ]
+
+
+def test_replace_mode_deletes_missing_dates_of_imported_series_only(database):
+    run_import(database, INITIAL)
+    summary = run_import(database, 'date,sales,sku\n2024-01-01,10,A\n2024-01-02,99,A\n2024-01-04,13,A\n')
+
+    assert (summary['inserted'], summary['updated'], summary['deleted']) == (0, 1, 1)
+    assert summary['changedRanges'] == [{'series': 'A', 'from': '2024-01-02', 'to': '2024-01-03'}]
+    assert stored(database) == [
+        ('A', '2024-01-01', 10.0), ('A', '2024-01-02', 99.0), ('A', '2024-01-04', 13.0), ('B', '2024-01-01', 20.0)
+    ]
+
+
+@pytest.mark.parametrize('mode, expected_sales, counts', [
+    ('append', 11.0, (2, 0, 0)),
+    ('upsert', 99.0, (2, 1, 0))
+])
+def test_append_and_upsert_keep_existing_dates(database, mode, expected_sales, counts):
+    run_import(database, INITIAL)
+    summary = run_import(database, 'date,sales,sku\n2024-01-02,99,A\n2024-01-06,15,A\n2024-01-07,16,A\n', mode=mode)
+
+    assert (summary['inserted'], summary['updated'], summary['deleted']) == counts
+    assert database.query_one("SELECT sales FROM sales_data WHERE series_id = 'A' AND date = '2024-01-02'")[0] == expected_sales
+    assert database.query_one("SELECT COUNT(*) FROM sales_data")[0] == 7
+    ranges = [{'series': 'A', 'from': '2024-01-06', 'to': '2024-01-07'}]
+    if mode == 'upsert':
+        ranges.insert(0, {'series': 'A', 'from': '2024-01-02', 'to': '2024-01-02'})
+    assert summary['changedRanges'] == ranges
+
+
+def test_import_without_valid_rows_leaves_data_unchanged(database):
+    run_import(database, INITIAL)
+
+    with pytest.raises(ValueError):
+        run_import(database, 'date,sales,sku\nbad,1,A\n')
+    with pytest.raises(ValueError):
+        run_import(database, INITIAL, mode='merge')
+    assert len(stored(database)) == 5
+
+
+def test_json_and_streaming_imports_return_the_same_summary(api):
+    csv_text = 'date,sales,sku\n2024-01-01,10,A\n2024-01-02,11,A\nbad,1,A\n'
+
+    status, streamed = api('POST', '/api/data/import?mode=replace', raw=csv_text.encode(), content_type='text/csv')
+    assert status == 200
+    status, posted = api('POST', '/api/data/import', {'csvContent': csv_text, 'mode': 'upsert'})
+    assert status == 200
+
+    assert set(posted) == set(streamed) == {'success', 'summary'}
+    assert set(posted['summary']) == set(streamed['summary'])
+    assert (posted['summary']['rows'], posted['summary']['rejected'], posted['summary']['inserted']) == (2, 1, 0)
+    assert api('POST', '/api/data/import', {'csvContent': 123})[0] == 400
+    assert api('POST', '/api/data/import', {'csvContent': 'date,sales\n'})[0] == 400
@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from app.backend.downsampling import downsample
+
+
+def test_downsampling_keeps_ends_and_extremes():
+    x = np.arange(1000)
+    y = np.sin(x / 50.0)
+    y[123] = 10.0
+
+    for method in ('lttb', 'minmax'):
+        indices = downsample(x, y, 100, method)
+        assert len(indices) <= 100
+        assert np.all(np.diff(indices) > 0)
+        assert 123 in indices
+    lttb = downsample(x, y, 100, 'lttb')
+    assert lttb[0] == 0 and lttb[-1] == 999
+    assert len(downsample(x, y, 2000, 'lttb')) == 1000
+    with pytest.raises(ValueError):
+        downsample(x, y, 100, 'mean')
+
+
+def test_data_api_pages_and_downsamples(api):
+    status, first = api('GET', '/api/data?limit=100')
+    assert status == 200 and len(first['salesData']) == 100
+    status, second = api('GET', f"/api/data?limit=100&cursor={first['nextCursor']}")
+    assert second['salesData'][0]['date'] > first['salesData'][-1]['date']
+
+    status, recent = api('GET', '/api/data?days=7')
+    assert len(recent['salesData']) == 7
+
+    status, chart = api('GET', '/api/data?points=50&downsample=minmax')
+    assert status == 200 and chart['downsampled']['method'] == 'minmax'
+    assert len(chart['salesData']) == chart['downsampled']['points'] <= 50
+
+
+@pytest.mark.parametrize('path', [
+    '/api/data?limit=-1',
+    '/api/data?days=0',
+    '/api/data?points=abc',
+    '/api/data?from=2024-13-01',
+    '/api/data?points=50&downsample=mean',
+    '/api/models?limit=abc',
+    '/api/models?limit=0'
+])
+def test_invalid_query_parameters_return_400(api, path):
+    status, body = api('GET', path)
+
+    assert status == 400 and body['success'] is False
@@ -0,0 +1,94 @@
+import sqlite3
+
+import pytest
+
+from app.backend.database import (
+    DEFAULT_SERIES, MIGRATIONS, Database, count_sales, create_schema, normalize_date, sales_in_range, sales_page
+)
+
+
+def _columns(conn, table):
+    return [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+
+
+def test_fresh_database_applies_all_migrations(database):
+    with database.connection() as conn:
+        assert conn.execute("PRAGMA user_version").fetchone()[0] == len(MIGRATIONS)
+        assert 'series_id' in _columns(conn, 'sales_data')
+        assert {'sequence_length', 'learning_rate', 'search_result'} <= set(_columns(conn, 'settings'))
+        assert 'model_file' in _columns(conn, 'model_registry')
+        assert conn.execute("SELECT COUNT(*) FROM settings").fetchone()[0] == 1
+
+
+def test_v0_database_is_migrated(tmp_path):
+    # 移行を導入する前のスキーマ（日付の書式がそろっておらず、同じ日付の行が重複している）
+    path = str(tmp_path / 'legacy.db')
+    conn = sqlite3.connect(path)
+    conn.executescript('''
+    CREATE TABLE sales_data (id INTEGER PRIMARY KEY AUTOINCREMENT, date TEXT NOT NULL, sales REAL NOT NULL,
+                             features TEXT);
+    CREATE TABLE settings (id INTEGER PRIMARY KEY AUTOINCREMENT, model_type TEXT NOT NULL,
+                           hidden_layers INTEGER NOT NULL, hidden_units INTEGER NOT NULL, auto_mode INTEGER NOT NULL);
+    INSERT INTO settings (model_type, hidden_layers, hidden_units, auto_mode) VALUES ('lstm', 3, 128, 1);
+    INSERT INTO sales_data (date, sales) VALUES ('2024/01/01', 10), ('2024-01-01', 11), ('20240102', 12),
+                                                ('not a date', 13);
+    ''')
+    conn.commit()
+    conn.close()
+
+    database = Database(path)
+    try:
+        with database.transaction() as conn:
+            create_schema(conn)
+        with database.connection() as conn:
+            assert conn.execute("PRAGMA user_version").fetchone()[0] == len(MIGRATIONS)
+            rows = conn.execute("SELECT series_id, date, sales FROM sales_data ORDER BY date").fetchall()
+            settings = conn.execute(
+                "SELECT hidden_layers, hidden_units, sequence_length, search_result FROM settings"
+            ).fetchall()
+        # 日付は ISO 形式にそろい、同じ日付は最後の行だけが残り、解釈できない日付は削除される
+        assert rows == [(DEFAULT_SERIES, '2024-01-01', 11.0), (DEFAULT_SERIES, '2024-01-02', 12.0)]
+        assert settings == [(3, 128, None, None)]
+
+        # 適用済みの移行は繰り返さない
+        with database.transaction() as conn:
+            create_schema(conn)
+        assert database.query("SELECT COUNT(*) FROM sales_data")[0][0] == 2
+    finally:
+        database.close()
+
+
+@pytest.mark.parametrize('value, expected', [
+    ('2024-03-05', '2024-03-05'),
+    (' 2024/3/5 ', '2024-03-05'),
+    ('20240305', '2024-03-05'),
+    ('2024-03-05 12:30:00', '2024-03-05')
+])
+def test_normalize_date_accepts_common_formats(value, expected):
+    assert normalize_date(value) == expected
+
+
+def test_normalize_date_rejects_invalid_dates():
+    with pytest.raises(ValueError):
+        normalize_date('2024-02-30')
+
+
+def test_date_range_queries_use_the_series_date_index(database):
+    with database.transaction() as conn:
+        conn.executemany("INSERT INTO sales_data (series_id, date, sales) VALUES (?, ?, ?)",
+                         [(series_id, f"2024-01-{day:02d}", day) for series_id in ('a', DEFAULT_SERIES)
+                          for day in range(1, 11)])
+        with pytest.raises(sqlite3.IntegrityError):
+            conn.execute("INSERT INTO sales_data (series_id, date, sales) VALUES ('a', '2024-01-01', 0)")
+
+    rows = sales_in_range(database, '2024-01-03', '2024-01-05', series_id='a')
+    assert rows == [('2024-01-03', 3.0), ('2024-01-04', 4.0), ('2024-01-05', 5.0)]
+    first, cursor = sales_page(database, 4, start='2024-01-02')
+    rest, last_cursor = sales_page(database, 100, after=cursor)
+    assert [row[0] for row in first + rest] == [f"2024-01-{day:02d}" for day in range(2, 11)]
+    assert cursor == '2024-01-05' and last_cursor is None
+    assert (count_sales(database), count_sales(database, 'a')) == (20, 10)
+
+    plan = database.query("EXPLAIN QUERY PLAN SELECT date, sales FROM sales_data "
+                          "WHERE series_id = ? AND date >= ? AND date <= ? ORDER BY date", ('a', '2024-01-03', '2024-01-05'))
+    assert any('idx_sales_data_series_date' in row[-1] for row in plan)
@@ -0,0 +1,53 @@
+import numpy as np
+
+from app.backend.date_index import COMPARISON_DAYS, DateIndexCache, SeriesDateIndex
+from conftest import daily_rows
+
+
+def insert(database, series_id, rows):
+    with database.transaction() as conn:
+        conn.executemany("INSERT OR REPLACE INTO sales_data (series_id, date, sales) VALUES (?, ?, ?)",
+                         [(series_id, date, sales) for date, sales in rows])
+
+
+def test_windowed_index_gives_the_same_comparisons_as_the_full_history():
+    rows = daily_rows(3 * 365)
+    full = SeriesDateIndex(rows)
+    windowed = SeriesDateIndex(rows, COMPARISON_DAYS)
+
+    assert len(windowed) == COMPARISON_DAYS and windowed.nbytes < full.nbytes
+    for period in (1, 7, 30, 364, 365, 400):
+        expected = full.comparisons(12345.0, period)
+        for key, value in windowed.comparisons(12345.0, period).items():
+            assert value == expected[key] if value is None else np.isclose(value, expected[key])
+    year_ago = sum(sales for _, sales in rows[-365:-335])
+    assert np.isclose(full.comparisons(year_ago * 1.1, 30)['yearOverYearChange'], 10.0)
+    assert full.comparisons(1.0, 366)['yearOverYearChange'] is None
+
+
+def test_cache_rebuilds_on_new_data_version_and_is_bounded_by_bytes(database):
+    for i in range(4):
+        insert(database, f"s{i}", daily_rows(800, seed=i))
+    size = SeriesDateIndex(daily_rows(800), COMPARISON_DAYS).nbytes
+    cache = DateIndexCache(max_entries=10, max_bytes=size * 2)
+
+    indexes = cache.get_many(database, ['s0', 's1', 'missing'], data_version=1)
+    assert indexes['missing'] is None and len(indexes['s0']) == COMPARISON_DAYS
+    assert cache.get_many(database, ['s0', 's1'], data_version=1)['s0'] is indexes['s0']
+    assert cache.stats()['builds'] == 3
+
+    # 系列 s2, s3 を加えると上限を超えるので、最も長く使われていない系列から捨てる
+    cache.get_many(database, ['s2', 's3'], data_version=1)
+    stats = cache.stats()
+    assert stats['bytes'] <= stats['maxBytes'] and stats['entries'] == 2
+    cache.get_many(database, ['s2', 's3'], data_version=1)
+    assert cache.stats()['builds'] == 5
+
+    # データのバージョンが変わると、直近の期間を読み込み直して作り直す
+    insert(database, 's3', [('2027-01-01', 1.0)])
+    rebuilt = cache.get_many(database, ['s3'], data_version=2)['s3']
+    assert str(rebuilt.last) == '2027-01-01' and len(rebuilt) == COMPARISON_DAYS
+    assert cache.stats()['builds'] == 6 and cache.stats()['bytes'] <= size * 2
+
+    cache.clear()
+    assert cache.stats()['entries'] == 0 and cache.stats()['bytes'] == 0
@@ -0,0 +1,62 @@
+from app.backend import forecast_cache
+from app.backend.forecast_cache import ForecastCache
+
+
+def test_entries_expire_and_least_recently_used_are_evicted(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(forecast_cache.time, 'monotonic', lambda: now[0])
+    cache = ForecastCache(max_entries=2, ttl=10)
+
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1
+    cache.put('c', 3)
+    assert cache.get('b') is None and cache.get('a') == 1
+
+    now[0] += 11
+    assert cache.get('a') is None
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['evictions'], stats['entries']) == (2, 2, 1, 1)
+
+
+def test_version_bumps_clear_the_cache():
+    cache = ForecastCache()
+    cache.put('a', 1)
+    cache.bump_data_version()
+    assert cache.get('a') is None and cache.versions() == (0, 1)
+
+    cache.put('a', 1)
+    cache.bump_model_version()
+    assert cache.get('a') is None and cache.versions() == (1, 1)
+
+    disabled = ForecastCache(max_entries=0)
+    disabled.put('a', 1)
+    assert disabled.get('a') is None
+
+
+def test_predictions_are_cached_until_the_data_changes(api):
+    from app.backend import server
+
+    def predict():
+        status, body = api('POST', '/api/predict', {'period': 7})
+        assert status == 200
+        return body
+
+    first = predict()
+    hits = server.FORECAST_CACHE.stats()['hits']
+    assert predict() == first
+    assert server.FORECAST_CACHE.stats()['hits'] == hits + 1
+
+    # 値の変わらない取り込みではキャッシュは無効にならない
+    last_date = first['dates'][-8]
+    last_sales = first['historicalData'][-8]
+    data_version = server.FORECAST_CACHE.versions()[1]
+    csv_text = f"date,sales\n{last_date},{last_sales!r}\n"
+    api('POST', '/api/data/import?mode=upsert', raw=csv_text.encode(), content_type='text/csv')
+    assert server.FORECAST_CACHE.versions()[1] == data_version
+
+    csv_text = f"date,sales\n{last_date},{last_sales * 2!r}\n"
+    status, imported = api('POST', '/api/data/import?mode=upsert', raw=csv_text.encode(), content_type='text/csv')
+    assert imported['summary']['updated'] == 1
+    assert server.FORECAST_CACHE.versions()[1] == data_version + 1
+    assert predict()['historicalData'][-8] == last_sales * 2
@@ -0,0 +1,63 @@
+import contextlib
+import io
+
+import numpy as np
+import pytest
+
+from conftest import daily_rows
+
+torch = pytest.importorskip('torch')
+
+
+def test_predict_batch_accepts_mixed_history_lengths(forecaster):
+    long_rows = daily_rows(60)
+    histories = [long_rows, long_rows[:3], long_rows[:1]]
+
+    forecasts = forecaster.predict_batch(histories, 5)
+
+    assert forecasts.shape == (3, 5)
+    assert np.isfinite(forecasts).all()
+    # 長い系列の予測は、他の系列と一緒に予測しても1系列だけの予測と同じ
+    np.testing.assert_allclose(forecasts[0], forecaster.predict_batch([long_rows], 5)[0], rtol=1e-5)
+
+
+def test_direct_multi_horizon_head_predicts_several_days_per_pass():
+    from app.models.lstm_model import DemandForecaster
+
+    torch.manual_seed(0)
+    forecaster = DemandForecaster(config={'hidden_units': 8, 'hidden_layers': 2, 'sequence_length': 7, 'horizon': 5})
+    rows = daily_rows(90)
+    X, y = forecaster.prepare_data(rows)
+    assert tuple(X.shape) == (90 - 7 - 5 + 1, 7, 1) and tuple(y.shape) == (90 - 7 - 5 + 1, 5)
+    with contextlib.redirect_stdout(io.StringIO()):
+        forecaster.train(rows, epochs=1)
+
+    calls = []
+    forecaster.model.register_forward_hook(lambda module, inputs, output: calls.append(tuple(output.shape)))
+    forecasts = forecaster.predict_batch([rows, rows[:-10]], 12)
+
+    # 12日分を 5 + 5 + 2 日の3回の順伝播で予測する
+    assert forecasts.shape == (2, 12) and calls == [(2, 5)] * 3
+    # 予測日数が違っても先頭は同じ値
+    np.testing.assert_allclose(forecaster.predict_batch([rows, rows[:-10]], 3), forecasts[:, :3], rtol=1e-6)
+
+
+def test_forecast_series_sends_short_histories_to_the_baseline(forecaster):
+    from app.backend import server
+
+    long_rows = daily_rows(60)
+    results = server.forecast_series([long_rows, long_rows[:3]], 5, 10, ['long', 'short'], forecaster)
+
+    assert results[0]['modelType'] == 'lstm'
+    assert 'baselineMethod' not in results[0]
+    assert results[1]['modelType'] == 'baseline'
+    assert results[1]['baselineMethod'] == 'naive'
+    assert all(len(result['forecastData']) == len(result['dates']) for result in results)
+
+
+def test_horizon_dates_for_one_and_many_series():
+    from app.models.calendar_features import horizon_dates
+
+    assert horizon_dates('2024-02-27', 3).astype(str).tolist() == ['2024-02-28', '2024-02-29', '2024-03-01']
+    dates = horizon_dates(['2023-12-31', '2024-06-30'], 2).astype(str)
+    assert dates.tolist() == [['2024-01-01', '2024-01-02'], ['2024-07-01', '2024-07-02']]
@@ -0,0 +1,80 @@
+import time
+
+import pytest
+
+from app.backend.jobs import JOB_CANCELLED, JOB_COMPLETED, JOB_FAILED, JobLimitError, TrainingJobManager
+
+
+def train_steps(params, callback):
+    for epoch in range(params['epochs']):
+        time.sleep(params.get('delay', 0))
+        callback(epoch, params['epochs'], 1.0 / (epoch + 1))
+    return {'epochs': params['epochs']}
+
+
+def fail(params, callback):
+    raise ValueError('学習データがありません')
+
+
+def hang(params, callback):
+    # 進捗を報告しないのでキャンセルを確認できず、強制終了するしかない
+    time.sleep(60)
+
+
+def wait_for(manager, job_id, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = manager.get(job_id)
+        if job['finishedAt'] is not None:
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f"ジョブが終了しません: {manager.get(job_id)}")
+
+
+def test_completed_job_reports_progress_and_calls_on_complete():
+    manager = TrainingJobManager()
+    completed = []
+    job_id = manager.submit(train_steps, {'epochs': 3}, info={'kind': 'test'}, on_complete=completed.append)
+
+    events = [event['type'] for event in manager.iter_events(job_id, heartbeat=0.1) if event]
+    job = wait_for(manager, job_id)
+
+    assert events == ['progress'] * 3 + [JOB_COMPLETED]
+    assert job['status'] == JOB_COMPLETED and job['kind'] == 'test'
+    assert job['losses'] == [1.0, 0.5, pytest.approx(1 / 3)]
+    assert completed == [{'epochs': 3}] and job['result'] == {'epochs': 3}
+
+
+def test_failed_job_keeps_the_error_and_frees_the_slot():
+    manager = TrainingJobManager(max_jobs=1)
+    job_id = manager.submit(fail, {})
+    with pytest.raises(JobLimitError):
+        manager.submit(fail, {})
+
+    job = wait_for(manager, job_id)
+    assert job['status'] == JOB_FAILED and '学習データ' in job['error']
+    assert wait_for(manager, manager.submit(fail, {}))['status'] == JOB_FAILED
+
+
+def test_cancel_stops_at_the_next_epoch():
+    manager = TrainingJobManager(cancel_grace=10)
+    job_id = manager.submit(train_steps, {'epochs': 1000, 'delay': 0.05})
+    while manager.get(job_id)['epoch'] == 0:
+        time.sleep(0.05)
+
+    assert manager.cancel(job_id)
+    job = wait_for(manager, job_id)
+    assert job['status'] == JOB_CANCELLED and job['epoch'] < 1000
+    assert not manager.cancel('unknown')
+
+
+def test_cancel_terminates_a_job_that_does_not_stop():
+    manager = TrainingJobManager(cancel_grace=0.5)
+    job_id = manager.submit(hang, {})
+    time.sleep(0.5)
+
+    start = time.monotonic()
+    manager.cancel(job_id)
+    job = wait_for(manager, job_id)
+    assert job['status'] == JOB_CANCELLED
+    assert time.monotonic() - start < 10
@@ -0,0 +1,35 @@
+from app.backend.database import QUERY_CHUNK_SIZE, sales_by_series
+
+
+def test_sales_by_series_chunks_large_id_lists(database):
+    series_ids = [f"S{i:04d}" for i in range(QUERY_CHUNK_SIZE * 2 + 1)]
+    with database.transaction() as conn:
+        conn.executemany(
+            "INSERT INTO sales_data (series_id, date, sales) VALUES (?, ?, ?)",
+            [(series_id, date, float(i)) for i, series_id in enumerate(series_ids)
+             for date in ('2024-01-02', '2024-01-01')]
+        )
+
+    result = sales_by_series(database, series_ids + ['missing'])
+    assert list(result) == series_ids
+    assert result[series_ids[-1]] == [('2024-01-01', float(len(series_ids) - 1)),
+                                      ('2024-01-02', float(len(series_ids) - 1))]
+    assert len(sales_by_series(database)) == len(series_ids)
+
+
+def test_predict_series_ids_must_be_a_list(api):
+    status, body = api('POST', '/api/predict', {'period': 5, 'seriesIds': 'default'})
+    assert status == 400 and body['success'] is False
+
+    status, body = api('POST', '/api/predict', {'period': 5, 'seriesIds': []})
+    assert status == 400
+
+
+def test_predict_series_ids_are_coerced_to_strings(api):
+    status, body = api('POST', '/api/predict', {'period': 5, 'seriesIds': [1, 2]})
+    assert status == 404
+    assert '1, 2' in body['error']
+
+    status, body = api('POST', '/api/predict', {'period': 5, 'seriesIds': ['default']})
+    assert status == 200
+    assert len(body['series']['default']['forecastData']) == len(body['series']['default']['dates'])
@@ -0,0 +1,42 @@
+import os
+import time
+
+import pytest
+
+
+def wait_for_job(api, job_id, timeout=120):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        status, body = api('GET', f"/api/train/jobs/{job_id}")
+        assert status == 200
+        if body['job']['finishedAt'] is not None:
+            return body['job']
+        time.sleep(0.2)
+    raise AssertionError(f"学習ジョブが終了しません: {job_id}")
+
+
+def test_training_runs_as_a_background_job_and_loads_the_model(api):
+    pytest.importorskip('torch')
+    from app.backend import server
+
+    status, body = api('POST', '/api/train', {'modelType': 'lstm', 'hiddenLayers': 2, 'hiddenUnits': 8, 'epochs': 2})
+    assert status == 200 and body['status'] == 'running'
+
+    job = wait_for_job(api, body['jobId'])
+    assert job['status'] == 'completed', job['error']
+    assert job['epochs'] == 2 and len(job['losses']) == 2
+    assert os.path.exists(server.MODEL_FILE)
+    status, predicted = api('POST', '/api/predict', {'period': 3})
+    assert status == 200 and predicted['modelType'] == 'lstm'
+    assert any(listed['jobId'] == body['jobId'] for listed in api('GET', '/api/train/jobs')[1]['jobs'])
+
+
+@pytest.mark.parametrize('method, path, body, status', [
+    ('POST', '/api/train', {'modelType': 'unknown'}, 400),
+    ('POST', '/api/train/series', {'modelType': 'unknown'}, 400),
+    ('GET', '/api/train/jobs/unknown', None, 404),
+    ('POST', '/api/train/jobs/unknown/cancel', {}, 404)
+])
+def test_training_endpoints_validate_requests(api, method, path, body, status):
+    pytest.importorskip('torch')
+    assert api(method, path, body)[0] == status